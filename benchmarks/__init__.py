@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks do Gestor do Bolsão (executar a partir da raiz do projeto)."""
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark da carga da aba 'Hubspot': get_all_records() (aba inteira, um dict por
+linha, como o app fazia) contra o caminho atual do app, ReplicaPlanilha com a
+projeção de ABAS_REPLICADAS (majorDimension=COLUMNS) -> dataframe_hubspot.
+
+Roda contra a planilha falsa (benchmarks.planilha_falsa), com a aba Hubspot
+alargada por colunas que o app não usa, como a de produção. Com --real usa a
+planilha de verdade (credenciais como na CLI: BOLSAO_CREDENCIAIS ou
+.streamlit/secrets.toml).
+
+Relata bytes recebidos da API, tempo de rede/leitura, tempo até o DataFrame e
+memória do DataFrame; para a réplica, também a sincronização incremental.
+
+Uso: python -m benchmarks.bench_hubspot [--linhas 20000] [--colunas-extras 40] [--latencia 0.0] [--real]
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import gspread
+import pandas as pd
+
+from bolsao_core.planilha import ABAS_REPLICADAS, abre_planilha, conecta, dataframe_hubspot
+from bolsao_core.planilha import COLUNAS_HUBSPOT as COLUNAS
+from bolsao_core.replica import ReplicaPlanilha
+
+from benchmarks.dados_falsos import abas_exemplo
+from benchmarks.planilha_falsa import ClienteFalso, ConfigFalhas
+
+
+class PlanilhaMedida:
+    """Repassa as chamadas à planilha e soma o tamanho (JSON) das respostas de leitura."""
+
+    def __init__(self, planilha):
+        self._planilha = planilha
+        self.bytes = 0
+
+    def mede(self, resposta):
+        self.bytes += len(json.dumps(resposta, ensure_ascii=False).encode())
+        return resposta
+
+    def values_batch_get(self, faixas, params=None):
+        return self.mede(self._planilha.values_batch_get(faixas, params=params))
+
+    def __getattr__(self, nome):
+        return getattr(self._planilha, nome)
+
+
+class AbaMedida:
+    def __init__(self, ws, planilha: PlanilhaMedida):
+        self._ws = ws
+        self.spreadsheet = planilha
+
+    def get_all_values(self, **kwargs):
+        return self.spreadsheet.mede(self._ws.get_all_values(**kwargs))
+
+    def __getattr__(self, nome):
+        return getattr(self._ws, nome)
+
+
+def planilha_falsa(n: int, extras: int, latencia: float):
+    abas = abas_exemplo(10, n)
+    # Colunas que o app não lê, intercaladas com as projetadas, como na aba real
+    hubspot = abas["Hubspot"]
+    for i, linha in enumerate(hubspot):
+        for k in range(extras):
+            linha.insert((k * len(linha)) // extras, f"Extra {k}" if i == 0 else f"valor {k}-{i}")
+    return abre_planilha(ClienteFalso(abas, ConfigFalhas(latencia=latencia)))
+
+
+def carga_antiga(ws: AbaMedida):
+    ws.spreadsheet.bytes = 0
+    t0 = time.perf_counter()
+    bruto = ws.get_all_values()
+    t1 = time.perf_counter()
+    # Mesmo caminho do get_all_records(head=1): um dict por linha antes do pandas
+    df = pd.DataFrame(gspread.utils.to_records(bruto[0], bruto[1:]))
+    t2 = time.perf_counter()
+    return df, ws.spreadsheet.bytes, t1 - t0, t2 - t0
+
+
+def carga_replica(ws: AbaMedida, caminho_db: Path):
+    ws.spreadsheet.bytes = 0
+    replica = ReplicaPlanilha(caminho_db, lambda titulo: ws, [c for c in ABAS_REPLICADAS if c.titulo == "Hubspot"])
+    t0 = time.perf_counter()
+    replica.sincroniza("Hubspot")  # só o cabeçalho: descobre as posições e refaz com a projeção
+    t1 = time.perf_counter()
+    df = dataframe_hubspot(replica.colunas("Hubspot", COLUNAS))
+    t2 = time.perf_counter()
+    total = ws.spreadsheet.bytes
+
+    ws.spreadsheet.bytes = 0
+    t3 = time.perf_counter()
+    replica.sincroniza("Hubspot")
+    incremental = (ws.spreadsheet.bytes, time.perf_counter() - t3)
+    return df, total, t1 - t0, t2 - t0, incremental
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--linhas", type=int, default=20000)
+    parser.add_argument("--colunas-extras", type=int, default=40)
+    parser.add_argument("--latencia", type=float, default=0.0, help="segundos por requisição na planilha falsa")
+    parser.add_argument("--real", action="store_true", help="usa a planilha real em vez da falsa")
+    args = parser.parse_args()
+
+    wb = abre_planilha(conecta()) if args.real else planilha_falsa(args.linhas, args.colunas_extras, args.latencia)
+    ws = AbaMedida(wb.worksheet("Hubspot"), PlanilhaMedida(wb))
+    print(f"aba Hubspot: {ws.col_count} colunas · {len(COLUNAS)} projetadas")
+
+    df_antigo, payload, t_rede, t_df = carga_antiga(ws)
+    with tempfile.TemporaryDirectory() as tmp:
+        df_novo, payload_novo, t_sync, t_df_novo, (payload_incr, t_incr) = carga_replica(ws, Path(tmp) / "replica.sqlite3")
+    assert len(df_antigo) == len(df_novo)
+
+    for nome, df, b, rede, ate_df in (("get_all_records", df_antigo, payload, t_rede, t_df),
+                                      ("réplica projetada", df_novo, payload_novo, t_sync, t_df_novo)):
+        print(f"{nome:<18} payload {b / 1024:9.1f} KiB | rede+sync {rede * 1000:8.1f} ms | "
+              f"até o DataFrame {ate_df * 1000:8.1f} ms | memória {df.memory_usage(deep=True).sum() / 1024:9.1f} KiB "
+              f"| {df.shape}")
+    print(f"{'sync incremental':<18} payload {payload_incr / 1024:9.1f} KiB | {t_incr * 1000:8.1f} ms")
+    print(f"payload: {payload / max(payload_novo, 1):.1f}x menor com a projeção")
+
+
+if __name__ == "__main__":
+    main()
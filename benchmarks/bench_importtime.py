@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark do tempo de import do app, a parte do cold start que vem antes de
+executar o script. Não mede o primeiro desenho da página (isso pediria o
+Streamlit rodando o app inteiro) nem os reruns, que já encontram os módulos
+em sys.modules.
+
+Mede, cada um em um processo novo com `python -X importtime`:
+- os módulos pesados que eram importados de forma ansiosa (weasyprint,
+  gspread, google.oauth2.service_account), isolados: o tempo que o import
+  preguiçoso tira do cold start;
+- os imports do topo de bolsao.py com e sem esses módulos, se as
+  dependências do app estiverem instaladas.
+
+Uso: python -m benchmarks.bench_importtime [repeticoes] [--top N]
+"""
+import argparse
+import ast
+import importlib.util
+import re
+import statistics
+import subprocess
+import sys
+
+from bolsao_core import BASE_DIR
+
+PESADOS = ("weasyprint", "gspread", "google.oauth2.service_account")
+_RE_LINHA = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def imports_do_app() -> str:
+    """Os comandos import/from do topo de bolsao.py, na ordem do arquivo."""
+    arvore = ast.parse((BASE_DIR / "bolsao.py").read_text(encoding="utf-8"))
+    return "\n".join(ast.unparse(no) for no in arvore.body if isinstance(no, (ast.Import, ast.ImportFrom)))
+
+
+def instalado(modulo: str) -> bool:
+    return importlib.util.find_spec(modulo.split(".")[0]) is not None
+
+
+def mede(codigo: str) -> tuple[float, dict[str, float]]:
+    """Total (s) e tempo acumulado por módulo de topo (s) de um processo que só executa `codigo`."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=BASE_DIR, capture_output=True, text=True, check=True,
+    )
+    total, por_modulo = 0, {}
+    for linha in proc.stderr.splitlines():
+        m = _RE_LINHA.match(linha)
+        if not m:
+            continue
+        cumulativo, nivel, modulo = int(m.group(2)), len(m.group(3)), m.group(4)
+        if nivel == 1:  # imports de primeiro nível (os aninhados já estão no acumulado)
+            total += cumulativo
+            por_modulo[modulo] = cumulativo / 1e6
+    return total / 1e6, por_modulo
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("repeticoes", type=int, nargs="?", default=5)
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args()
+
+    codigo_atual = imports_do_app()
+    cenarios = {"interpretador vazio": "pass", "só os pesados (adiados)": "\n".join(f"import {m}" for m in PESADOS if instalado(m))}
+    try:
+        mede(codigo_atual)
+    except subprocess.CalledProcessError as e:
+        falta = e.stderr.strip().splitlines()[-1] if e.stderr.strip() else e
+        print(f"imports de bolsao.py não rodam aqui ({falta}); medindo só os módulos pesados")
+    else:
+        cenarios["app, lazy (atual)"] = codigo_atual
+        cenarios["app, ansioso (antes)"] = "\n".join(f"import {m}" for m in PESADOS) + "\n" + codigo_atual
+
+    print("tempo de import (python -X importtime), processo novo por medida")
+    for nome, codigo in cenarios.items():
+        medidas = [mede(codigo) for _ in range(args.repeticoes)]
+        totais = [t for t, _ in medidas]
+        print(f"{nome:<24} mediana {statistics.median(totais) * 1000:8.1f} ms | "
+              f"min {min(totais) * 1000:8.1f} ms | max {max(totais) * 1000:8.1f} ms")
+        ultimo = medidas[-1][1]
+        for modulo, seg in sorted(ultimo.items(), key=lambda kv: kv[1], reverse=True)[:args.top]:
+            print(f"    {modulo:<40} {seg * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark da renderização da carta: caminho antigo (lê carta.html do disco,
+um str.replace por chave e style.css/imagens relidos pelo WeasyPrint) contra o
+template pré-compilado de bolsao_core.render.
+
+Uso: python -m benchmarks.bench_render [n_cartas]
+"""
+import statistics
+import sys
+import time
+
+import weasyprint
+
+from bolsao_core import BASE_DIR
+from bolsao_core.render import carrega_template
+
+CTX_EXEMPLO = {
+    "ano": 2026,
+    "unidade": "Colégio Matriz – BANGU",
+    "aluno": "Fulano De Tal",
+    "bolsa_pct": "50",
+    "acertos_mat": 6,
+    "acertos_port": 6,
+    "turma": "1ª série do EM - Pré-Vestibular",
+    "n_parcelas": 12,
+    "data_limite": "01/01/2026",
+    "anuidade_vista": "R$ 17.418,25",
+    "primeira_cota": "R$ 1.410,39",
+    "valor_parcela": "R$ 1.410,39",
+    "unidades_html": "<span class='unidade-item'>BANGU</span>",
+    "tabelas_material_didatico": "",
+}
+
+
+def render_antigo(ctx: dict) -> bytes:
+    with open(BASE_DIR / "carta.html", encoding="utf-8") as f:
+        html = f.read()
+    for k, v in ctx.items():
+        html = html.replace(f"{{{{{k}}}}}", str(v))
+    return weasyprint.HTML(string=html, base_url=str(BASE_DIR)).write_pdf()
+
+
+def render_novo(ctx: dict) -> bytes:
+    return carrega_template(BASE_DIR).render(ctx)
+
+
+def substituicao_antiga(ctx: dict) -> str:
+    with open(BASE_DIR / "carta.html", encoding="utf-8") as f:
+        html = f.read()
+    for k, v in ctx.items():
+        html = html.replace(f"{{{{{k}}}}}", str(v))
+    return html
+
+
+def mede(fn, n: int) -> list[float]:
+    fn(CTX_EXEMPLO)  # aquecimento (fontes, imports, cache do template)
+    tempos = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn(CTX_EXEMPLO)
+        tempos.append(time.perf_counter() - t0)
+    return tempos
+
+
+def relatorio(nome: str, tempos: list[float]):
+    print(f"{nome:<28} média {statistics.mean(tempos) * 1000:8.2f} ms | "
+          f"mediana {statistics.median(tempos) * 1000:8.2f} ms | n={len(tempos)}")
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    template = carrega_template(BASE_DIR)
+    relatorio("substituição (antiga)", mede(substituicao_antiga, n * 50))
+    relatorio("substituição (pré-compilada)", mede(template.preenche, n * 50))
+    antigo = mede(render_antigo, n)
+    novo = mede(render_novo, n)
+    relatorio("PDF (antigo)", antigo)
+    relatorio("PDF (template em cache)", novo)
+    print(f"Ganho por carta: {(1 - statistics.median(novo) / statistics.median(antigo)) * 100:.1f}%")
+
+
+if __name__ == "__main__":
+    main()
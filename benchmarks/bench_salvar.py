@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Chamadas à API por carta salva, no caminho único de gravação
+(RegistroResultados -> FilaEscrita), contra a planilha falsa
+(benchmarks.planilha_falsa), que conta as requisições.
+
+Regime permanente = réplica já sincronizada: o esperado é exatamente uma
+escrita (append_rows) por envio da fila e nenhuma leitura. O script termina
+com erro se isso não valer.
+
+Uso: python -m benchmarks.bench_salvar [n_cartas]
+"""
+import sys
+import tempfile
+from datetime import date, datetime
+from pathlib import Path
+
+from bolsao_core.calendario import CalendarioBolsao
+from bolsao_core.carta import monta_contexto_carta
+from bolsao_core.fila_escrita import FilaEscrita
+from bolsao_core.relogio import TZ_BRASILIA
+from bolsao_core.replica import ConfigAba, ReplicaPlanilha
+from bolsao_core.resultados import ABA_RESULTADOS, RegistroResultados
+
+from benchmarks.dados_falsos import CABECALHO_RESULTADOS
+from benchmarks.planilha_falsa import ClienteFalso
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    planilha = ClienteFalso({
+        ABA_RESULTADOS: [CABECALHO_RESULTADOS],
+        "Bolsão": [["Data", "Hora", "Bolsão"], [date.today().strftime("%d/%m/%Y"), "09:00", "Bolsão Teste"]],
+    }).planilha
+    abas = {titulo: planilha.worksheet(titulo) for titulo in (ABA_RESULTADOS, "Bolsão")}  # como o lru_cache do app
+    with tempfile.TemporaryDirectory() as tmp:
+        replica = ReplicaPlanilha(Path(tmp) / "replica.sqlite3", abas.get,
+                                  [ConfigAba(ABA_RESULTADOS, coluna_id="REGISTRO_ID"), ConfigAba("Bolsão")])
+        fila = FilaEscrita(Path(tmp) / "fila.sqlite3", lambda: abas[ABA_RESULTADOS])
+        calendario = CalendarioBolsao(lambda: replica.linhas("Bolsão"), lambda: replica.versao("Bolsão"))
+        registro = RegistroResultados(replica, fila, calendario)
+
+        # Aquecimento: primeira leitura das abas (o app faz isso uma vez por processo)
+        registro.cabecalho()
+        calendario.nome_para(date.today())
+        planilha.chamadas.clear()
+
+        agora = datetime.now(TZ_BRASILIA)
+        for i in range(n):
+            ctx = monta_contexto_carta(f"Aluno {i}", "BANGU", "6º ano do EF2", "6º ao 8º Ano", 8, 7, agora.date())
+            registro.registra([(ctx, "BANGU", "6º ao 8º Ano")], usuario="bench", agora=agora)
+            fila.descarrega()  # um envio por carta: o pior caso da fila
+        por_carta = dict(planilha.chamadas)
+
+        planilha.chamadas.clear()
+        for i in range(n):
+            ctx = monta_contexto_carta(f"Lote {i}", "BANGU", "6º ano do EF2", "6º ao 8º Ano", 8, 7, agora.date())
+            registro.registra([(ctx, "BANGU", "6º ao 8º Ano")], usuario="bench", agora=agora)
+        while fila.descarrega():
+            pass
+        agrupado = dict(planilha.chamadas)
+
+    print(f"{n} cartas, envio a cada carta : {por_carta} -> {sum(por_carta.values()) / n:.2f} chamadas/carta")
+    print(f"{n} cartas, envio agrupado     : {agrupado} -> {sum(agrupado.values()) / n:.2f} chamadas/carta")
+    assert por_carta == {"append_rows": n}, "esperado exatamente um append_rows e nenhuma leitura por carta"
+    assert len(abas[ABA_RESULTADOS].linhas) == 1 + 2 * n
+
+
+if __name__ == "__main__":
+    main()
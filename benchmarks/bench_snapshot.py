@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Snapshot de 'Resultados_Bolsao' para o formulário: caminho antigo (lista de
+dicts em st.cache_data, que desserializa uma cópia a cada rerun, e filtros
+por list comprehension) contra o SnapshotAba em colunas, servido por
+referência, com o índice de facetas (unidade, bolsão) da versão.
+
+Relata memória do snapshot, custo por rerun (obter o snapshot + filtrar por
+unidade e bolsão + montar as opções) e o custo de atualizar após uma carta
+nova (delta) contra reconstruir tudo.
+
+Uso: python -m benchmarks.bench_snapshot [n_linhas]
+"""
+import pickle
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from bolsao_core.planilha import ABAS_REPLICADAS, COLUNAS_RESULTADOS_CATEGORICAS, abre_planilha
+from bolsao_core.replica import ReplicaPlanilha
+from bolsao_core.snapshot import SnapshotAba, filtra_ordena
+
+from benchmarks.dados_falsos import CABECALHO_RESULTADOS, abas_exemplo
+from benchmarks.planilha_falsa import ClienteFalso
+
+COLUNAS = tuple(c for c in CABECALHO_RESULTADOS if c not in ("Turma de Interesse", "Usuário"))
+RERUNS = 50
+
+
+def mede(fn, n=RERUNS):
+    tempos = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        tempos.append(time.perf_counter() - t0)
+    return statistics.median(tempos) * 1000
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 30000
+    cliente = ClienteFalso(abas_exemplo(n, 10))
+    wb = abre_planilha(cliente)
+    abas = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        replica = ReplicaPlanilha(Path(tmp) / "replica.sqlite3", lambda t: abas.setdefault(t, wb.worksheet(t)),
+                                  ABAS_REPLICADAS)
+        unidade = replica.colunas("Resultados_Bolsao", ("Unidade",))["Unidade"][0]
+
+        # Antigo: dicts por linha; o cache_data guarda pickle e devolve uma cópia por rerun
+        series = replica.colunas("Resultados_Bolsao", COLUNAS)
+        rows = [{c: series[c][i] for c in COLUNAS} for i in range(n)]
+        guardado = pickle.dumps(rows, protocol=pickle.HIGHEST_PROTOCOL)
+        tracemalloc.start()
+        copia = pickle.loads(guardado)
+        memoria_copia = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del copia
+
+        def rerun_antigo():
+            copia = pickle.loads(guardado)
+            rows_unit = [r for r in copia if r.get("Unidade") == unidade]
+            bolsoes = sorted({r.get("Bolsão") for r in rows_unit if r.get("Bolsão")})
+            filtradas = [r for r in rows_unit if r.get("Bolsão") == bolsoes[0]]
+            return {f"{r['Nome do Aluno']} ({r['REGISTRO_ID']})": r["REGISTRO_ID"] for r in filtradas}
+
+        # Novo: DataFrame em colunas, por referência
+        snap = SnapshotAba(replica, "Resultados_Bolsao", COLUNAS, facetas=COLUNAS_RESULTADOS_CATEGORICAS,
+                           coluna_ordem="Data/Hora")
+        snap.atual()
+        montagem = snap.ultima_montagem
+        t0 = time.perf_counter()
+        snap.indice(snap.atual())
+        montagem_indice = time.perf_counter() - t0
+
+        def rerun_novo():
+            atual = snap.atual()
+            indice = snap.indice(atual)
+            posicoes = indice.posicoes(unidade, indice.valores2[unidade][0])
+            nomes, ids = atual.colunas["Nome do Aluno"][posicoes], atual.colunas["REGISTRO_ID"][posicoes]
+            return {f"{a} ({rid})": rid for a, rid in zip(nomes, ids)}
+
+        def rerun_paginado(busca=""):
+            # Formulário atual: unidade inteira, busca, ordem por Data/Hora e uma página de 25
+            atual = snap.atual()
+            indice = snap.indice(atual)
+            encontradas = filtra_ordena(atual, indice.posicoes(unidade), busca, ("Nome do Aluno", "REGISTRO_ID"))
+            pagina = encontradas[:25]
+            return {f"{a} ({rid})": rid for a, rid in zip(atual.colunas["Nome do Aluno"][pagina],
+                                                         atual.colunas["REGISTRO_ID"][pagina])}
+
+        assert rerun_antigo() == rerun_novo()
+        t_antigo, t_novo = mede(rerun_antigo), mede(rerun_novo)
+        t_paginado, t_busca = mede(rerun_paginado), mede(lambda: rerun_paginado("ana silva"))
+
+        # Uma carta nova: delta no snapshot contra reconstruir tudo
+        linha = list(abas["Resultados_Bolsao"].linhas[1])
+        linha[CABECALHO_RESULTADOS.index("REGISTRO_ID")] = "bench-nova"
+        replica.aplica_linhas("Resultados_Bolsao", [linha])
+        snap.atual()
+        delta = snap.ultima_montagem
+        completo = SnapshotAba(replica, "Resultados_Bolsao", COLUNAS, facetas=COLUNAS_RESULTADOS_CATEGORICAS,
+                               coluna_ordem="Data/Hora")
+        completo.atual()
+        assert completo.atual().df.equals(snap.atual().df)
+        assert completo.atual().id_to_rownum == snap.atual().id_to_rownum
+        assert np.array_equal(completo.atual().ordem, snap.atual().ordem, equal_nan=True)
+
+    print(f"{n} linhas x {len(COLUNAS)} colunas")
+    print(f"memória    antigo: {len(guardado) / 1e6:.1f} MB em cache + {memoria_copia / 1e6:.1f} MB por cópia (rerun) · "
+          f"novo: {snap.memoria / 1e6:.1f} MB, uma vez para todas as sessões")
+    print(f"por rerun  antigo: {t_antigo:8.2f} ms · novo: {t_novo:8.2f} ms")
+    print(f"montagem   completa: {montagem * 1000:8.2f} ms · delta de 1 linha: {delta * 1000:8.2f} ms "
+          f"(reconstrução de conferência: {completo.ultima_montagem * 1000:.2f} ms)")
+    print(f"página de 25 da unidade, ordenada por Data/Hora: {t_paginado:.2f} ms · com busca: {t_busca:.2f} ms")
+    print(f"índice de facetas: {montagem_indice * 1000:.2f} ms por versão")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+Carga simulada de atendentes sobre a camada de dados do app, contra a
+planilha falsa (sem credenciais nem rede).
+
+Cada atendente é uma thread que alterna, com pausas entre as ações:
+gerar carta (registro na fila), buscar candidato no Hubspot, salvar o
+formulário básico e recarregar a lista de resultados. A réplica e a fila
+rodam com suas threads de fundo, como no app.
+
+Relata chamadas à API por método, 429 recebidos, latência p50/p99 por ação e
+vazão. A renderização do PDF fica de fora (ver bench_render). Com --sem-cota
+as chamadas vão direto à planilha, sem o LimitadorCota do app.
+
+Uso: python -m benchmarks.bench_trafego [--atendentes 8] [--duracao 20] [--latencia 0.15]
+                                         [--limite-minuto 300] [--prob-429 0.01] [--sem-cota]
+"""
+import argparse
+import random
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+from bolsao_core.busca import IndiceBusca
+from bolsao_core.calendario import CalendarioBolsao
+from bolsao_core.carta import TURMA_DE_INTERESSE_MAP, monta_contexto_carta
+from bolsao_core.cota import LimitadorCota, PlanilhaLimitada
+from bolsao_core.fila_escrita import FilaEscrita
+from bolsao_core.planilha import ABAS_REPLICADAS, abre_planilha, update_row_by_id
+from bolsao_core.precos import UNIDADES_LIMPAS
+from bolsao_core.relogio import TZ_BRASILIA
+from bolsao_core.replica import ReplicaPlanilha
+from bolsao_core.resultados import ABA_RESULTADOS, RegistroResultados
+
+from benchmarks.dados_falsos import NOMES, abas_exemplo
+from benchmarks.planilha_falsa import ClienteFalso, ConfigFalhas
+
+# Ação -> peso no sorteio (proporções aproximadas de um dia de bolsão)
+MIX = {"carta": 40, "busca": 35, "formulario": 20, "recarregar": 5}
+
+
+class Camada:
+    """As mesmas peças que o app monta com st.cache_resource, ligadas à planilha falsa."""
+
+    def __init__(self, cliente: ClienteFalso, pasta: Path, intervalo_sync: float, limitador: LimitadorCota | None):
+        wb = abre_planilha(cliente)
+        if limitador:
+            wb = PlanilhaLimitada(wb, limitador)
+        self.obter_ws = lru_cache(maxsize=32)(wb.worksheet)
+        self.replica = ReplicaPlanilha(pasta / "replica.sqlite3", self.obter_ws, ABAS_REPLICADAS,
+                                       intervalo_sync=intervalo_sync)
+        self.fila = FilaEscrita(pasta / "fila.sqlite3", lambda: self.obter_ws(ABA_RESULTADOS))
+        self.calendario = CalendarioBolsao(lambda: self.replica.linhas("Bolsão"),
+                                           lambda: self.replica.versao("Bolsão"))
+        self.registro = RegistroResultados(self.replica, self.fila, self.calendario)
+        self._indice = (None, None)
+        self._lock = threading.Lock()
+
+    def indice_hubspot(self) -> IndiceBusca:
+        versao = self.replica.versao("Hubspot")
+        with self._lock:
+            if self._indice[0] != versao:
+                nomes = self.replica.colunas("Hubspot", ("Nome do Candidato",))["Nome do Candidato"]
+                self._indice = (versao, IndiceBusca(nomes))
+            return self._indice[1]
+
+
+def acao(camada: Camada, nome: str, rng: random.Random):
+    if nome == "carta":
+        agora = datetime.now(TZ_BRASILIA)
+        turma = rng.choice(list(TURMA_DE_INTERESSE_MAP))
+        serie = TURMA_DE_INTERESSE_MAP[turma]
+        unidade = rng.choice(UNIDADES_LIMPAS)
+        ctx = monta_contexto_carta(f"{rng.choice(NOMES)} Bench", unidade, turma, serie,
+                                   rng.randint(0, 5), rng.randint(0, 5), agora.date())
+        camada.registro.registra([(ctx, unidade, serie)], usuario="bench", agora=agora)
+    elif nome == "busca":
+        camada.indice_hubspot().busca(rng.choice(NOMES)[: rng.randint(2, 5)])
+    elif nome == "formulario":
+        hmap = camada.replica.header_map(ABA_RESULTADOS)
+        linhas = camada.replica.linhas(ABA_RESULTADOS)
+        i = rng.randrange(len(linhas) - camada.replica.n_pendentes(ABA_RESULTADOS))
+        reg_id = linhas[i][hmap["REGISTRO_ID"] - 1]
+        valores = {"Escola de Origem": "Escola Bench", "Aluno Matriculou?": rng.choice(("Sim", "Não")),
+                   "Observações (Form)": f"obs {rng.random():.4f}"}
+        rownum = update_row_by_id(camada.obter_ws(ABA_RESULTADOS), hmap["REGISTRO_ID"], reg_id, i + 2,
+                                  {hmap[c]: v for c, v in valores.items()})
+        if rownum == i + 2:
+            camada.replica.aplica_celulas(ABA_RESULTADOS, rownum, valores)
+        else:
+            camada.replica.sincroniza(ABA_RESULTADOS, total=True)
+    elif nome == "recarregar":
+        camada.replica.sincroniza(ABA_RESULTADOS, total=True)
+
+
+def atendente(camada: Camada, fim: float, pausa: float, semente: int, medidas: dict, falhas: dict):
+    rng = random.Random(semente)
+    nomes, pesos = list(MIX), list(MIX.values())
+    while time.monotonic() < fim:
+        nome = rng.choices(nomes, pesos)[0]
+        t0 = time.perf_counter()
+        try:
+            acao(camada, nome, rng)
+            medidas[nome].append(time.perf_counter() - t0)
+        except Exception as e:
+            falhas[(nome, type(e).__name__)] += 1
+        time.sleep(rng.expovariate(1 / pausa) if pausa else 0)
+
+
+def percentil(valores: list, p: float):
+    return valores[min(len(valores) - 1, int(p * len(valores)))] if valores else float("nan")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--atendentes", type=int, default=8)
+    parser.add_argument("--duracao", type=float, default=20.0, help="segundos de carga")
+    parser.add_argument("--pausa", type=float, default=0.5, help="pausa média entre ações de um atendente (s)")
+    parser.add_argument("--latencia", type=float, default=0.15, help="latência de cada requisição (s)")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--limite-minuto", type=int, default=300, help="cota de requisições/min (0 = sem cota)")
+    parser.add_argument("--prob-429", type=float, default=0.0)
+    parser.add_argument("--intervalo-sync", type=float, default=5.0, help="intervalo da réplica (s)")
+    parser.add_argument("--resultados", type=int, default=3000)
+    parser.add_argument("--hubspot", type=int, default=5000)
+    parser.add_argument("--sem-cota", action="store_true", help="não usa o LimitadorCota")
+    args = parser.parse_args()
+
+    falhas_cfg = ConfigFalhas(latencia=args.latencia, jitter=args.jitter, limite_por_minuto=args.limite_minuto or None,
+                              prob_429=args.prob_429, semente=1)
+    cliente = ClienteFalso(abas_exemplo(args.resultados, args.hubspot), falhas_cfg)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Cota do limitador igual à da planilha falsa, dividida entre leituras e escritas
+        cota = args.limite_minuto // 2 if args.limite_minuto else 10**6
+        limitador = None if args.sem_cota else LimitadorCota(cota, cota)
+        camada = Camada(cliente, Path(tmp), args.intervalo_sync, limitador)
+        # Partida a frio: primeira leitura de cada aba, fora da medição
+        for cfg in ABAS_REPLICADAS:
+            camada.replica.versao(cfg.titulo)
+        camada.replica.iniciar()
+        camada.fila.iniciar()
+        chamadas_partida = sum(cliente.chamadas.values())
+        cliente.chamadas.clear()
+
+        medidas, falhas = defaultdict(list), defaultdict(int)
+        fim = time.monotonic() + args.duracao
+        threads = [
+            threading.Thread(target=atendente, args=(camada, fim, args.pausa, i, medidas, falhas))
+            for i in range(args.atendentes)
+        ]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        decorrido = time.perf_counter() - t0
+
+        limite_dreno = time.monotonic() + 30
+        while camada.fila.status()["profundidade"] and time.monotonic() < limite_dreno:
+            time.sleep(0.2)
+        fila = camada.fila.status()
+
+    total_acoes = sum(len(v) for v in medidas.values())
+    chamadas = dict(cliente.chamadas)
+    print(f"{args.atendentes} atendentes · {decorrido:.1f} s · latência simulada {args.latencia * 1000:.0f} ms "
+          f"· cota {args.limite_minuto or '-'}/min · 429 aleatório {args.prob_429:.1%}")
+    print(f"partida a frio: {chamadas_partida} chamadas")
+    print(f"{'ação':<12} {'n':>6} {'p50 ms':>9} {'p99 ms':>9}")
+    for nome in MIX:
+        valores = sorted(medidas[nome])
+        print(f"{nome:<12} {len(valores):>6} {percentil(valores, 0.5) * 1000:>9.2f} {percentil(valores, 0.99) * 1000:>9.2f}")
+    print(f"vazão: {total_acoes / decorrido:.1f} ações/s")
+    print(f"chamadas à API: {sum(chamadas.values())} ({sum(chamadas.values()) / max(total_acoes, 1):.3f} por ação) {chamadas}")
+    print(f"429 recebidos: {cliente.planilha.erros_429}")
+    if limitador:
+        print(f"limitador: {limitador.status()}")
+    print(f"fila: {fila['total_enviado']} linhas enviadas, {fila['profundidade']} pendentes, "
+          f"{fila['tentativas']} tentativas em curso")
+    print(f"réplica: {camada.replica.leituras_descartadas} leituras descartadas por escrita local durante a sync")
+    for (nome, erro), n in sorted(falhas.items()):
+        print(f"falhas {nome}/{erro}: {n}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Abas de exemplo para a planilha falsa (benchmarks.planilha_falsa), com o
+mesmo cabeçalho das abas reais e volume parecido com o de produção.
+"""
+import random
+from datetime import date, timedelta
+
+from bolsao_core.carta import TURMA_DE_INTERESSE_MAP
+from bolsao_core.planilha import COLUNAS_HUBSPOT
+from bolsao_core.precos import UNIDADES_COMPLETAS
+
+CABECALHO_RESULTADOS = [
+    "Data/Hora", "Nome do Aluno", "Unidade", "Turma de Interesse", "Acertos Matemática", "Acertos Português",
+    "Total de Acertos", "% Bolsa", "Série / Modalidade", "Valor Anuidade à Vista", "Valor da 1ª Cota",
+    "Valor da Mensalidade com Bolsa", "Usuário", "Bolsão", "REGISTRO_ID", "Escola de Origem",
+    "Responsável Financeiro", "Telefone", "Valor Negociado", "Aluno Matriculou?", "Observações (Form)",
+]
+
+NOMES = ("Ana", "Bruno", "Carla", "Diego", "Eduarda", "Felipe", "Gabriela", "Henrique", "Isabela", "João")
+SOBRENOMES = ("Silva", "Souza", "Oliveira", "Santos", "Pereira", "Lima", "Costa", "Almeida", "Ribeiro", "Gomes")
+
+
+def abas_exemplo(n_resultados: int = 3000, n_hubspot: int = 5000, semente: int = 42) -> dict[str, list[list]]:
+    rng = random.Random(semente)
+    hoje = date.today()
+    turmas = list(TURMA_DE_INTERESSE_MAP)
+
+    def nome():
+        return f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}"
+
+    resultados = [CABECALHO_RESULTADOS]
+    for i in range(n_resultados):
+        dia = hoje - timedelta(days=rng.randint(0, 90))
+        turma = rng.choice(turmas)
+        mat, port = rng.randint(0, 12), rng.randint(0, 12)
+        resultados.append([
+            f"{dia:%d/%m/%Y} 10:{i % 60:02d}:00", nome(), rng.choice(UNIDADES_COMPLETAS), turma, mat, port,
+            mat + port, f"{rng.choice((30, 40, 50, 60))}%", TURMA_DE_INTERESSE_MAP[turma], "", "", "",
+            "bench", "Bolsão Exemplo", f"{i:012x}",
+        ])
+
+    hubspot = [list(COLUNAS_HUBSPOT)]
+    for i in range(n_hubspot):
+        n = nome()
+        hubspot.append([
+            rng.choice(UNIDADES_COMPLETAS), n, str(100000 + i), rng.choice(("Novo", "Em contato", "Convertido")),
+            rng.choice(("Sim", "Não")), "", f"(21) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+            n.split()[0], f"{n.split()[0].lower()}{i}@exemplo.com", rng.choice(turmas), "Site",
+        ])
+
+    bolsao = [["Data", "Horário", "Bolsão"]]
+    for d in range(-30, 30, 7):
+        bolsao.append([(hoje + timedelta(days=d)).strftime("%d/%m/%Y"), "09:00", f"Bolsão {d + 30:02d}"])
+
+    return {"Resultados_Bolsao": resultados, "Hubspot": hubspot, "Bolsão": bolsao}
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""
+Google Sheets falso, em memória, para rodar a camada de dados sem credenciais.
+
+Implementa a parte da API do gspread que o app usa (cliente -> planilha ->
+aba): worksheet, row_values, col_values, get, get_all_values, append_row(s),
+values_batch_get, values_batch_update e resize. Cada requisição passa por
+`ConfigFalhas`, que simula latência, cota por minuto (429 como o Google) e
+429 aleatório, e é contada em `chamadas`.
+
+    cliente = ClienteFalso({"Resultados_Bolsao": [cabecalho, *linhas]}, ConfigFalhas(latencia=0.15))
+    ws = abre_planilha(cliente).worksheet("Resultados_Bolsao")
+"""
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+
+_RE_CELULA = re.compile(r"^([A-Za-z]*)(\d*)$")
+
+
+def _indice_coluna(letras: str) -> int:
+    indice = 0
+    for c in letras.upper():
+        indice = indice * 26 + ord(c) - 64
+    return indice
+
+
+def _letras(col: int) -> str:
+    letras = ""
+    while col > 0:
+        col, resto = divmod(col - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def separa_aba(faixa: str) -> tuple[str | None, str]:
+    """"'Aba X'!A1:B2" -> ("Aba X", "A1:B2"); sem '!' a aba é None."""
+    if "!" not in faixa:
+        return None, faixa
+    titulo, a1 = faixa.rsplit("!", 1)
+    if titulo.startswith("'") and titulo.endswith("'"):
+        titulo = titulo[1:-1].replace("''", "'")
+    return titulo, a1
+
+
+def interpreta_a1(a1: str) -> tuple[int, int, int | None, int | None]:
+    """'B2:D' -> (linha1, col1, linha2, col2), 1-based; None = até o fim da aba."""
+    inicio, _, fim = a1.partition(":")
+    m1, m2 = _RE_CELULA.match(inicio), _RE_CELULA.match(fim or inicio)
+    if not m1 or not m2:
+        raise ValueError(f"Faixa A1 inválida: {a1!r}")
+    l1 = int(m1.group(2)) if m1.group(2) else 1
+    c1 = _indice_coluna(m1.group(1)) if m1.group(1) else 1
+    l2 = int(m2.group(2)) if m2.group(2) else None
+    c2 = _indice_coluna(m2.group(1)) if m2.group(1) else None
+    return l1, c1, l2, c2
+
+
+class RespostaFalsa:
+    """O suficiente de requests.Response para gspread.exceptions.APIError e fila_escrita.status_http."""
+
+    def __init__(self, status_code: int, mensagem: str):
+        self.status_code = status_code
+        self.text = mensagem
+        self._json = {"error": {"code": status_code, "message": mensagem, "status": "RESOURCE_EXHAUSTED"}}
+
+    def json(self):
+        return self._json
+
+
+def erro_api(status_code: int, mensagem: str) -> Exception:
+    from gspread.exceptions import APIError
+
+    return APIError(RespostaFalsa(status_code, mensagem))
+
+
+@dataclass
+class ConfigFalhas:
+    latencia: float = 0.0                  # segundos por requisição
+    jitter: float = 0.0                    # variação uniforme somada à latência
+    limite_por_minuto: int | None = None   # cota de requisições por minuto (None = sem cota)
+    prob_429: float = 0.0                  # chance de 429 espontâneo em cada requisição
+    semente: int | None = None
+
+
+class ClienteFalso:
+    """Substitui o cliente do gspread: open_by_url/open_by_key devolvem sempre a mesma planilha."""
+
+    def __init__(self, abas: dict[str, list[list]] | None = None, falhas: ConfigFalhas | None = None):
+        self.planilha = PlanilhaFalsa(abas or {}, falhas or ConfigFalhas())
+
+    def open_by_url(self, url):
+        return self.planilha
+
+    def open_by_key(self, chave):
+        return self.planilha
+
+    @property
+    def chamadas(self) -> Counter:
+        return self.planilha.chamadas
+
+
+class PlanilhaFalsa:
+    def __init__(self, abas: dict[str, list[list]], falhas: ConfigFalhas):
+        self.falhas = falhas
+        self.chamadas = Counter()
+        self.erros_429 = 0
+        self._lock = threading.RLock()
+        self._janela = deque()  # instantes das requisições do último minuto
+        self._rng = random.Random(falhas.semente)
+        self._abas = {titulo: AbaFalsa(self, titulo, [list(l) for l in linhas]) for titulo, linhas in abas.items()}
+
+    # ---------------- simulação de rede ----------------
+    def requisicao(self, metodo: str):
+        """Conta a chamada, aplica latência e levanta 429 se a cota estourar ou se for sorteado."""
+        cfg = self.falhas
+        with self._lock:
+            self.chamadas[metodo] += 1
+            agora = time.monotonic()
+            while self._janela and agora - self._janela[0] >= 60:
+                self._janela.popleft()
+            estourou = cfg.limite_por_minuto is not None and len(self._janela) >= cfg.limite_por_minuto
+            sorteado = cfg.prob_429 > 0 and self._rng.random() < cfg.prob_429
+            if not estourou:
+                self._janela.append(agora)
+            espera = cfg.latencia + (self._rng.uniform(0, cfg.jitter) if cfg.jitter else 0)
+        if espera:
+            time.sleep(espera)
+        if estourou or sorteado:
+            with self._lock:
+                self.erros_429 += 1
+            raise erro_api(429, "Quota exceeded for quota metric 'Read requests' (planilha falsa).")
+
+    # ---------------- API de planilha ----------------
+    def worksheet(self, titulo: str):
+        self.requisicao("worksheet")
+        with self._lock:
+            if titulo not in self._abas:
+                from gspread.exceptions import WorksheetNotFound
+
+                raise WorksheetNotFound(titulo)
+            return self._abas[titulo]
+
+    def worksheets(self):
+        self.requisicao("worksheets")
+        return list(self._abas.values())
+
+    def adiciona_aba(self, titulo: str, linhas: list[list] | None = None):
+        """Utilitário de preparo (não conta como requisição)."""
+        with self._lock:
+            aba = self._abas[titulo] = AbaFalsa(self, titulo, [list(l) for l in linhas or []])
+            return aba
+
+    def _aba_da_faixa(self, faixa: str):
+        titulo, a1 = separa_aba(faixa)
+        if titulo not in self._abas:
+            raise erro_api(400, f"Unable to parse range: {faixa}")
+        return self._abas[titulo], a1
+
+    def values_batch_get(self, faixas, params=None):
+        self.requisicao("values_batch_get")
+        colunas = (params or {}).get("majorDimension") == "COLUMNS"
+        with self._lock:
+            resposta = []
+            for faixa in faixas:
+                aba, a1 = self._aba_da_faixa(faixa)
+                valores = aba.le(a1, colunas=colunas)
+                item = {"range": faixa, "majorDimension": "COLUMNS" if colunas else "ROWS"}
+                if valores:
+                    item["values"] = valores
+                resposta.append(item)
+        return {"valueRanges": resposta}
+
+    def values_batch_update(self, body):
+        self.requisicao("values_batch_update")
+        with self._lock:
+            celulas = 0
+            for item in body.get("data", []):
+                aba, a1 = self._aba_da_faixa(item["range"])
+                celulas += aba.escreve(a1, item.get("values", [[]]))
+        return {"totalUpdatedCells": celulas}
+
+
+class AbaFalsa:
+    def __init__(self, planilha: PlanilhaFalsa, titulo: str, linhas: list[list]):
+        self.spreadsheet = planilha
+        self.title = titulo
+        self.linhas = linhas
+        self.row_count = max(1000, len(linhas))
+        self.col_count = max(26, max((len(l) for l in linhas), default=0))
+
+    # ---------------- acesso interno (sem contar requisição) ----------------
+    def le(self, a1: str, colunas: bool = False) -> list[list]:
+        l1, c1, l2, c2 = interpreta_a1(a1)
+        l2 = min(l2 or len(self.linhas), len(self.linhas))
+        c2 = c2 or self.col_count
+        bloco = [[v for v in self.linhas[i][c1 - 1:c2]] for i in range(l1 - 1, l2)]
+        if colunas:
+            largura = max((len(l) for l in bloco), default=0)
+            bloco = [[l[j] if j < len(l) else "" for l in bloco] for j in range(largura)]
+        # Como a API real: sem células vazias no fim das linhas nem linhas vazias no fim
+        bloco = [_apara(l) for l in bloco]
+        while bloco and not bloco[-1]:
+            bloco.pop()
+        return bloco
+
+    def escreve(self, a1: str, valores: list[list]) -> int:
+        l1, c1, _, _ = interpreta_a1(a1)
+        celulas = 0
+        for di, linha in enumerate(valores):
+            i = l1 - 1 + di
+            while len(self.linhas) <= i:
+                self.linhas.append([])
+            destino = self.linhas[i]
+            for dj, valor in enumerate(linha):
+                j = c1 - 1 + dj
+                if len(destino) <= j:
+                    destino.extend([""] * (j + 1 - len(destino)))
+                destino[j] = valor
+                celulas += 1
+        self.row_count = max(self.row_count, len(self.linhas))
+        return celulas
+
+    # ---------------- API de aba ----------------
+    def row_values(self, linha: int, value_render_option=None):
+        self.spreadsheet.requisicao("row_values")
+        with self.spreadsheet._lock:
+            return _apara(self.linhas[linha - 1]) if linha <= len(self.linhas) else []
+
+    def col_values(self, col: int, value_render_option=None):
+        self.spreadsheet.requisicao("col_values")
+        with self.spreadsheet._lock:
+            valores = [l[col - 1] if col - 1 < len(l) else "" for l in self.linhas]
+            return _apara(valores)
+
+    def get(self, faixa: str, value_render_option=None, **kwargs):
+        self.spreadsheet.requisicao("get")
+        with self.spreadsheet._lock:
+            return self.le(separa_aba(faixa)[1])
+
+    def get_all_values(self, **kwargs):
+        self.spreadsheet.requisicao("get_all_values")
+        with self.spreadsheet._lock:
+            return [list(l) for l in self.linhas]
+
+    def append_row(self, valores, value_input_option=None, **kwargs):
+        return self.append_rows([valores], value_input_option=value_input_option, _metodo="append_row")
+
+    def append_rows(self, linhas, value_input_option=None, _metodo="append_rows", **kwargs):
+        self.spreadsheet.requisicao(_metodo)
+        with self.spreadsheet._lock:
+            # A API acrescenta depois da última linha com conteúdo
+            while self.linhas and not any(str(v) for v in self.linhas[-1]):
+                self.linhas.pop()
+            inicio = len(self.linhas) + 1
+            self.linhas.extend(list(l) for l in linhas)
+            self.row_count = max(self.row_count, len(self.linhas))
+            self.col_count = max(self.col_count, max((len(l) for l in linhas), default=0))
+            fim = len(self.linhas)
+        return {"updates": {"updatedRange": f"'{self.title}'!A{inicio}:{_letras(self.col_count)}{fim}",
+                            "updatedRows": len(linhas)}}
+
+    def resize(self, rows=None, cols=None):
+        self.spreadsheet.requisicao("resize")
+        with self.spreadsheet._lock:
+            if rows is not None:
+                self.row_count = rows
+                del self.linhas[rows:]
+            if cols is not None:
+                self.col_count = cols
+                for linha in self.linhas:
+                    del linha[cols:]
+
+
+def _apara(valores: list) -> list:
+    fim = len(valores)
+    while fim and valores[fim - 1] in ("", None):
+        fim -= 1
+    return list(valores[:fim])
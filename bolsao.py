@@ -6,42 +6,60 @@ Aplicação Streamlit que gera cartas, gerencia negociações e ativações de b
 utilizando WeasyPrint para PDF e Pandas para manipulação de dados.
 """
 import io
-import re
-import uuid
-from datetime import date, timedelta, datetime
+import time
+from datetime import date
 from functools import lru_cache
 from pathlib import Path
 
-import gspread
 import pandas as pd
 import streamlit as st
-import weasyprint
-from google.oauth2.service_account import Credentials
-import requests
-import pytz
+
+from bolsao_core import DADOS_DIR
+from bolsao_core.busca import IndiceBusca, so_digitos
+from bolsao_core.calendario import CalendarioBolsao
+from bolsao_core.carta import (
+    COLUNAS_LOTE, SERIE_TO_TURMA_MAP, TURMA_DE_INTERESSE_MAP, format_currency, format_phone_mask,
+    le_planilha_lote, max_acertos_por_materia, monta_contexto_carta, nome_arquivo_carta, parse_brl_to_float,
+    prepara_lote,
+)
+from bolsao_core.cota import LimitadorCota, PlanilhaLimitada
+from bolsao_core.fila_escrita import FilaEscrita
+from bolsao_core.planilha import (
+    ABAS_REPLICADAS, COLUNAS_HUBSPOT, COLUNAS_RESULTADOS_CATEGORICAS, RegistroNaoEncontrado, abre_planilha, conecta, dataframe_hubspot, ensure_size,
+    update_row_by_id,
+)
+from bolsao_core.precos import (
+    TABELA_PRECOS, TUITION, UNIDADES_LIMPAS, UNIDADES_MAP, calcula_bolsa, calcula_valor_minimo, precos_2026,
+)
+from bolsao_core.relogio import RelogioBrasilia
+from bolsao_core.replica import ReplicaPlanilha
+from bolsao_core.resultados import RegistroResultados
+from bolsao_core.snapshot import Snapshot, SnapshotAba, filtra_ordena, texto_data_hora
+from bolsao_core.render import FilaRenderCheia, PoolRenderizacao, empacota_zip
 
 # --------------------------------------------------
 # UTILITÁRIOS DE ACESSO AO GOOGLE SHEETS (OTIMIZADOS)
 # --------------------------------------------------
-SPREAD_URL = "https://docs.google.com/spreadsheets/d/1qBV70qrPswnAUDxnHfBgKEU4FYAISpL7iVP0IM9zU2Q/edit#gid=0"
-
 @st.cache_resource
 def get_gspread_client():
     """Conecta ao Google Sheets usando os segredos do Streamlit e faz cache da conexão."""
     try:
-        scope = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
-        creds = Credentials.from_service_account_info(st.secrets["gcp_service_account"], scopes=scope)
-        return gspread.authorize(creds)
+        return conecta(st.secrets["gcp_service_account"])
     except Exception as e:
         st.error(f"❌ Erro de autenticação com o Google Sheets: {e}")
         return None
 
+@st.cache_resource
+def get_limitador():
+    """Cota da API do Sheets compartilhada por todas as sessões (BOLSAO_COTA_LEITURAS/ESCRITAS)."""
+    return LimitadorCota.do_ambiente()
+
 @st.cache_resource
 def get_workbook(_client):
-    """Abre a planilha e faz cache do objeto."""
+    """Abre a planilha e faz cache do objeto; toda chamada feita a partir dele respeita a cota."""
     if not _client:
         return None
-    return _client.open_by_url(SPREAD_URL)
+    return PlanilhaLimitada(abre_planilha(_client), get_limitador())
 
 @lru_cache(maxsize=32)
 def get_ws(title: str):
@@ -49,338 +67,86 @@ def get_ws(title: str):
     client = get_gspread_client()
     wb = get_workbook(client)
     if wb:
+        from gspread import WorksheetNotFound  # já carregado por get_gspread_client()
         try:
             return wb.worksheet(title)
-        except gspread.WorksheetNotFound:
+        except WorksheetNotFound:
             st.error(f"Aba da planilha com o nome '{title}' não foi encontrada.")
             return None
     return None
 
-@lru_cache(maxsize=32)
+@st.cache_resource
+def get_replica():
+    """Réplica local (memória + SQLite) das abas lidas pelo app, sincronizada em segundo plano."""
+    if not get_gspread_client():
+        return None
+    return ReplicaPlanilha(DADOS_DIR / "replica.sqlite3", get_ws, ABAS_REPLICADAS).iniciar()
+
 def header_map(ws_title: str):
     """Cria um mapa de 'nome_da_coluna': indice para uma dada aba."""
+    replica = get_replica()
+    if replica and ws_title in replica.abas:
+        try:
+            return replica.header_map(ws_title)
+        except Exception:
+            return {}
     ws = get_ws(ws_title)
     if ws:
         headers = ws.row_values(1)
         return {h.strip(): i + 1 for i, h in enumerate(headers) if h and h.strip()}
     return {}
 
-def get_values(ws, a1_range: str):
-    """Leitura enxuta por range; muito mais barato que get_all_records()."""
-    return ws.get(a1_range, value_render_option="UNFORMATTED_VALUE")
-
-def find_row_by_id(ws, id_col_idx: int, target_id: str):
-    """Evita ws.find repetido. Carrega a coluna de IDs 1x e busca em memória."""
-    try:
-        col_values = ws.col_values(id_col_idx)[1:]  # ignora header
-        for i, value in enumerate(col_values, start=2):
-            if str(value) == str(target_id):
-                return i
-    except Exception:
-        return None
-    return None
-
-def batch_update_cells(ws, updates):
-    """
-    Executa múltiplas atualizações de células em uma única requisição.
-    Aceita 'range' em A1 simples (ex.: 'Q446') ou completo (ex.: 'Resultados_Bolsao!Q446').
-    Prefixa o nome da aba quando necessário para evitar cair na aba errada (ex.: 'Limites').
-    """
-    if not updates:
-        return
-
-    fixed = []
-    sheet_title_safe = ws.title.replace("'", "''")  # escapa apóstrofos
-
-    for u in updates:
-        rng = u.get("range", "")
-        if not rng:
-            continue
-        if "!" not in rng:  # range sem nome de aba
-            rng = f"'{sheet_title_safe}'!{rng}"
-        fixed.append({"range": rng, "values": u.get("values", [[]])})
-
-    body = {"valueInputOption": "USER_ENTERED", "data": fixed}
-    ws.spreadsheet.values_batch_update(body)
+@st.cache_resource
+def get_fila_resultados():
+    """Fila write-behind (SQLite + thread de fundo) para as linhas de 'Resultados_Bolsao'."""
+    return FilaEscrita(DADOS_DIR / "fila_resultados.sqlite3", lambda: get_ws("Resultados_Bolsao")).iniciar()
 
-def ensure_size(ws, min_rows=2000, min_cols=40):
-    """Garante tamanho mínimo para evitar 'exceeds grid limits'."""
-    try:
-        if ws and (ws.row_count < min_rows or ws.col_count < min_cols):
-            ws.resize(rows=max(ws.row_count, min_rows), cols=max(ws.col_count, min_cols))
-    except Exception:
-        pass
-
-def new_uuid():
-    """Gera um ID único e curto."""
-    return uuid.uuid4().hex[:12]
-
-def a1_col_letter(col_idx: int) -> str:
-    """Converte índice numérico de coluna (1=A, 2=B, ...) para letra A1."""
-    return re.sub(r"\d", "", gspread.utils.rowcol_to_a1(1, col_idx))
-
-def batch_get_values_prefixed(ws, ranges, value_render_option="UNFORMATTED_VALUE"):
-    """Batch GET em várias faixas A1, sempre prefixando com o nome da aba."""
-    if not ranges:
-        return []
-    title_safe = ws.title.replace("'", "''")
-    prefixed = [f"'{title_safe}'!{r}" if "!" not in r else r for r in ranges]
-    params = {'valueRenderOption': value_render_option}
-    resp = ws.spreadsheet.values_batch_get(prefixed, params=params)
-    return resp.get("valueRanges", [])
-
-@st.cache_data(ttl=300)
-def load_resultados_snapshot(columns_needed: tuple[str, ...]):
+@st.cache_resource
+def get_snapshot_resultados(columns_needed: tuple[str, ...]):
     """
-    Faz UMA leitura (batch get) das colunas necessárias de 'Resultados_Bolsao' e
-    retorna um snapshot cacheado com rows (dicts) e id_to_rownum.
+    Snapshot das colunas necessárias de 'Resultados_Bolsao' (DataFrame em
+    colunas e id_to_rownum), um só para todas as sessões, servido por referência. Acompanha a versão da réplica
+    aplicando apenas as linhas que mudaram, sem reler a aba inteira.
     """
-    ws = get_ws("Resultados_Bolsao")
-    if not ws:
-        return {"rows": [], "id_to_rownum": {}}
-
-    hmap = header_map("Resultados_Bolsao")
-    missing = [c for c in columns_needed if c not in hmap]
-    if missing:
-        raise RuntimeError(f"Faltam colunas em 'Resultados_Bolsao': {', '.join(missing)}")
-
-    letters = {c: a1_col_letter(hmap[c]) for c in columns_needed}
-    ranges = [f"{letters[c]}2:{letters[c]}" for c in columns_needed]
-
-    vranges = batch_get_values_prefixed(ws, ranges)
-    series = {}
-    for c, vr in zip(columns_needed, vranges):
-        vals = vr.get("values", [])
-        series[c] = [row[0] if row else "" for row in vals]
-
-    max_len = max((len(v) for v in series.values()), default=0)
-    for c in columns_needed:
-        col = series[c]
-        if len(col) < max_len:
-            col.extend([""] * (max_len - len(col)))
-
-    rows = [{c: series[c][i] for c in columns_needed} for i in range(max_len)]
-
-    id_to_rownum = {}
-    for i, rid in enumerate(series.get("REGISTRO_ID", []), start=2):
-        if rid:
-            id_to_rownum[str(rid)] = i
-
-    return {"rows": rows, "id_to_rownum": id_to_rownum}
-
-# --------------------------------------------------
-# DADOS DE REFERÊNCIA E CONFIGURAÇÕES (ATUALIZADOS)
-# --------------------------------------------------
-BOLSA_MAP = {
-    0: .30, 1: .30, 2: .30, 3: .35, 4: .40, 5: .40, 6: .44, 7: .45, 8: .46, 9: .47,
-    10: .48, 11: .49, 12: .50, 13: .51, 14: .52, 15: .53, 16: .54, 17: .55, 18: .56, 19: .57,
-    20: .60, 21: .65, 22: .70, 23: .80, 24: 1.00,
-}
-
-# --- DICIONÁRIO TUITION ATUALIZADO ---
-TUITION = {
-    "1ª e 2ª Série EM Militar": {"anuidade": 36670.00, "parcela13": 2820.77},
-    "1ª e 2ª Série EM Vestibular": {"anuidade": 36670.00, "parcela13": 2820.77},
-    "1º ao 5º Ano": {"anuidade": 26654.00, "parcela13": 2050.31},
-    "3ª Série (PV/PM)": {"anuidade": 36812.00, "parcela13": 2831.69},
-    "3ª Série EM Medicina": {"anuidade": 36812.00, "parcela13": 2831.69},
-    "6º ao 8º Ano": {"anuidade": 31354.00, "parcela13": 2411.85},
-    "9º Ano EF II Militar": {"anuidade": 34146.00, "parcela13": 2626.62},
-    "9º Ano EF II Vestibular": {"anuidade": 34146.00, "parcela13": 2626.62},
-    "AFA/EN/EFOMM": {"anuidade": 14802.00, "parcela13": 1138.62},
-    "CN/EPCAr": {"anuidade": 8863.00, "parcela13": 681.77},
-    "ESA": {"anuidade": 7145.00, "parcela13": 549.62},
-    "EsPCEx": {"anuidade": 14802.00, "parcela13": 1138.62},
-    "IME/ITA": {"anuidade": 14802.00, "parcela13": 1138.62},
-    "Medicina (Pré)": {"anuidade": 14802.00, "parcela13": 1138.62},
-    "Pré-Vestibular": {"anuidade": 14802.00, "parcela13": 1138.62},
-}
-
-TURMA_DE_INTERESSE_MAP = {
-    "1ª série IME ITA Jr": "1ª e 2ª Série EM Militar",
-    "1ª série do EM - Militar": "1ª e 2ª Série EM Militar",
-    "1ª série do EM - Pré-Vestibular": "1ª e 2ª Série EM Vestibular",
-    "1º ano do EF1": "1º ao 5º Ano",
-    "2ª série IME ITA Jr": "1ª e 2ª Série EM Militar",
-    "2ª série do EM - Militar": "1ª e 2ª Série EM Militar",
-    "2ª série do EM - Pré-Vestibular": "1ª e 2ª Série EM Vestibular",
-    "2º ano do EF1": "1º ao 5º Ano",
-    "3ª série do EM - AFA EN EFOMM": "3ª Série (PV/PM)",
-    "3ª série do EM - ESA": "3ª Série (PV/PM)",
-    "3ª série do EM - EsPCEx": "3ª Série (PV/PM)",
-    "3ª série do EM - IME ITA": "3ª Série (PV/PM)",
-    "3ª série do EM - Medicina": "3ª Série EM Medicina",
-    "3ª série do EM - Pré-Vestibular": "3ª Série (PV/PM)",
-    "3º ano do EF1": "1º ao 5º Ano",
-    "4º ano do EF1": "1º ao 5º Ano",
-    "5º ano do EF1": "1º ao 5º Ano",
-    "6º ano do EF2": "6º ao 8º Ano",
-    "7º ano do EF2": "6º ao 8º Ano",
-    "8º ano do EF2": "6º ao 8º Ano",
-    "9º ano do EF2 - Militar": "9º Ano EF II Militar",
-    "9º ano do EF2 - Vestibular": "9º Ano EF II Vestibular",
-    "Pré-Militar AFA EN EFOMM": "AFA/EN/EFOMM",
-    "Pré-Militar CN EPCAr": "CN/EPCAr",
-    "Pré-Militar ESA": "ESA",
-    "Pré-Militar EsPCEx": "EsPCEx",
-    "Pré-Militar IME ITA": "IME/ITA",
-    "Pré-Vestibular": "Pré-Vestibular",
-    "Pré-Vestibular - Medicina": "Medicina (Pré)",
-}
-SERIE_TO_TURMA_MAP = {v: k for k, v in reversed(list(TURMA_DE_INTERESSE_MAP.items()))}
-
-UNIDADES_COMPLETAS = [
-    "COLEGIO E CURSO MATRIZ EDUCACAO CAMPO GRANDE", "COLEGIO E CURSO MATRIZ EDUCAÇÃO TAQUARA",
-    "COLEGIO E CURSO MATRIZ EDUCAÇÃO BANGU", "COLEGIO E CURSO MATRIZ EDUCACAO NOVA IGUACU",
-    "COLEGIO E CURSO MATRIZ EDUCAÇÃO DUQUE DE CAXIAS", "COLEGIO E CURSO MATRIZ EDUCAÇÃO SÃO JOÃO DE MERITI",
-    "COLEGIO E CURSO MATRIZ EDUCAÇÃO ROCHA MIRANDA", "COLEGIO E CURSO MATRIZ EDUCAÇÃO MADUREIRA",
-    "COLEGIO E CURSO MATRIZ EDUCAÇÃO RETIRO DOS ARTISTAS", "COLEGIO E CURSO MATRIZ EDUCACAO TIJUCA",
-]
-UNIDADES_MAP = {name.replace("COLEGIO E CURSO MATRIZ EDUCACAO", "").replace("COLEGIO E CURSO MATRIZ EDUCAÇÃO", "").strip(): name for name in UNIDADES_COMPLETAS}
-UNIDADES_LIMPAS = sorted(list(UNIDADES_MAP.keys()))
-
-DESCONTOS_MAXIMOS_POR_UNIDADE = {
-    "RETIRO DOS ARTISTAS": 0.50, "CAMPO GRANDE": 0.6320, "ROCHA MIRANDA": 0.6606,
-    "TAQUARA": 0.6755, "NOVA IGUACU": 0.6700, "DUQUE DE CAXIAS": 0.6823,
-    "BANGU": 0.6806, "MADUREIRA": 0.7032, "TIJUCA": 0.6800, "SÃO JOÃO DE MERITI": 0.7197,
-}
+    return SnapshotAba(get_replica(), "Resultados_Bolsao", columns_needed,
+                       facetas=COLUNAS_RESULTADOS_CATEGORICAS, coluna_ordem="Data/Hora")
 
 # --------------------------------------------------
 # FUNÇÕES DE LÓGICA E UTILITÁRIOS (ATUALIZADAS)
 # --------------------------------------------------
-def get_current_brasilia_date() -> date:
-    """Obtém a data atual de Brasília a partir de uma API online com fallback."""
-    try:
-        response = requests.get("http://worldtimeapi.org/api/timezone/America/Sao_Paulo", timeout=3)
-        response.raise_for_status()
-        data = response.json()
-        current_datetime = datetime.fromisoformat(data['datetime'])
-        return current_datetime.date()
-    except Exception:
-        utc_now = datetime.utcnow().replace(tzinfo=pytz.utc)
-        br_tz = pytz.timezone("America/Sao_Paulo")
-        return utc_now.astimezone(br_tz).date()
-
-@lru_cache(maxsize=1)
-def get_bolsao_name_for_date(target_date=None):
-    """Verifica a data e retorna o nome do bolsão ou 'Bolsão Avulso'."""
-    if target_date is None:
-        target_date = get_current_brasilia_date()
-    try:
-        ws_bolsao = get_ws("Bolsão")
-        dates_cells = ws_bolsao.get('A2:A', value_render_option='FORMATTED_STRING')
-        names_cells = ws_bolsao.get('C2:C')
-        dates_col = [cell[0] for cell in dates_cells if cell]
-        names_col = [cell[0] for cell in names_cells if cell]
-        for i, date_str in enumerate(dates_col):
-            if i < len(names_col) and names_col[i]:
-                try:
-                    bolsao_date = datetime.strptime(date_str, "%d/%m/%Y").date()
-                    if bolsao_date == target_date:
-                        return names_col[i]
-                except ValueError: continue
-        return "Bolsão Avulso"
-    except Exception: return "Bolsão Avulso"
-
-# --- FUNÇÃO CORRIGIDA ---
-def precos_2026(serie_modalidade: str) -> dict:
-    """
-    Busca os preços corretos no dicionário TUITION.
-    A chave 'parcela13' é o valor da mensalidade e da primeira cota.
-    """
-    base = TUITION.get(serie_modalidade, {})
-    if not base:
-        return {"primeira_cota": 0.0, "parcela_mensal": 0.0, "anuidade": 0.0}
-    
-    valor_mensal = float(base.get("parcela13", 0.0))
-    primeira_cota = valor_mensal
-    anuidade_total = float(base.get("anuidade", primeira_cota * 13))
-    
-    return {
-        "primeira_cota": primeira_cota, 
-        "parcela_mensal": valor_mensal, 
-        "anuidade": anuidade_total
-    }
-
-def calcula_bolsa(acertos: int, serie_modalidade: str | None = None) -> float:
-    """Inclui a regra especial para o EF1 (1º ao 5º Ano)."""
-    if serie_modalidade == "1º ao 5º Ano":
-        a = max(0, min(acertos, 10))
-        if a == 0: return 0.0
-        if 1 <= a <= 3: return 0.30
-        if 4 <= a <= 5: return 0.50
-        if 6 <= a <= 8: return 0.60
-        return 0.65 # 9-10 acertos
-    ac = max(0, min(acertos, 24))
-    return BOLSA_MAP.get(ac, 0.30)
-
-def format_currency(v: float) -> str:
-    try:
-        return f"R$ {float(v):,.2f}".replace(",", "@").replace(".", ",").replace("@", ".")
-    except (ValueError, TypeError): return str(v)
-
-def parse_brl_to_float(x) -> float:
-    if isinstance(x, (int, float)): return float(x)
-    if not x: return 0.0
-    s = str(x).strip().replace("R$", "").replace(".", "").replace(",", ".")
-    try: return float(s)
-    except Exception: return 0.0
-
-def format_phone_mask(raw: str) -> str:
-    if raw is None: return ""
-    digits = re.sub(r"\D", "", str(raw))
-    if len(digits) >= 11: return f"({digits[:2]}) {digits[2:7]}-{digits[7:11]}"
-    elif len(digits) == 10: return f"({digits[:2]}) {digits[2:6]}-{digits[6:10]}"
-    return digits
+@st.cache_resource
+def get_relogio():
+    """Relógio de Brasília compartilhado, sincronizado com a worldtimeapi em segundo plano."""
+    return RelogioBrasilia().iniciar()
 
-def enforce_phone_mask(key: str):
-    st.session_state[key] = format_phone_mask(st.session_state.get(key, ""))
+def get_current_brasilia_date() -> date:
+    """Data atual de Brasília, respondida da memória (sem requisição no caminho da carta)."""
+    return get_relogio().hoje()
 
-def gerar_html_material_didatico(unidade: str) -> str:
-    """Gera o HTML para as tabelas de material didático com base na unidade."""
-    precos_gerais = {"Medicina": ("R$ 4.009,95", "11x de R$ 364,54"), "Pré-Vestibular": ("R$ 4.009,95", "11x de R$ 364,54")}
-    precos_militares = {"AFA/EN/EFOMM": ("R$ 2.333,73", "11x de R$ 212,16"), "EPCAR": ("R$ 2.501,36", "11x de R$ 227,40"), "ESA": ("R$ 1.111,98", "11x de R$ 101,09"), "EsPCEx": ("R$ 2.668,97", "11x de R$ 242,63"), "IME/ITA": ("R$ 2.333,73", "11x de R$ 212,16")}
-    precos_didatico_padrao = {"1ª ao 5ª ano": ("R$ 2.552,80", "11x de R$ 232,07"), "6ª ao 8ª ano": ("R$ 2.765,77", "11x de R$ 251,43"), "9ª ano Vestibular": ("R$ 2.872,69", "11x de R$ 261,15"), "1ª e 2ª série Vestibular": ("R$ 3.399,67", "11x de R$ 309,06"), "3ª série": ("R$ 4.009,95", "11x de R$ 364,54")}
-    precos_sao_joao = {"1ª ao 5ª ano": ("R$ 1.933,56", "11x de R$ 175,78"), "6ª ao 8ª ano": ("R$ 2.020,92", "11x de R$ 183,72"), "9ª ano Vestibular": ("R$ 2.019,84", "11x de R$ 183,62"), "1ª e 2ª série Vestibular": ("R$ 2.474,20", "11x de R$ 224,93"), "3ª série": ("R$ 2.932,21", "11x de R$ 266,56")}
-    precos_retiro = {"1ª ao 5ª ano": ("R$ 2.552,80", "11x de R$ 232,07")}
-    
-    dados_didatico = {}
-    if unidade == "SÃO JOÃO DE MERITI":
-        titulo_didatico = "Material Didático (exclusivo São João de Meriti)"
-        dados_didatico = precos_sao_joao
-    elif unidade == "RETIRO DOS ARTISTAS":
-        titulo_didatico = "Material Didático"
-        dados_didatico = precos_didatico_padrao.copy()
-        dados_didatico.update(precos_retiro)
-    else:
-        titulo_didatico = "Material Didático"
-        dados_didatico = precos_didatico_padrao
+@st.cache_resource
+def get_calendario_bolsao():
+    """Calendário data -> bolsão (colunas A e C da aba 'Bolsão'), refeito quando a réplica muda."""
+    return CalendarioBolsao(lambda: get_replica().linhas("Bolsão"), lambda: get_replica().versao("Bolsão"))
 
-    tabela_didatico_html = f'<table class="pag2"><tr><th colspan="3">{titulo_didatico}</th></tr>'
-    for curso, valores in dados_didatico.items(): tabela_didatico_html += f'<tr><td>{curso}</td><td>{valores[0]}</td><td>{valores[1]}</td></tr>'
-    tabela_didatico_html += '</table><br>'
+@st.cache_resource
+def get_registro_resultados():
+    """Caminho único de gravação das cartas: cabeçalho da réplica + calendário + fila (um append por envio)."""
+    return RegistroResultados(get_replica(), get_fila_resultados(), get_calendario_bolsao())
 
-    tabela_geral_html = '<table class="pag2"><tr><th colspan="3">Material Didático (geral)</th></tr>'
-    for curso, valores in precos_gerais.items(): tabela_geral_html += f'<tr><td>{curso}</td><td>{valores[0]}</td><td>{valores[1]}</td></tr>'
-    tabela_geral_html += '</table><br>'
-    
-    tabela_militares_html = '<table class="pag2"><tr><th colspan="3">Material Militares</th></tr>'
-    for curso, valores in precos_militares.items(): tabela_militares_html += f'<tr><td>{curso}</td><td>{valores[0]}</td><td>{valores[1]}</td></tr>'
-    tabela_militares_html += '</table><br>'
+def enforce_phone_mask(key: str):
+    st.session_state[key] = format_phone_mask(st.session_state.get(key, ""))
 
-    return tabela_didatico_html + tabela_geral_html + tabela_militares_html
+@st.cache_resource
+def get_pool_pdf():
+    """Pool de processos de renderização, já aquecidos (config. por BOLSAO_PDF_WORKERS/FILA/TIMEOUT)."""
+    return PoolRenderizacao.do_ambiente(Path(__file__).parent).iniciar()
 
 def gera_pdf_html(ctx: dict) -> bytes:
-    base_dir = Path(__file__).parent
-    html_path = base_dir / "carta.html"
     try:
-        with open(html_path, encoding="utf-8") as f:
-            html_template = f.read()
-        html_renderizado = html_template
-        for k, v in ctx.items():
-            html_renderizado = html_renderizado.replace(f"{{{{{k}}}}}", str(v))
-        html_obj = weasyprint.HTML(string=html_renderizado, base_url=str(base_dir))
-        return html_obj.write_pdf()
+        return get_pool_pdf().renderiza(ctx)
+    except FilaRenderCheia:
+        st.error("Muitas cartas sendo geradas agora. Tente novamente em alguns segundos.")
+        return b""
     except FileNotFoundError:
         st.error("Arquivo 'carta.html' ou 'style.css' não encontrado.")
         return b""
@@ -388,47 +154,96 @@ def gera_pdf_html(ctx: dict) -> bytes:
         st.error(f"Erro ao gerar PDF: {e}")
         return b""
 
-def calcula_valor_minimo(unidade, serie_modalidade):
+def _versao_hubspot():
+    """Versão atual da aba 'Hubspot' na réplica (None se indisponível); lida uma vez por uso."""
+    replica = get_replica()
+    if not replica:
+        return None
     try:
-        desconto_maximo = DESCONTOS_MAXIMOS_POR_UNIDADE.get(unidade, 0)
-        precos = precos_2026(serie_modalidade)
-        valor_anuidade_integral = precos.get("anuidade", 0.0)
-        if valor_anuidade_integral > 0 and desconto_maximo > 0:
-            valor_minimo_anual = valor_anuidade_integral * (1 - desconto_maximo)
-            return valor_minimo_anual / 12
-        else:
-            return 0.0
+        return replica.versao("Hubspot")
     except Exception as e:
-        st.error(f"❌ Erro ao calcular valor mínimo: {e}")
-        return 0.0
+        st.error(f"❌ Falha ao carregar dados do Hubspot: {e}")
+        return None
 
-@st.cache_data(ttl=600)
 def get_hubspot_data_for_activation():
-    """Obtém dados otimizados da aba 'Hubspot' para a ativação."""
-    try:
-        ws_hub = get_ws("Hubspot")
-        if not ws_hub:
-            return pd.DataFrame()
+    """Obtém dados otimizados da aba 'Hubspot' para a ativação (servidos pela réplica local)."""
+    versao = _versao_hubspot()
+    return pd.DataFrame() if versao is None else _hubspot_dataframe(versao)
 
+@st.cache_resource(max_entries=2)
+def _hubspot_dataframe(versao: int):
+    """DataFrame tipado (categorias/strings) das colunas projetadas da aba 'Hubspot'."""
+    try:
         hmap_h = header_map("Hubspot")
-        cols_needed = ["Unidade", "Nome do Candidato", "Contato ID", "Status do Contato",
-                       "Contato Realizado", "Observações", "Celular Tratado", "Nome",
-                       "E-mail", "Turma de Interesse - Geral", "Fonte original"]
-        missing_cols = [c for c in cols_needed if c not in hmap_h]
+        missing_cols = [c for c in COLUNAS_HUBSPOT if c not in hmap_h]
         if missing_cols:
             st.error(f"As seguintes colunas necessárias não foram encontradas na aba 'Hubspot': {', '.join(missing_cols)}")
             return pd.DataFrame()
 
-        data = ws_hub.get_all_records(head=1)
-        df = pd.DataFrame(data)
-        if "Contato Realizado" in df.columns:
-            df.rename(columns={"Contato Realizado": "Contato realizado"}, inplace=True)
-        return df
+        return dataframe_hubspot(get_replica().colunas("Hubspot", COLUNAS_HUBSPOT))
 
     except Exception as e:
         st.error(f"❌ Falha ao carregar dados do Hubspot: {e}")
         return pd.DataFrame()
 
+INDICE_UNIDADE_VAZIO = {"posicoes": [], "conjunto": frozenset()}
+LIMITE_BUSCA = 25
+
+# Seletor de registros do formulário básico
+TAMANHOS_PAGINA_FORM = (10, 25, 50, 100)
+COLUNAS_BUSCA_FORM = ("Nome do Aluno", "REGISTRO_ID")
+
+@st.cache_resource(max_entries=2)
+def _hubspot_indice(versao: int):
+    """
+    Índice da aba 'Hubspot' montado uma vez por versão da réplica:
+    unidade -> posições das linhas (ordenadas por nome) e o mesmo conjunto para filtro;
+    além de 'Contato ID' -> posição. Compartilhado entre sessões (somente leitura).
+    """
+    df = _hubspot_dataframe(versao)
+    unidades, por_id = {}, {}
+    if df.empty:
+        return {"unidades": unidades, "por_id": por_id, "versao": versao}
+
+    nomes = df["Nome do Candidato"].astype(str).tolist()
+    colunas = zip(df["Unidade"].astype(str), df["Contato ID"].astype(str))
+    for pos, (unidade, contato_id) in enumerate(colunas):
+        unidades.setdefault(unidade, {"posicoes": []})["posicoes"].append(pos)
+        if contato_id:
+            por_id[contato_id] = pos
+    for indice_unid in unidades.values():
+        indice_unid["posicoes"].sort(key=nomes.__getitem__)
+        indice_unid["conjunto"] = frozenset(indice_unid["posicoes"])
+    return {"unidades": unidades, "por_id": por_id, "versao": versao}
+
+@st.cache_resource(max_entries=2)
+def _hubspot_busca(versao: int):
+    """Índice de busca (trigramas/prefixos) sobre nome do candidato, responsável, e-mail e celular."""
+    df = _hubspot_dataframe(versao)
+    textos = zip(df["Nome do Candidato"].astype(str), df["Nome"].astype(str),
+                 df["E-mail"].astype(str), df["Celular Tratado"].astype(str))
+    return IndiceBusca(f"{cand} {resp} {email} {so_digitos(cel)}" for cand, resp, email, cel in textos)
+
+def get_hubspot_indice():
+    """DataFrame do Hubspot e o índice por unidade, ambos da mesma versão da réplica (lida uma vez)."""
+    versao = _versao_hubspot()
+    df = pd.DataFrame() if versao is None else _hubspot_dataframe(versao)
+    if df.empty:
+        return df, {"unidades": {}, "por_id": {}, "versao": None}
+    return df, _hubspot_indice(versao)
+
+def busca_candidatos(df, indice, termo: str, unidade_completa: str, limite: int = LIMITE_BUSCA) -> list[str]:
+    """Contato IDs dos melhores resultados da busca dentro da unidade (df e índice de get_hubspot_indice)."""
+    if df.empty:
+        return []
+    indice_unid = indice["unidades"].get(unidade_completa, INDICE_UNIDADE_VAZIO)
+    if not termo.strip():
+        posicoes = indice_unid["posicoes"][:limite]
+    else:
+        posicoes = _hubspot_busca(indice["versao"]).busca(termo, limite, permitidos=indice_unid["conjunto"])
+    ids = (str(df.at[p, "Contato ID"]) for p in posicoes)
+    return list(dict.fromkeys(cid for cid in ids if cid in indice["por_id"]))
+
 # --------------------------------------------------
 # INTERFACE STREAMLIT (CÓDIGO ORIGINAL PRESERVADO)
 # --------------------------------------------------
@@ -437,8 +252,81 @@ st.title("🎓 Gestor do Bolsão")
 
 client = get_gspread_client()
 
-aba_carta, aba_negociacao, aba_formulario, aba_valores = st.tabs([
-    "Gerar Carta", "Negociação", "Formulário básico", "Valores"
+if client:
+    with st.sidebar.expander("Fila de gravação", expanded=False):
+        status_fila = get_fila_resultados().status()
+        st.metric("Pendentes", status_fila["profundidade"])
+        latencia = status_fila["ultima_latencia"]
+        st.metric("Latência do último envio", f"{latencia * 1000:.0f} ms" if latencia is not None else "-")
+        if status_fila["profundidade"]:
+            st.caption(f"Mais antigo aguardando há {status_fila['idade_mais_antigo']:.0f} s.")
+        if status_fila["ultimo_erro"]:
+            st.warning(f"Tentativa {status_fila['tentativas']}: {status_fila['ultimo_erro']}")
+        if status_fila["rejeitadas"]:
+            st.error(f"{status_fila['rejeitadas']} linha(s) recusada(s) pela planilha. "
+                     f"Último erro: {status_fila['ultima_rejeicao']}")
+            for rej in get_fila_resultados().rejeitadas(limite=5):
+                st.caption(f"{rej['erro']} · {rej['linha'][:4]}")
+            if st.button("Reenviar recusadas", key="fila_reenviar"):
+                st.success(f"{get_fila_resultados().reenfileira_rejeitadas()} linha(s) devolvida(s) à fila.")
+
+    with st.sidebar.expander("Réplica da planilha", expanded=False):
+        replica_app = get_replica()
+        for aba, info in replica_app.status().items():
+            idade = f"{info['idade_sync']:.0f} s" if info["idade_sync"] is not None else "-"
+            pendentes = f" · {info['pendentes']} pendentes" if info["pendentes"] else ""
+            st.caption(f"**{aba}**: {info['linhas']} linhas{pendentes} · versão {info['versao']} · sync há {idade}")
+        if replica_app.ultimo_erro:
+            st.warning(replica_app.ultimo_erro)
+
+with st.sidebar.expander("Cota da API do Sheets", expanded=False):
+    status_cota = get_limitador().status()
+    col_leit, col_escr = st.columns(2)
+    col_leit.metric("Leituras/min", f"{status_cota['leituras_min']}/{status_cota['cota_leituras']}")
+    col_escr.metric("Escritas/min", f"{status_cota['escritas_min']}/{status_cota['cota_escritas']}")
+    st.caption(
+        f"{status_cota['coalescidas']} leituras compartilhadas · {status_cota['retentativas_429']} retentativas (429) · "
+        f"{status_cota['esgotadas']} recusadas · espera acumulada {status_cota['espera_total']:.1f} s"
+    )
+
+with st.sidebar.expander("Renderização de PDF", expanded=False):
+    status_pdf = get_pool_pdf().status()
+    st.caption(
+        f"{status_pdf['workers']} processos · {status_pdf['em_andamento']} em andamento "
+        f"({status_pdf['na_fila']}/{status_pdf['profundidade_maxima']} na fila) · "
+        f"{status_pdf['concluidas']} geradas · {status_pdf['falhas']} falhas · {status_pdf['rejeitadas']} rejeitadas · "
+        f"{status_pdf['expiradas']} além do tempo"
+    )
+    if status_pdf["p50"] is not None:
+        st.caption(
+            f"Latência p50 {status_pdf['p50'] * 1000:.0f} ms · p95 {status_pdf['p95'] * 1000:.0f} ms "
+            f"(renderização p50 {status_pdf['p50_render'] * 1000:.0f} ms)"
+        )
+    cache_pdf = status_pdf["cache"]
+    if cache_pdf:
+        taxa = f"{cache_pdf['taxa_acerto'] * 100:.0f}%" if cache_pdf["taxa_acerto"] is not None else "-"
+        st.caption(
+            f"Cache: {cache_pdf['acertos']} acertos · {cache_pdf['faltas']} faltas ({taxa}) · "
+            f"{cache_pdf['arquivos']} PDFs · {cache_pdf['bytes'] / 2**20:.1f}/{cache_pdf['limite_bytes'] / 2**20:.0f} MB"
+        )
+    if status_pdf["ultimo_erro"]:
+        st.warning(status_pdf["ultimo_erro"])
+
+with st.sidebar.expander("Relógio (Brasília)", expanded=False):
+    metricas_relogio = get_relogio().metricas()
+    if metricas_relogio["idade_sync"] is None:
+        st.caption("Ainda não sincronizado: usando o relógio local.")
+    else:
+        drift = metricas_relogio["drift"]
+        st.caption(
+            f"Sincronizado há {metricas_relogio['idade_sync']:.0f} s · offset {metricas_relogio['offset'] * 1000:+.0f} ms"
+            + (f" · drift {drift * 1000:+.0f} ms" if drift is not None else "")
+        )
+    if metricas_relogio["ultimo_erro"]:
+        st.warning(metricas_relogio["ultimo_erro"])
+
+aba_carta, aba_lote, aba_negociacao, aba_formulario, aba_valores = st.tabs([
+    "Gerar Carta", "Cartas em Lote", "Negociação", "Formulário básico", "Valores"
 ])
 
 # --- ABA GERAR CARTA ---
@@ -457,18 +345,31 @@ with aba_carta:
 
     if modo_preenchimento == "Carregar dados de um candidato":
         if client:
-            df_hubspot_all = get_hubspot_data_for_activation()
+            df_hubspot_all, indice_hubspot = get_hubspot_indice()
             if not df_hubspot_all.empty:
                 unidade_selecionada = st.selectbox(
                     "Selecione a Unidade do candidato:", UNIDADES_LIMPAS, key="unidade_selecionada_carta"
                 )
-                df_filtrado = df_hubspot_all[df_hubspot_all['Unidade'] == UNIDADES_MAP[unidade_selecionada]]
-                nomes_candidatos = ["Selecione um candidato"] + sorted(df_filtrado['Nome do Candidato'].tolist())
+                termo_busca = st.text_input(
+                    "Buscar candidato (nome, responsável, e-mail ou celular):", key="busca_candidato"
+                )
+                # Só os melhores resultados vão para o navegador, não a unidade inteira
+                # O valor guardado na sessão é o Contato ID, que não muda quando a réplica se atualiza
+                por_id = indice_hubspot["por_id"]
+                ids_encontrados = busca_candidatos(
+                    df_hubspot_all, indice_hubspot, termo_busca, UNIDADES_MAP[unidade_selecionada]
+                )
                 selecao_candidato = st.selectbox(
-                    "Selecione o candidato da lista:", nomes_candidatos, key="selecao_candidato"
+                    "Selecione o candidato da lista:", [None] + ids_encontrados, key="selecao_candidato",
+                    format_func=lambda cid: "Selecione um candidato" if cid is None else (
+                        f"{df_hubspot_all.at[por_id[cid], 'Nome do Candidato']} · "
+                        f"{df_hubspot_all.at[por_id[cid], 'E-mail']}"
+                    ),
                 )
-                if selecao_candidato != "Selecione um candidato":
-                    candidato_selecionado = df_filtrado[df_filtrado['Nome do Candidato'] == selecao_candidato].iloc[0]
+                if len(ids_encontrados) == LIMITE_BUSCA:
+                    st.caption(f"Mostrando os {LIMITE_BUSCA} primeiros resultados; refine a busca para ver outros.")
+                if selecao_candidato is not None and selecao_candidato in por_id:
+                    candidato_selecionado = df_hubspot_all.iloc[por_id[selecao_candidato]]
                     nome_aluno_pre = candidato_selecionado.get('Nome do Candidato', '')
                     serie_modalidade_pre = candidato_selecionado.get('Turma de Interesse - Geral', '1ª e 2ª Série EM Vestibular')
                     unidade_aluno_pre = unidade_selecionada
@@ -500,7 +401,7 @@ with aba_carta:
             on_change=update_serie_from_turma
         )
     with c2:
-        max_por_materia = 5 if st.session_state.c_serie == "1º ao 5º Ano" else 12
+        max_por_materia = max_acertos_por_materia(st.session_state.c_serie)
         ac_mat = st.number_input("Acertos - Matemática", 0, max_por_materia, 0, key="c_mat")
         ac_port = st.number_input("Acertos - Português", 0, max_por_materia, 0, key="c_port")
 
@@ -512,82 +413,114 @@ with aba_carta:
 
     st.text_input("Série / Modalidade (para cálculo)", key="c_serie", disabled=True)
 
-    precos = precos_2026(st.session_state.c_serie)
-    val_ano = precos["anuidade"] * (1 - pct)
-    val_parcela_mensal = precos["parcela_mensal"] * (1 - pct)
-    val_primeira_cota = precos["primeira_cota"] * (1 - pct)
-
     if st.button("Gerar Carta PDF", key="c_gerar"):
         if not aluno:
             st.error("Por favor, preencha o nome do candidato.")
         elif client is None:
             st.error("Não foi possível gerar a carta pois a conexão com a planilha falhou.")
         else:
-            ws_res = get_ws("Resultados_Bolsao")
-            ensure_size(ws_res, 2000, 40)
-            hmap_res = header_map("Resultados_Bolsao")
-
-            if not ws_res or not hmap_res:
-                st.error("Não foi possível acessar a planilha 'Resultados_Bolsao'. Verifique o nome e as permissões.")
-            elif "REGISTRO_ID" not in hmap_res:
-                st.error("A planilha 'Resultados_Bolsao' precisa de uma coluna chamada 'REGISTRO_ID'. Por favor, adicione-a e tente novamente.")
+            registro = get_registro_resultados()
+            try:
+                registro.cabecalho()
+            except Exception as e:
+                st.error(f"❌ Não foi possível usar a planilha 'Resultados_Bolsao': {e}")
             else:
-                hoje = get_current_brasilia_date()
-                nome_bolsao = get_bolsao_name_for_date(hoje)
-                unidades_html = "".join(f"<span class='unidade-item'>{u}</span>" for u in UNIDADES_LIMPAS)
-                html_tabelas_material = gerar_html_material_didatico(unidade_limpa)
-
-                ctx = {
-                    "ano": hoje.year,
-                    "unidade": f"Colégio Matriz – {unidade_limpa}",
-                    "aluno": aluno.strip().title(),
-                    "bolsa_pct": f"{pct * 100:.0f}",
-                    "acertos_mat": ac_mat,
-                    "acertos_port": ac_port,
-                    "turma": st.session_state.c_turma,
-                    "n_parcelas": 12,
-                    "data_limite": (hoje + timedelta(days=7)).strftime("%d/%m/%Y"),
-                    "anuidade_vista": format_currency(val_ano * 0.95),
-                    "primeira_cota": format_currency(val_primeira_cota),
-                    "valor_parcela": format_currency(val_parcela_mensal),
-                    "unidades_html": unidades_html,
-                    "tabelas_material_didatico": html_tabelas_material,
-                }
+                agora = get_relogio().agora()
+                hoje = agora.date()
+                ctx = monta_contexto_carta(
+                    aluno, unidade_limpa, st.session_state.c_turma, st.session_state.c_serie, ac_mat, ac_port, hoje
+                )
 
                 pdf_bytes = gera_pdf_html(ctx)
                 if pdf_bytes:
                     st.success("✅ Carta em PDF gerada com sucesso!")
                     try:
-                        REGISTRO_ID = new_uuid()
-                        row_data_map = {
-                            "Data/Hora": datetime.now(pytz.timezone("America/Sao_Paulo")).strftime("%d/%m/%Y %H:%M:%S"),
-                            "Nome do Aluno": aluno.strip().title(),
-                            "Unidade": UNIDADES_MAP[unidade_limpa],
-                            "Turma de Interesse": st.session_state.c_turma,
-                            "Acertos Matemática": ac_mat,
-                            "Acertos Português": ac_port,
-                            "Total de Acertos": total,
-                            "% Bolsa": f"{pct*100:.0f}%",
-                            "Série / Modalidade": st.session_state.c_serie,
-                            "Valor Anuidade à Vista": ctx["anuidade_vista"],
-                            "Valor da 1ª Cota": ctx["primeira_cota"],
-                            "Valor da Mensalidade com Bolsa": ctx["valor_parcela"],
-                            "Usuário": st.session_state.get("user", "-"),
-                            "Bolsão": nome_bolsao,
-                            "REGISTRO_ID": REGISTRO_ID
-                        }
-                        header_list = sorted(hmap_res, key=hmap_res.get)
-                        nova_linha = [row_data_map.get(col_name, "") for col_name in header_list]
-                        ws_res.append_row(nova_linha, value_input_option="USER_ENTERED")
-                        st.info("📊 Resposta registrada na planilha.")
+                        registro.registra([(ctx, unidade_limpa, st.session_state.c_serie)],
+                                          usuario=st.session_state.get("user", "-"), agora=agora)
+                        st.info("📊 Resposta registrada (gravação na planilha em segundo plano).")
                     except Exception as e:
-                        st.error(f"❌ Falha ao salvar na planilha: {e}")
+                        st.error(f"❌ Falha ao registrar a resposta: {e}")
 
                     st.download_button(
                         "📄 Baixar Carta", data=pdf_bytes,
-                        file_name=f"Carta_Bolsa_{aluno.replace(' ', '_')}.pdf", mime="application/pdf"
+                        file_name=nome_arquivo_carta(aluno), mime="application/pdf"
                     )
 
+# --- ABA CARTAS EM LOTE ---
+with aba_lote:
+    st.subheader("Cartas em Lote")
+    origem_lote = st.radio(
+        "Origem dos candidatos:", ["Arquivo CSV/XLSX", "Candidatos do Hubspot"],
+        horizontal=True, key="l_origem"
+    )
+    unidade_lote = st.selectbox("Unidade (quando o arquivo não tiver a coluna 'Unidade')", UNIDADES_LIMPAS, key="l_unid")
+
+    df_lote = None
+    if origem_lote == "Arquivo CSV/XLSX":
+        arquivo_lote = st.file_uploader(
+            "Planilha com os candidatos", type=["csv", "xlsx"], key="l_arquivo",
+            help=f"Colunas obrigatórias: {', '.join(COLUNAS_LOTE)}. Opcional: Unidade."
+        )
+        if arquivo_lote is not None:
+            try:
+                df_lote = le_planilha_lote(arquivo_lote)
+            except Exception as e:
+                st.error(f"❌ Não foi possível ler o arquivo: {e}")
+    elif client:
+        df_hubspot_all, indice_hubspot = get_hubspot_indice()
+        if not df_hubspot_all.empty:
+            indice_unid = indice_hubspot["unidades"].get(UNIDADES_MAP[unidade_lote], INDICE_UNIDADE_VAZIO)
+            df_unid = df_hubspot_all.iloc[indice_unid["posicoes"]]
+            base_lote = pd.DataFrame({
+                "Nome": df_unid["Nome do Candidato"].astype(str),
+                "Turma de Interesse": df_unid["Turma de Interesse - Geral"].astype(str).map(SERIE_TO_TURMA_MAP).fillna(""),
+                "Acertos Matemática": 0,
+                "Acertos Português": 0,
+            }).reset_index(drop=True)
+            df_lote = st.data_editor(
+                base_lote, hide_index=True, use_container_width=True, key="l_editor",
+                column_config={"Turma de Interesse": st.column_config.SelectboxColumn(options=list(TURMA_DE_INTERESSE_MAP.keys()))},
+            )
+    else:
+        st.warning("Conexão com o Google Sheets não disponível.")
+
+    if df_lote is not None and st.button("Gerar Cartas em Lote", key="l_gerar"):
+        hoje = get_current_brasilia_date()
+        itens_lote, erros_lote = prepara_lote(df_lote, unidade_lote, hoje)
+        for erro in erros_lote:
+            st.warning(erro)
+
+        if itens_lote:
+            with st.spinner(f"Gerando {len(itens_lote)} cartas..."):
+                try:
+                    pdfs = get_pool_pdf().renderiza_lote([ctx for ctx, _, _ in itens_lote])
+                except Exception as e:
+                    st.error(f"Erro ao gerar PDFs: {e}")
+                    pdfs = []
+
+            if pdfs:
+                arquivos = {}
+                for (ctx, _, _), pdf in zip(itens_lote, pdfs):
+                    arquivos[nome_arquivo_carta(ctx["aluno"], arquivos)] = pdf
+                st.success(f"✅ {len(pdfs)} cartas geradas.")
+
+                if client is None:
+                    st.error("Não foi possível registrar o lote: conexão com a planilha indisponível.")
+                else:
+                    try:
+                        # A fila envia o lote inteiro em uma única requisição
+                        n_registros = get_registro_resultados().registra(
+                            itens_lote, usuario=st.session_state.get("user", "-"), agora=get_relogio().agora()
+                        )
+                        st.info(f"📊 {n_registros} respostas registradas (gravação na planilha em segundo plano).")
+                    except Exception as e:
+                        st.error(f"❌ Falha ao registrar o lote: {e}")
+
+                st.download_button(
+                    "🗂️ Baixar Cartas (ZIP)", data=empacota_zip(arquivos),
+                    file_name=f"Cartas_Bolsa_{hoje.strftime('%Y%m%d')}.zip", mime="application/zip"
+                )
+
 # --- ABA NEGOCIAÇÃO ---
 with aba_negociacao:
     st.subheader("Simulador de Negociação")
@@ -656,15 +589,16 @@ with aba_formulario:
                     base_cols.append(menor_colname)
 
                 if st.button("Recarregar lista (atualizar snapshot)", use_container_width=False):
-                    load_resultados_snapshot.clear()
+                    get_replica().sincroniza("Resultados_Bolsao", total=True)
 
+                snapshot_res = get_snapshot_resultados(tuple(base_cols))
                 try:
-                    snapshot = load_resultados_snapshot(tuple(base_cols))
+                    snapshot = snapshot_res.atual()
                 except RuntimeError as e:
                     st.error(str(e))
-                    snapshot = {"rows": [], "id_to_rownum": {}}
+                    snapshot = Snapshot()
 
-                if not snapshot["rows"]:
+                if snapshot.df.empty:
                     st.info("Nenhum registro encontrado em 'Resultados_Bolsao'.")
                 else:
                     unidade_selecionada = st.selectbox(
@@ -675,23 +609,53 @@ with aba_formulario:
 
                     if unidade_selecionada != "Selecione...":
                         unidade_completa = UNIDADES_MAP[unidade_selecionada]
-                        rows_unit = [r for r in snapshot["rows"] if r.get("Unidade") == unidade_completa]
+                        t_filtro = time.perf_counter()
+                        indice = snapshot_res.indice(snapshot)
 
-                        bolsoes = sorted({r.get("Bolsão") for r in rows_unit if r.get("Bolsão")})
+                        bolsoes = indice.valores2.get(unidade_completa, [])
                         bolsao_sel = st.selectbox(
                             "Selecione o bolsão",
                             ["Todos"] + bolsoes,
                             key="filtro_bolsao_form"
                         )
 
-                        rows_filtered = rows_unit if bolsao_sel == "Todos" else [r for r in rows_unit if r.get("Bolsão") == bolsao_sel]
+                        posicoes_filtro = indice.posicoes(unidade_completa, None if bolsao_sel == "Todos" else bolsao_sel)
+
+                        # Busca, ordenação e paginação no servidor: só a página vai ao navegador
+                        col_busca, col_ordem, col_tam = st.columns([3, 2, 1])
+                        busca_form = col_busca.text_input("Buscar por nome ou ID", key="busca_form")
+                        ordem_form = col_ordem.selectbox("Ordenar por Data/Hora", ["Mais recentes", "Mais antigos"],
+                                                         key="ordem_form")
+                        tamanho_form = col_tam.selectbox("Por página", TAMANHOS_PAGINA_FORM, index=1, key="tamanho_form")
+
+                        filtro_atual = (unidade_completa, bolsao_sel, busca_form, ordem_form, tamanho_form)
+                        if st.session_state.get("filtro_form_anterior") != filtro_atual:
+                            st.session_state["filtro_form_anterior"] = filtro_atual
+                            st.session_state["pagina_form"] = 1
+
+                        encontradas = filtra_ordena(snapshot, posicoes_filtro, busca_form, COLUNAS_BUSCA_FORM,
+                                                    decrescente=ordem_form == "Mais recentes")
+                        total_filtro = len(encontradas)
+                        n_paginas = max(1, -(-total_filtro // tamanho_form))
+                        st.session_state["pagina_form"] = min(st.session_state.get("pagina_form", 1), n_paginas)
+                        numero_pagina = st.number_input(f"Página (de {n_paginas})", min_value=1, max_value=n_paginas,
+                                                        step=1, key="pagina_form")
+                        posicoes_pagina = encontradas[(numero_pagina - 1) * tamanho_form: numero_pagina * tamanho_form]
 
                         options = {"Selecione um candidato...": None}
-                        for r in rows_filtered:
-                            rid = r.get("REGISTRO_ID")
-                            aluno = r.get("Nome do Aluno")
+                        for aluno, rid, data_hora in zip(snapshot.colunas["Nome do Aluno"][posicoes_pagina],
+                                                         snapshot.colunas["REGISTRO_ID"][posicoes_pagina],
+                                                         snapshot.colunas["Data/Hora"][posicoes_pagina]):
                             if rid and aluno:
-                                options[f"{aluno} ({rid})"] = rid
+                                options[f"{aluno} · {texto_data_hora(data_hora)} ({rid})"] = rid
+
+                        info_snap = snapshot_res.status()
+                        st.caption(
+                            f"{total_filtro} encontrados de {len(posicoes_filtro)} na seleção · "
+                            f"{info_snap['linhas']} registros · filtro em "
+                            f"{(time.perf_counter() - t_filtro) * 1000:.1f} ms · snapshot "
+                            f"{info_snap['memoria'] / 1e6:.1f} MB, atualizado em {info_snap['ultima_montagem'] * 1000:.0f} ms"
+                        )
 
                         selecao = st.selectbox("Selecione o Registro do Bolsão", options.keys())
 
@@ -699,11 +663,14 @@ with aba_formulario:
                             st.info("Selecione um registro para editar.")
                         else:
                             reg_id = options[selecao]
-                            rownum = snapshot["id_to_rownum"].get(str(reg_id))
-                            if not rownum:
+                            rownum = snapshot.id_to_rownum.get(str(reg_id))
+                            if not rownum and str(reg_id) in snapshot.pendentes:
+                                st.info("Este registro ainda está na fila de envio para a planilha. Tente novamente em alguns segundos.")
+                            elif not rownum:
                                 st.error("Registro não localizado (ID → linha). Atualize o snapshot e tente novamente.")
                             else:
-                                row = next((r for r in rows_filtered if str(r.get("REGISTRO_ID")) == str(reg_id)), None)
+                                posicao = indice.posicao_por_id.get(str(reg_id))
+                                row = snapshot.linha(posicao) if posicao is not None else None
                                 if not row:
                                     st.error("Linha não encontrada após o filtro. Atualize o snapshot.")
                                 else:
@@ -766,31 +733,46 @@ with aba_formulario:
                                             "Aluno Matriculou?": aluno_matriculou,
                                             "Observações (Form)": obs_form,
                                         }
+                                        # Valores com que os campos foram abertos: só o que difere deles é gravado
+                                        originais = {
+                                            "Escola de Origem": get_val("Escola de Origem"),
+                                            "Responsável Financeiro": get_val("Responsável Financeiro"),
+                                            "Telefone": phone_initial,
+                                            "Valor Negociado": format_currency(valor_neg_ini),
+                                            "Aluno Matriculou?": matriculou_options[matriculou_idx],
+                                            "Observações (Form)": get_val("Observações (Form)"),
+                                        }
                                         if menor_colname:
                                             updates_dict[menor_colname] = format_currency(menor_val_num)
+                                            originais[menor_colname] = format_currency(menor_val_ini)
 
-                                        updates_to_batch = []
-                                        for col_name, value in updates_dict.items():
-                                            col_idx = hmap.get(col_name)
-                                            if col_idx:
-                                                a1_notation = gspread.utils.rowcol_to_a1(rownum, col_idx)
-                                                updates_to_batch.append({"range": a1_notation, "values": [[value]]})
-
-                                        if updates_to_batch:
-                                            batch_update_cells(ws_res, updates_to_batch)
-                                            
-                                            row.update({
-                                                "Escola de Origem": updates_dict.get("Escola de Origem", row.get("Escola de Origem")),
-                                                "Responsável Financeiro": updates_dict.get("Responsável Financeiro", row.get("Responsável Financeiro")),
-                                                "Telefone": updates_dict.get("Telefone", row.get("Telefone")),
-                                                "Valor Negociado": updates_dict.get("Valor Negociado", row.get("Valor Negociado")),
-                                                "Aluno Matriculou?": updates_dict.get("Aluno Matriculou?", row.get("Aluno Matriculou?")),
-                                                "Observações (Form)": updates_dict.get("Observações (Form)", row.get("Observações (Form)")),
-                                            })
-                                            if menor_colname and menor_colname in updates_dict:
-                                                row[menor_colname] = updates_dict[menor_colname]
-                                            
-                                            st.success("Dados do formulário salvos com sucesso!")
+                                        updates_dict = {
+                                            c: v for c, v in updates_dict.items() if str(v) != str(originais[c] or "")
+                                        }
+                                        valores_por_col = {hmap[c]: v for c, v in updates_dict.items() if c in hmap}
+
+                                        if not valores_por_col:
+                                            st.info("Nenhum campo foi alterado; nada foi enviado à planilha.")
+                                        else:
+                                            try:
+                                                # Confere o REGISTRO_ID da linha antes de gravar (a planilha pode ter sido reordenada)
+                                                linha_gravada = update_row_by_id(
+                                                    ws_res, hmap["REGISTRO_ID"], reg_id, rownum, valores_por_col
+                                                )
+                                            except RegistroNaoEncontrado as e:
+                                                st.error(f"{e} Recarregue a lista e tente novamente.")
+                                            else:
+                                                if linha_gravada == rownum:
+                                                    get_replica().aplica_celulas("Resultados_Bolsao", rownum, updates_dict)
+                                                else:
+                                                    # Linhas mudaram de lugar: a réplica precisa de uma releitura completa
+                                                    get_replica().sincroniza("Resultados_Bolsao", total=True)
+                                                celulas_sessao = st.session_state.get("celulas_gravadas_form", 0) + len(valores_por_col)
+                                                st.session_state["celulas_gravadas_form"] = celulas_sessao
+                                                st.success(
+                                                    f"Dados do formulário salvos com sucesso! {len(valores_por_col)} célula(s) "
+                                                    f"gravada(s): {', '.join(updates_dict)} (nesta sessão: {celulas_sessao})."
+                                                )
         except Exception as e:
             st.error(f"Ocorreu um erro ao carregar o formulário: {e}")
 
@@ -798,34 +780,39 @@ with aba_formulario:
 with aba_valores:
     st.subheader("Valores 2026 (Tabela)")
 
+    # (curso, série exibida, chave do TUITION): os valores vêm da tabela de preços
+    linhas = [
+        ("EFI",  "1º Ano", "1º ao 5º Ano"),
+        ("EFI",  "2º Ano", "1º ao 5º Ano"),
+        ("EFI",  "3º Ano", "1º ao 5º Ano"),
+        ("EFI",  "4º Ano", "1º ao 5º Ano"),
+        ("EFI",  "5º Ano", "1º ao 5º Ano"),
+
+        ("EFII", "6º Ano", "6º ao 8º Ano"),
+        ("EFII", "7º Ano", "6º ao 8º Ano"),
+        ("EFII", "8º Ano", "6º ao 8º Ano"),
+        ("EFII", "9º Ano - Militar",     "9º Ano EF II Militar"),
+        ("EFII", "9º Ano - Vestibular", "9º Ano EF II Vestibular"),
+
+        ("EM",   "1ª Série - Militar",     "1ª e 2ª Série EM Militar"),
+        ("EM",   "1ª Série - Vestibular", "1ª e 2ª Série EM Vestibular"),
+        ("EM",   "2ª Série - Militar",     "1ª e 2ª Série EM Militar"),
+        ("EM",   "2ª Série - Vestibular", "1ª e 2ª Série EM Vestibular"),
+        ("EM",   "3ª série - Medicina",   "3ª Série EM Medicina"),
+        ("EM",   "3ª Série - Militar",     "3ª Série (PV/PM)"),
+        ("EM",   "3ª Série - Vestibular", "3ª Série (PV/PM)"),
+
+        ("PM",   "AFA/EN/EFOMM", "AFA/EN/EFOMM"),
+        ("PM",   "CN/EPCAr", "CN/EPCAr"),
+        ("PM",   "ESA", "ESA"),
+        ("PM",   "EsPCEx", "EsPCEx"),
+        ("PM",   "IME/ITA", "IME/ITA"),
+        ("PV",   "Medicina", "Medicina (Pré)"),
+        ("PV",   "Pré-Vestibular", "Pré-Vestibular"),
+    ]
     linhas = [
-        ("EFI",  "1º Ano", 2050.31, 2050.31), 
-        ("EFI",  "2º Ano", 2050.31, 2050.31),
-        ("EFI",  "3º Ano", 2050.31, 2050.31), 
-        ("EFI",  "4º Ano", 2050.31, 2050.31),
-        ("EFI",  "5º Ano", 2050.31, 2050.31),
-        
-        ("EFII", "6º Ano", 2411.85, 2411.85),
-        ("EFII", "7º Ano", 2411.85, 2411.85), 
-        ("EFII", "8º Ano", 2411.85, 2411.85),
-        ("EFII", "9º Ano - Militar",     2626.62, 2626.62),
-        ("EFII", "9º Ano - Vestibular", 2626.62, 2626.62),
-        
-        ("EM",   "1ª Série - Militar",     2820.77, 2820.77),
-        ("EM",   "1ª Série - Vestibular", 2820.77, 2820.77),
-        ("EM",   "2ª Série - Militar",     2820.77, 2820.77),
-        ("EM",   "2ª Série - Vestibular", 2820.77, 2820.77),
-        ("EM",   "3ª série - Medicina",   2831.69, 2831.69),
-        ("EM",   "3ª Série - Militar",     2831.69, 2831.69),
-        ("EM",   "3ª Série - Vestibular", 2831.69, 2831.69),
-        
-        ("PM",   "AFA/EN/EFOMM", 1138.62, 1138.62), 
-        ("PM",   "CN/EPCAr", 681.77,  681.77),
-        ("PM",   "ESA", 549.62,  549.62), 
-        ("PM",   "EsPCEx", 1138.62, 1138.62),
-        ("PM",   "IME/ITA", 1138.62, 1138.62), 
-        ("PV",   "Medicina", 1138.62, 1138.62),
-        ("PV",   "Pré-Vestibular", 1138.62, 1138.62),
+        (curso, serie, precos_2026(chave)["primeira_cota"], precos_2026(chave)["parcela_mensal"])
+        for curso, serie, chave in linhas
     ]
 
     df = pd.DataFrame(linhas, columns=["Curso", "Série", "Primeira Cota", "12 parcelas de"])
@@ -844,3 +831,9 @@ with aba_valores:
         },
     )
 
+    st.download_button(
+        "📥 Baixar tabela completa de bolsas e preços (CSV)", data=TABELA_PRECOS.exporta_csv(),
+        file_name="tabela_precos_bolsao_2026.csv", mime="text/csv",
+        help="Todas as unidades × séries × totais de acertos, com bolsa, valores e piso negociável."
+    )
+
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""
+bolsao_core
+-------------------------------------------------
+Núcleo importável do Gestor do Bolsão (sem dependência do Streamlit).
+"""
+from pathlib import Path
+
+# Raiz do projeto: onde ficam carta.html, style.css e images/
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Estado local do app (fila de gravação etc.), fora do controle de versão
+DADOS_DIR = BASE_DIR / ".bolsao"
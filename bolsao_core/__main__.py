@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Linha de comando do bolsão, sem Streamlit (lotes grandes, jobs agendados).
+
+    python -m bolsao_core cartas lote.xlsx --unidade "BANGU" --saida cartas.zip [--registrar]
+    python -m bolsao_core precos leads.csv --saida precificados.csv
+    python -m bolsao_core precos --tabela --saida tabela.csv
+    python -m bolsao_core sync [--total]
+
+As credenciais do Google vêm de BOLSAO_CREDENCIAIS (JSON da service account)
+ou de .streamlit/secrets.toml, como no app.
+
+A réplica e a fila de gravação da CLI ficam em DADOS_DIR/cli, separadas das do
+app: a marcação de envio e os locks da fila só valem dentro de um processo, e
+dois processos drenando a mesma fila anexariam as mesmas linhas duas vezes.
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from bolsao_core import BASE_DIR, DADOS_DIR
+
+CLI_DIR = DADOS_DIR / "cli"
+
+
+def _abre_replica():
+    from bolsao_core.cota import LimitadorCota, PlanilhaLimitada
+    from bolsao_core.planilha import ABAS_REPLICADAS, abre_planilha, conecta
+    from bolsao_core.replica import ReplicaPlanilha
+
+    wb = PlanilhaLimitada(abre_planilha(conecta()), LimitadorCota.do_ambiente())
+    return ReplicaPlanilha(CLI_DIR / "replica.sqlite3", wb.worksheet, ABAS_REPLICADAS)
+
+
+def cmd_cartas(args) -> int:
+    from bolsao_core.carta import le_planilha_lote, nome_arquivo_carta, prepara_lote
+    from bolsao_core.relogio import RelogioBrasilia
+    from bolsao_core.render import empacota_zip, gera_cartas_em_lote
+
+    relogio = RelogioBrasilia()
+    try:
+        relogio.sincroniza()
+    except Exception as e:
+        print(f"Aviso: relógio de Brasília não sincronizado ({e}); usando o relógio local.", file=sys.stderr)
+    hoje = relogio.hoje()
+
+    itens, erros = prepara_lote(le_planilha_lote(args.arquivo), args.unidade, hoje)
+    for erro in erros:
+        print(erro, file=sys.stderr)
+    if not itens:
+        print("Nenhuma linha válida no arquivo.", file=sys.stderr)
+        return 1
+
+    t0 = time.perf_counter()
+    pdfs = gera_cartas_em_lote([ctx for ctx, _, _ in itens], max_workers=args.workers, base_dir=BASE_DIR)
+    arquivos = {}
+    for (ctx, _, _), pdf in zip(itens, pdfs):
+        arquivos[nome_arquivo_carta(ctx["aluno"], arquivos)] = pdf
+    Path(args.saida).write_bytes(empacota_zip(arquivos))
+    print(f"{len(pdfs)} carta(s) em {time.perf_counter() - t0:.1f}s -> {args.saida}")
+
+    if args.registrar:
+        from bolsao_core.calendario import CalendarioBolsao
+        from bolsao_core.fila_escrita import FilaEscrita
+        from bolsao_core.resultados import ABA_RESULTADOS, RegistroResultados
+
+        replica = None
+        # Linhas que sobraram de uma execução anterior saem primeiro, com a checagem de duplicadas da fila
+        fila = FilaEscrita(CLI_DIR / "fila_resultados.sqlite3", lambda: replica.obter_ws(ABA_RESULTADOS))
+        try:
+            replica = _abre_replica()
+            replica.sincroniza("Bolsão")
+            replica.sincroniza(ABA_RESULTADOS)
+            calendario = CalendarioBolsao(lambda: replica.linhas("Bolsão"), lambda: replica.versao("Bolsão"))
+            RegistroResultados(replica, fila, calendario).registra(itens, usuario=args.usuario, agora=relogio.agora())
+            while fila.descarrega():
+                pass
+        except Exception as e:
+            print(f"Erro ao gravar em '{ABA_RESULTADOS}': {type(e).__name__}: {e}", file=sys.stderr)
+        status = fila.status()
+        print(f"{status['total_enviado']} linha(s) gravada(s) em '{ABA_RESULTADOS}'; "
+              f"pendentes: {status['profundidade']}; recusadas: {status['rejeitadas']}")
+        if status["profundidade"]:
+            print(f"As pendentes ficam em {fila.caminho_db} e vão no próximo 'cartas --registrar'.", file=sys.stderr)
+            return 1
+    return 0
+
+
+def cmd_precos(args) -> int:
+    import pandas as pd
+
+    from bolsao_core.precos import TABELA_PRECOS, precifica_dataframe
+
+    if args.tabela:
+        destino = args.saida or "tabela_precos.csv"
+        TABELA_PRECOS.exporta_csv(destino)
+        print(f"Tabela completa -> {destino}")
+        return 0
+    if not args.arquivo:
+        print("Informe o arquivo de entrada ou --tabela.", file=sys.stderr)
+        return 2
+
+    if str(args.arquivo).lower().endswith(".xlsx"):
+        df = pd.read_excel(args.arquivo)
+    else:
+        df = pd.read_csv(args.arquivo, sep=None, engine="python")
+    saida = precifica_dataframe(df, col_unidade=args.col_unidade, col_serie=args.col_serie,
+                                col_mat=args.col_mat, col_port=args.col_port)
+    saida.to_csv(args.saida, sep=";", decimal=",", float_format="%.2f", index=False)
+    print(f"{len(saida)} linha(s) precificada(s) -> {args.saida}")
+    return 0
+
+
+def cmd_sync(args) -> int:
+    replica = _abre_replica()
+    for cfg in replica.abas.values():
+        t0 = time.perf_counter()
+        replica.sincroniza(cfg.titulo, total=args.total)
+        print(f"{cfg.titulo:<20} {len(replica.linhas(cfg.titulo)):>7} linha(s) "
+              f"v{replica.versao(cfg.titulo)} em {(time.perf_counter() - t0) * 1000:.0f} ms")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bolsao_core", description="Bolsão Matriz sem Streamlit.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("cartas", help="Gera as cartas de um CSV/XLSX em um ZIP.")
+    p.add_argument("arquivo", help="CSV/XLSX com Nome, Turma de Interesse, Acertos Matemática, Acertos Português [, Unidade]")
+    p.add_argument("--unidade", required=True, help="Unidade usada nas linhas sem a coluna 'Unidade'.")
+    p.add_argument("--saida", default="cartas_bolsao.zip")
+    p.add_argument("--workers", type=int, default=None, help="Processos de renderização (padrão: nº de CPUs).")
+    p.add_argument("--registrar", action="store_true", help="Grava as linhas em 'Resultados_Bolsao'.")
+    p.add_argument("--usuario", default="cli", help="Valor da coluna 'Usuário' ao registrar.")
+    p.set_defaults(func=cmd_cartas)
+
+    p = sub.add_parser("precos", help="Precifica um CSV/XLSX de alunos ou exporta a tabela completa.")
+    p.add_argument("arquivo", nargs="?")
+    p.add_argument("--tabela", action="store_true", help="Exporta unidade × série × acertos.")
+    p.add_argument("--saida", default=None)
+    p.add_argument("--col-unidade", default="unidade")
+    p.add_argument("--col-serie", default="serie")
+    p.add_argument("--col-mat", default="acertos_mat")
+    p.add_argument("--col-port", default="acertos_port")
+    p.set_defaults(func=cmd_precos)
+
+    p = sub.add_parser("sync", help="Sincroniza a réplica local das abas.")
+    p.add_argument("--total", action="store_true", help="Baixa as abas inteiras.")
+    p.set_defaults(func=cmd_sync)
+
+    args = parser.parse_args(argv)
+    if args.comando == "precos" and not args.tabela and args.saida is None:
+        args.saida = "precificados.csv"
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Busca incremental (type-ahead) de candidatos.
+
+Índice invertido por trigramas para termos com 3+ caracteres e índice de
+prefixos (tokens ordenados + bisect) para termos curtos. Tudo é comparado sem
+acentos e sem diferenciar maiúsculas/minúsculas.
+"""
+import bisect
+import heapq
+import re
+import unicodedata
+from collections import defaultdict
+
+_RE_SEPARADORES = re.compile(r"[^\w@.]+")
+
+
+def normaliza_texto(valor) -> str:
+    """Minúsculas, sem acentos e com pontuação (exceto '@' e '.') virando espaço."""
+    texto = unicodedata.normalize("NFKD", str(valor or ""))
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).casefold()
+    return " ".join(_RE_SEPARADORES.sub(" ", texto).split())
+
+
+def so_digitos(valor) -> str:
+    return re.sub(r"\D", "", str(valor or ""))
+
+
+def _trigramas(texto: str) -> set[str]:
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceBusca:
+    """Índice de busca sobre uma lista de textos; os resultados são as posições na lista."""
+
+    def __init__(self, textos):
+        self.textos = [normaliza_texto(t) for t in textos]
+
+        postings = defaultdict(list)
+        pares = []
+        for pos, texto in enumerate(self.textos):
+            for tri in _trigramas(texto):
+                postings[tri].append(pos)
+            pares.extend((token, pos) for token in set(texto.split()))
+        self._postings = dict(postings)
+
+        pares.sort()
+        self._tokens = [t for t, _ in pares]
+        self._tokens_pos = [p for _, p in pares]
+
+    def _por_prefixo(self, termo: str) -> set[int]:
+        inicio = bisect.bisect_left(self._tokens, termo)
+        fim = bisect.bisect_left(self._tokens, termo + "\uffff")
+        return set(self._tokens_pos[inicio:fim])
+
+    def _por_substring(self, termo: str) -> set[int]:
+        listas = [self._postings.get(tri) for tri in _trigramas(termo)]
+        if not all(listas):
+            return set()
+        listas.sort(key=len)
+        candidatos = set(listas[0])
+        for lista in listas[1:]:
+            candidatos.intersection_update(lista)
+            if not candidatos:
+                return candidatos
+        # Trigramas em comum não garantem a substring; confirma no texto
+        return {p for p in candidatos if termo in self.textos[p]}
+
+    def busca(self, consulta: str, limite: int = 20, permitidos=None) -> list[int]:
+        """
+        Posições dos até `limite` melhores resultados: todos os termos precisam
+        aparecer; quem começa com a consulta vem antes, depois ordem alfabética.
+        Consulta só com números (telefone) é comparada apenas pelos dígitos.
+        """
+        if not re.search(r"[^\W\d_]", str(consulta or "")):
+            consulta = so_digitos(consulta)
+        q = normaliza_texto(consulta)
+        if not q:
+            return []
+
+        resultado = None
+        for termo in sorted(q.split(), key=len, reverse=True):
+            achados = self._por_substring(termo) if len(termo) >= 3 else self._por_prefixo(termo)
+            resultado = achados if resultado is None else resultado & achados
+            if not resultado:
+                return []
+        if permitidos is not None:
+            resultado.intersection_update(permitidos)
+
+        def chave(pos):
+            texto = self.textos[pos]
+            return (not texto.startswith(q), texto)
+
+        return heapq.nsmallest(limite, resultado, key=chave)
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Cache em disco das cartas em PDF, endereçado pelo conteúdo.
+
+A chave é o hash do HTML já preenchido junto com as versões do template e do
+CSS: a mesma carta (reimpressão, correção desfeita, download depois de um
+rerun) volta do disco sem renderizar. O diretório tem limite de tamanho e os
+arquivos menos usados recentemente saem primeiro.
+"""
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+
+def chave_pdf(html: str, versao_template: str, versao_css: str) -> str:
+    h = hashlib.sha256()
+    for parte in (versao_template, versao_css, html):
+        h.update(parte.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class CachePDF:
+    """Um arquivo <chave>.pdf por carta; LRU pelo mtime, que é atualizado a cada acerto."""
+
+    def __init__(self, diretorio, limite_bytes: int = 200 * 1024 * 1024):
+        self.diretorio = Path(diretorio)
+        self.diretorio.mkdir(parents=True, exist_ok=True)
+        self.limite_bytes = limite_bytes
+        self.acertos = 0
+        self.faltas = 0
+        self.remocoes = 0
+        self._lock = threading.Lock()
+        # chave -> (tamanho, último uso); reconstruído do disco para sobreviver a reinícios
+        self._entradas: dict[str, tuple[int, float]] = {}
+        for item in os.scandir(self.diretorio):
+            if item.name.endswith(".pdf") and item.is_file():
+                st = item.stat()
+                self._entradas[item.name[:-4]] = (st.st_size, st.st_mtime)
+        self._total = sum(t for t, _ in self._entradas.values())
+        with self._lock:
+            self._remove_excedente()
+
+    def _caminho(self, chave: str) -> Path:
+        return self.diretorio / f"{chave}.pdf"
+
+    def obtem(self, chave: str) -> bytes | None:
+        caminho = self._caminho(chave)
+        with self._lock:
+            if chave not in self._entradas:
+                self.faltas += 1
+                return None
+            try:
+                conteudo = caminho.read_bytes()
+                os.utime(caminho)
+            except OSError:
+                self._descarta(chave)
+                self.faltas += 1
+                return None
+            self._entradas[chave] = (len(conteudo), caminho.stat().st_mtime)
+            self.acertos += 1
+            return conteudo
+
+    def guarda(self, chave: str, conteudo: bytes):
+        if not conteudo or len(conteudo) > self.limite_bytes:
+            return
+        caminho = self._caminho(chave)
+        temporario = caminho.with_suffix(f".{threading.get_ident()}.tmp")
+        with self._lock:
+            if chave in self._entradas:
+                return
+            temporario.write_bytes(conteudo)
+            os.replace(temporario, caminho)  # leitores nunca veem um PDF pela metade
+            self._entradas[chave] = (len(conteudo), caminho.stat().st_mtime)
+            self._total += len(conteudo)
+            self._remove_excedente()
+
+    def _descarta(self, chave: str):
+        tamanho, _ = self._entradas.pop(chave, (0, 0))
+        self._total -= tamanho
+        try:
+            self._caminho(chave).unlink()
+        except FileNotFoundError:
+            pass
+
+    def _remove_excedente(self):
+        if self._total <= self.limite_bytes:
+            return
+        for chave, _ in sorted(self._entradas.items(), key=lambda kv: kv[1][1]):
+            self._descarta(chave)
+            self.remocoes += 1
+            if self._total <= self.limite_bytes:
+                break
+
+    def status(self) -> dict:
+        with self._lock:
+            consultas = self.acertos + self.faltas
+            return {
+                "arquivos": len(self._entradas),
+                "bytes": self._total,
+                "limite_bytes": self.limite_bytes,
+                "acertos": self.acertos,
+                "faltas": self.faltas,
+                "taxa_acerto": self.acertos / consultas if consultas else None,
+                "remocoes": self.remocoes,
+            }
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Calendário dos bolsões: data -> nome do bolsão, montado a partir da aba 'Bolsão'.
+"""
+import threading
+from datetime import date
+
+import pandas as pd
+
+BOLSAO_AVULSO = "Bolsão Avulso"
+
+
+class CalendarioBolsao:
+    """
+    Dicionário data -> nome do bolsão com consulta O(1) para qualquer data.
+    É reconstruído (com um único parse vetorizado das datas) apenas quando a
+    versão da aba muda; a atualização periódica fica a cargo de quem fornece as linhas.
+    """
+
+    def __init__(self, obter_linhas, obter_versao, col_data: int = 0, col_nome: int = 2):
+        self.obter_linhas = obter_linhas
+        self.obter_versao = obter_versao
+        self.col_data = col_data
+        self.col_nome = col_nome
+        self._versao = None
+        self._mapa: dict[date, str] = {}
+        self._lock = threading.Lock()
+
+    def _atualiza(self):
+        versao = self.obter_versao()
+        if versao == self._versao:
+            return
+        with self._lock:
+            if versao == self._versao:
+                return
+            linhas = self.obter_linhas()
+            datas = [l[self.col_data] if len(l) > self.col_data else "" for l in linhas]
+            nomes = [l[self.col_nome] if len(l) > self.col_nome else "" for l in linhas]
+            parseadas = pd.to_datetime(pd.Series(datas, dtype="string"), format="%d/%m/%Y", errors="coerce")
+            mapa = {}
+            for dia, nome in zip(parseadas, nomes):
+                if nome and not pd.isna(dia):
+                    mapa.setdefault(dia.date(), nome)  # a primeira linha da data vale, como antes
+            self._mapa = mapa
+            self._versao = versao
+
+    def nome_para(self, data: date, padrao: str = BOLSAO_AVULSO) -> str:
+        """Nome do bolsão na data (passada ou futura), ou o padrão se não houver."""
+        self._atualiza()
+        return self._mapa.get(data, padrao)
+
+    def datas(self) -> dict[date, str]:
+        self._atualiza()
+        return dict(self._mapa)
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+Regras da carta do bolsão sem Streamlit: contexto dos placeholders do
+carta.html, linha de 'Resultados_Bolsao' e validação do modo em lote.
+Usado pelo app e pela linha de comando (python -m bolsao_core).
+"""
+import hashlib
+import json
+import re
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+from bolsao_core.planilha import new_uuid
+from bolsao_core.precos import (
+    MATERIAL_DIDATICO_AJUSTES, MATERIAL_DIDATICO_EXCLUSIVO, MATERIAL_DIDATICO_PADRAO, MATERIAL_GERAL,
+    MATERIAL_MILITARES, MATERIAL_PARCELAS, TABELA_PRECOS, UNIDADES_LIMPAS, UNIDADES_MAP, UNIDADE_LIMPA,
+)
+from bolsao_core.relogio import TZ_BRASILIA
+
+# --------------------------------------------------
+# DADOS DE REFERÊNCIA
+# --------------------------------------------------
+TURMA_DE_INTERESSE_MAP = {
+    "1ª série IME ITA Jr": "1ª e 2ª Série EM Militar",
+    "1ª série do EM - Militar": "1ª e 2ª Série EM Militar",
+    "1ª série do EM - Pré-Vestibular": "1ª e 2ª Série EM Vestibular",
+    "1º ano do EF1": "1º ao 5º Ano",
+    "2ª série IME ITA Jr": "1ª e 2ª Série EM Militar",
+    "2ª série do EM - Militar": "1ª e 2ª Série EM Militar",
+    "2ª série do EM - Pré-Vestibular": "1ª e 2ª Série EM Vestibular",
+    "2º ano do EF1": "1º ao 5º Ano",
+    "3ª série do EM - AFA EN EFOMM": "3ª Série (PV/PM)",
+    "3ª série do EM - ESA": "3ª Série (PV/PM)",
+    "3ª série do EM - EsPCEx": "3ª Série (PV/PM)",
+    "3ª série do EM - IME ITA": "3ª Série (PV/PM)",
+    "3ª série do EM - Medicina": "3ª Série EM Medicina",
+    "3ª série do EM - Pré-Vestibular": "3ª Série (PV/PM)",
+    "3º ano do EF1": "1º ao 5º Ano",
+    "4º ano do EF1": "1º ao 5º Ano",
+    "5º ano do EF1": "1º ao 5º Ano",
+    "6º ano do EF2": "6º ao 8º Ano",
+    "7º ano do EF2": "6º ao 8º Ano",
+    "8º ano do EF2": "6º ao 8º Ano",
+    "9º ano do EF2 - Militar": "9º Ano EF II Militar",
+    "9º ano do EF2 - Vestibular": "9º Ano EF II Vestibular",
+    "Pré-Militar AFA EN EFOMM": "AFA/EN/EFOMM",
+    "Pré-Militar CN EPCAr": "CN/EPCAr",
+    "Pré-Militar ESA": "ESA",
+    "Pré-Militar EsPCEx": "EsPCEx",
+    "Pré-Militar IME ITA": "IME/ITA",
+    "Pré-Vestibular": "Pré-Vestibular",
+    "Pré-Vestibular - Medicina": "Medicina (Pré)",
+}
+SERIE_TO_TURMA_MAP = {v: k for k, v in reversed(list(TURMA_DE_INTERESSE_MAP.items()))}
+
+
+# --------------------------------------------------
+# FORMATAÇÃO
+# --------------------------------------------------
+def format_currency(v: float) -> str:
+    try:
+        return f"R$ {float(v):,.2f}".replace(",", "@").replace(".", ",").replace("@", ".")
+    except (ValueError, TypeError): return str(v)
+
+
+def parse_brl_to_float(x) -> float:
+    if isinstance(x, (int, float)): return float(x)
+    if not x: return 0.0
+    s = str(x).strip().replace("R$", "").replace(".", "").replace(",", ".")
+    try: return float(s)
+    except Exception: return 0.0
+
+
+def format_phone_mask(raw: str) -> str:
+    if raw is None: return ""
+    digits = re.sub(r"\D", "", str(raw))
+    if len(digits) >= 11: return f"({digits[:2]}) {digits[2:7]}-{digits[7:11]}"
+    elif len(digits) == 10: return f"({digits[:2]}) {digits[2:6]}-{digits[6:10]}"
+    return digits
+
+
+# --------------------------------------------------
+# CARTA E REGISTRO
+# --------------------------------------------------
+def _tabela_material(titulo: str, dados: dict) -> str:
+    linhas = "".join(
+        f"<tr><td>{curso}</td><td>{format_currency(total)}</td><td>{MATERIAL_PARCELAS}x de {format_currency(parcela)}</td></tr>"
+        for curso, (total, parcela) in dados.items()
+    )
+    return f'<table class="pag2"><tr><th colspan="3">{titulo}</th></tr>{linhas}</table><br>'
+
+
+def _monta_material(unidade: str) -> str:
+    if unidade in MATERIAL_DIDATICO_EXCLUSIVO:
+        titulo_didatico, dados_didatico = MATERIAL_DIDATICO_EXCLUSIVO[unidade]
+    else:
+        titulo_didatico = "Material Didático"
+        dados_didatico = {**MATERIAL_DIDATICO_PADRAO, **MATERIAL_DIDATICO_AJUSTES.get(unidade, {})}
+    return (_tabela_material(titulo_didatico, dados_didatico)
+            + _tabela_material("Material Didático (geral)", MATERIAL_GERAL)
+            + _tabela_material("Material Militares", MATERIAL_MILITARES))
+
+
+def _monta_unidades() -> str:
+    return "".join(f"<span class='unidade-item'>{u}</span>" for u in UNIDADES_LIMPAS)
+
+
+def versao_fragmentos() -> str:
+    """Hash dos dados que entram nos fragmentos fixos (preços de material e unidades)."""
+    dados = [MATERIAL_PARCELAS, MATERIAL_DIDATICO_PADRAO, MATERIAL_DIDATICO_EXCLUSIVO,
+             MATERIAL_DIDATICO_AJUSTES, MATERIAL_GERAL, MATERIAL_MILITARES, UNIDADES_LIMPAS]
+    return hashlib.sha1(json.dumps(dados, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+_fragmentos: dict = {}
+
+
+def invalida_fragmentos() -> dict:
+    """
+    Refaz os fragmentos HTML fixos da carta (tabelas de material de cada unidade e
+    lista de unidades) e recalcula a versão. Quem alterar os dicionários de
+    preços de material em tempo de execução chama esta função; a consulta não
+    confere a versão (o hash custaria mais que montar o HTML).
+    """
+    global _fragmentos
+    versao = versao_fragmentos()
+    novos = {("unidades",): _monta_unidades()}
+    for unidade in UNIDADES_LIMPAS:
+        novos[("material", unidade)] = _monta_material(unidade)
+    novos["versao"] = versao
+    _fragmentos = novos  # troca atômica: quem está lendo continua com o dicionário anterior
+    return novos
+
+
+def gerar_html_material_didatico(unidade: str) -> str:
+    """HTML das tabelas de material didático da unidade (do cache de fragmentos)."""
+    fragmentos = _fragmentos
+    html = fragmentos.get(("material", unidade))
+    if html is None:
+        html = fragmentos[("material", unidade)] = _monta_material(unidade)
+    return html
+
+
+def html_unidades() -> str:
+    return _fragmentos[("unidades",)]
+
+
+invalida_fragmentos()
+
+
+def max_acertos_por_materia(serie_modalidade: str) -> int:
+    """EF1 (1º ao 5º Ano) tem prova menor: 5 questões por matéria."""
+    return 5 if serie_modalidade == "1º ao 5º Ano" else 12
+
+
+def monta_contexto_carta(aluno: str, unidade_limpa: str, turma: str, serie_modalidade: str,
+                         ac_mat: int, ac_port: int, hoje: date) -> dict:
+    """Calcula bolsa e valores e monta o contexto de placeholders do carta.html."""
+    valores = TABELA_PRECOS.consulta(unidade_limpa, serie_modalidade, ac_mat + ac_port)
+    pct = valores["bolsa"]
+    return {
+        "ano": hoje.year,
+        "unidade": f"Colégio Matriz – {unidade_limpa}",
+        "aluno": aluno.strip().title(),
+        "bolsa_pct": f"{pct * 100:.0f}",
+        "acertos_mat": ac_mat,
+        "acertos_port": ac_port,
+        "turma": turma,
+        "n_parcelas": 12,
+        "data_limite": (hoje + timedelta(days=7)).strftime("%d/%m/%Y"),
+        "anuidade_vista": format_currency(valores["anuidade_vista"]),
+        "primeira_cota": format_currency(valores["primeira_cota"]),
+        "valor_parcela": format_currency(valores["valor_parcela"]),
+        "unidades_html": html_unidades(),
+        "tabelas_material_didatico": gerar_html_material_didatico(unidade_limpa),
+    }
+
+
+def monta_registro_resultado(ctx: dict, unidade_limpa: str, serie_modalidade: str, nome_bolsao: str,
+                             usuario: str = "-", agora: datetime | None = None) -> dict:
+    """Monta o mapa 'coluna': valor de uma linha de 'Resultados_Bolsao' a partir do contexto da carta."""
+    agora = agora or datetime.now(TZ_BRASILIA)
+    return {
+        "Data/Hora": agora.strftime("%d/%m/%Y %H:%M:%S"),
+        "Nome do Aluno": ctx["aluno"],
+        "Unidade": UNIDADES_MAP[unidade_limpa],
+        "Turma de Interesse": ctx["turma"],
+        "Acertos Matemática": ctx["acertos_mat"],
+        "Acertos Português": ctx["acertos_port"],
+        "Total de Acertos": ctx["acertos_mat"] + ctx["acertos_port"],
+        "% Bolsa": f"{ctx['bolsa_pct']}%",
+        "Série / Modalidade": serie_modalidade,
+        "Valor Anuidade à Vista": ctx["anuidade_vista"],
+        "Valor da 1ª Cota": ctx["primeira_cota"],
+        "Valor da Mensalidade com Bolsa": ctx["valor_parcela"],
+        "Usuário": usuario,
+        "Bolsão": nome_bolsao,
+        "REGISTRO_ID": new_uuid(),
+    }
+
+
+def registro_para_linha(row_data_map: dict, hmap: dict) -> list:
+    """Ordena os valores do registro conforme o cabeçalho da aba."""
+    header_list = sorted(hmap, key=hmap.get)
+    return [row_data_map.get(col_name, "") for col_name in header_list]
+
+
+COLUNAS_LOTE = ["Nome", "Turma de Interesse", "Acertos Matemática", "Acertos Português"]
+
+
+def nome_arquivo_carta(aluno: str, existentes=()) -> str:
+    """'Carta_Bolsa_<aluno>.pdf', com _2, _3... se o nome já estiver em `existentes` (mesmo nome no app e na CLI)."""
+    base = f"Carta_Bolsa_{str(aluno).replace(' ', '_')}"
+    nome, n = f"{base}.pdf", 2
+    while nome in existentes:
+        nome, n = f"{base}_{n}.pdf", n + 1
+    return nome
+
+
+def le_planilha_lote(arquivo) -> pd.DataFrame:
+    """Lê o CSV/XLSX enviado para o modo em lote (CSV com ',' ou ';')."""
+    if str(getattr(arquivo, "name", arquivo)).lower().endswith(".xlsx"):
+        df = pd.read_excel(arquivo, dtype=str)
+    else:
+        df = pd.read_csv(arquivo, dtype=str, sep=None, engine="python")
+    df.columns = [str(c).strip() for c in df.columns]
+    return df.fillna("")
+
+
+def prepara_lote(df: pd.DataFrame, unidade_padrao: str, hoje: date):
+    """
+    Valida as linhas do lote e devolve (itens, erros), onde cada item é
+    (contexto_da_carta, unidade_limpa, serie_modalidade).
+    A coluna 'Unidade' é opcional; sem ela vale a unidade selecionada.
+    """
+    faltando = [c for c in COLUNAS_LOTE if c not in df.columns]
+    if faltando:
+        return [], [f"Colunas ausentes no arquivo: {', '.join(faltando)}"]
+
+    itens, erros = [], []
+    for i, r in enumerate(df.to_dict("records"), start=2):
+        nome = str(r.get("Nome", "")).strip()
+        turma = str(r.get("Turma de Interesse", "")).strip()
+        unidade = UNIDADE_LIMPA.get(str(r.get("Unidade", "") or unidade_padrao).strip().upper())
+        serie = TURMA_DE_INTERESSE_MAP.get(turma)
+        if not nome:
+            erros.append(f"Linha {i}: nome vazio.")
+            continue
+        if not serie:
+            erros.append(f"Linha {i} ({nome}): turma de interesse desconhecida '{turma}'.")
+            continue
+        if not unidade:
+            erros.append(f"Linha {i} ({nome}): unidade desconhecida '{r.get('Unidade')}'.")
+            continue
+        try:
+            ac_mat = int(float(r.get("Acertos Matemática") or 0))
+            ac_port = int(float(r.get("Acertos Português") or 0))
+        except ValueError:
+            erros.append(f"Linha {i} ({nome}): acertos inválidos.")
+            continue
+        limite = max_acertos_por_materia(serie)
+        ac_mat, ac_port = max(0, min(ac_mat, limite)), max(0, min(ac_port, limite))
+        ctx = monta_contexto_carta(nome, unidade, turma, serie, ac_mat, ac_port, hoje)
+        itens.append((ctx, unidade, serie))
+    return itens, erros
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+Controle de cota da API do Google Sheets para o processo inteiro.
+
+Todas as chamadas do app passam por `PlanilhaLimitada`/`AbaLimitada`, que
+envolvem os objetos do gspread e aplicam:
+
+- token bucket separado para leituras e escritas, calibrado para não passar
+  da cota por minuto do Google (60/min por usuário, por padrão);
+- single-flight: leituras idênticas em andamento ao mesmo tempo (várias
+  sessões clicando "Recarregar", a réplica sincronizando) viram uma requisição;
+- nova tentativa automática em 429, com backoff exponencial e jitter.
+"""
+import copy
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from bolsao_core.fila_escrita import status_http
+
+# Métodos do gspread que gravam; o resto que for chamável conta como leitura
+METODOS_ESCRITA = frozenset({
+    "append_row", "append_rows", "update", "update_cell", "update_cells", "batch_update", "batch_clear",
+    "clear", "resize", "add_rows", "add_cols", "insert_row", "insert_rows", "delete_rows", "delete_columns",
+    "values_update", "values_append", "values_clear", "values_batch_update", "values_batch_clear",
+})
+
+
+class CotaEsgotada(RuntimeError):
+    """A requisição esperou mais que o permitido por uma ficha da cota; `espera` diz quando tentar de novo."""
+
+    def __init__(self, mensagem: str, espera: float):
+        super().__init__(mensagem)
+        self.espera = espera
+
+
+class BaldeFichas:
+    """Token bucket: `taxa` fichas por segundo, no máximo `capacidade` acumuladas."""
+
+    def __init__(self, taxa: float, capacidade: float):
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self._fichas = capacidade
+        self._atualizado = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserva(self) -> float:
+        """Reserva uma ficha e devolve quantos segundos esperar até ela existir (0 se já existe)."""
+        with self._lock:
+            agora = time.monotonic()
+            self._fichas = min(self.capacidade, self._fichas + (agora - self._atualizado) * self.taxa)
+            self._atualizado = agora
+            self._fichas -= 1
+            return 0.0 if self._fichas >= 0 else -self._fichas / self.taxa
+
+    def devolve(self):
+        with self._lock:
+            self._fichas = min(self.capacidade, self._fichas + 1)
+
+
+class _Voo:
+    def __init__(self):
+        self.evento = threading.Event()
+        self.resultado = None
+        self.erro = None
+
+
+class LimitadorCota:
+    """
+    Cota por minuto de leituras e de escritas. A taxa do balde é (1 - margem)
+    da cota e o acúmulo máximo é a margem: em qualquer janela de 60 s não
+    saem mais requisições que a cota.
+    """
+
+    def __init__(self, leituras_por_minuto: int = 60, escritas_por_minuto: int = 60, margem: float = 0.1,
+                 espera_maxima: float = 30.0, max_tentativas: int = 5,
+                 backoff_inicial: float = 1.0, backoff_maximo: float = 32.0):
+        self.cotas = {"leitura": leituras_por_minuto, "escrita": escritas_por_minuto}
+        self.baldes = {
+            tipo: BaldeFichas(cota * (1 - margem) / 60, max(1.0, cota * margem))
+            for tipo, cota in self.cotas.items()
+        }
+        self.espera_maxima = espera_maxima
+        self.max_tentativas = max_tentativas
+        self.backoff_inicial = backoff_inicial
+        self.backoff_maximo = backoff_maximo
+
+        self._lock = threading.Lock()
+        self._em_voo: dict[tuple, _Voo] = {}
+        self._enviadas = {"leitura": deque(), "escrita": deque()}  # instantes do último minuto
+        self.coalescidas = 0
+        self.retentativas_429 = 0
+        self.esgotadas = 0
+        self.espera_total = 0.0
+
+    @classmethod
+    def do_ambiente(cls):
+        """Cotas por BOLSAO_COTA_LEITURAS e BOLSAO_COTA_ESCRITAS (requisições por minuto)."""
+        return cls(
+            leituras_por_minuto=int(os.environ.get("BOLSAO_COTA_LEITURAS", 60)),
+            escritas_por_minuto=int(os.environ.get("BOLSAO_COTA_ESCRITAS", 60)),
+        )
+
+    # ---------------- execução ----------------
+    def executa(self, tipo: str, fn, chave: tuple | None = None):
+        """Executa `fn()` dentro da cota; leituras com a mesma `chave` em andamento são compartilhadas."""
+        if tipo != "leitura" or chave is None:
+            return self._com_retentativa(tipo, fn)
+
+        with self._lock:
+            voo = self._em_voo.get(chave)
+            lider = voo is None
+            if lider:
+                voo = self._em_voo[chave] = _Voo()
+            else:
+                self.coalescidas += 1
+        if not lider:
+            voo.evento.wait()
+            if voo.erro is not None:
+                raise voo.erro
+            return copy.deepcopy(voo.resultado)  # cada sessão recebe a sua cópia
+
+        try:
+            voo.resultado = self._com_retentativa(tipo, fn)
+            return voo.resultado
+        except Exception as e:
+            voo.erro = e
+            raise
+        finally:
+            with self._lock:
+                self._em_voo.pop(chave, None)
+            voo.evento.set()
+
+    def _com_retentativa(self, tipo: str, fn):
+        tentativa = 0
+        while True:
+            self._aguarda_ficha(tipo)
+            try:
+                return fn()
+            except Exception as e:
+                tentativa += 1
+                if status_http(e) != 429 or tentativa >= self.max_tentativas:
+                    raise
+                with self._lock:
+                    self.retentativas_429 += 1
+                base = min(self.backoff_maximo, self.backoff_inicial * 2 ** (tentativa - 1))
+                time.sleep(base * random.uniform(0.5, 1.0))
+
+    def _aguarda_ficha(self, tipo: str):
+        balde = self.baldes[tipo]
+        espera = balde.reserva()
+        if espera > self.espera_maxima:
+            balde.devolve()
+            with self._lock:
+                self.esgotadas += 1
+            raise CotaEsgotada(f"Cota de {tipo}s da API do Google Sheets esgotada; tente em {espera:.0f} s.", espera)
+        if espera:
+            time.sleep(espera)
+        with self._lock:
+            self.espera_total += espera
+            self._enviadas[tipo].append(time.monotonic())
+
+    # ---------------- observabilidade ----------------
+    def status(self) -> dict:
+        agora = time.monotonic()
+        with self._lock:
+            por_minuto = {}
+            for tipo, instantes in self._enviadas.items():
+                while instantes and agora - instantes[0] > 60:
+                    instantes.popleft()
+                por_minuto[tipo] = len(instantes)
+            return {
+                "leituras_min": por_minuto["leitura"],
+                "escritas_min": por_minuto["escrita"],
+                "cota_leituras": self.cotas["leitura"],
+                "cota_escritas": self.cotas["escrita"],
+                "coalescidas": self.coalescidas,
+                "retentativas_429": self.retentativas_429,
+                "esgotadas": self.esgotadas,
+                "espera_total": self.espera_total,
+            }
+
+
+# --------------------------------------------------
+# PROXIES DO GSPREAD
+# --------------------------------------------------
+def _chave(escopo: str, nome: str, args, kwargs) -> tuple:
+    return (escopo, nome, repr(args), repr(sorted(kwargs.items())))
+
+
+class _Limitado:
+    """Repassa atributos ao objeto do gspread; métodos passam pelo limitador."""
+
+    _escopo = ""
+
+    def __init__(self, alvo, limitador: LimitadorCota):
+        self._alvo = alvo
+        self._limitador = limitador
+
+    def __getattr__(self, nome):
+        atributo = getattr(self._alvo, nome)
+        if not callable(atributo) or nome.startswith("_"):
+            return atributo
+        tipo = "escrita" if nome in METODOS_ESCRITA else "leitura"
+
+        def chamada(*args, **kwargs):
+            chave = _chave(self._escopo, nome, args, kwargs) if tipo == "leitura" else None
+            return self._limitador.executa(tipo, lambda: atributo(*args, **kwargs), chave)
+
+        return chamada
+
+
+class PlanilhaLimitada(_Limitado):
+    """Spreadsheet do gspread com cota; worksheet() devolve AbaLimitada."""
+
+    def worksheet(self, titulo: str):
+        # Não coalescida: cada chamador precisa do seu objeto de aba (o app já guarda em cache)
+        aba = self._limitador.executa("leitura", lambda: self._alvo.worksheet(titulo))
+        return AbaLimitada(aba, self._limitador, self)
+
+
+class AbaLimitada(_Limitado):
+    def __init__(self, alvo, limitador: LimitadorCota, planilha: PlanilhaLimitada):
+        super().__init__(alvo, limitador)
+        self._escopo = alvo.title
+        self.spreadsheet = planilha
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+Fila write-behind para gravações na planilha.
+
+As linhas são persistidas em SQLite no momento do clique e enviadas em lotes
+por uma thread de fundo, com retentativa e backoff exponencial. Uma falha do
+Google Sheets não perde o registro: ele continua na fila até ser aceito.
+
+Um 5xx ou timeout no append é ambíguo (a planilha pode ter gravado). As
+linhas de um envio sem resposta ficam marcadas; antes de reenviá-las a fila
+lê a coluna de ID da aba e descarta as que já estão lá, para não duplicar.
+
+Um 4xx de conteúdo (linha que a API recusa) não melhora com retentativa: o
+lote é dividido ao meio até isolar a linha recusada, que vai para a tabela
+'rejeitadas' (visível na barra lateral) em vez de travar a fila.
+"""
+import json
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+STATUS_TRANSITORIOS = {429, 500, 502, 503, 504}
+STATUS_DA_ABA = {401, 403, 404}  # credencial/permissão/aba: recusa todas as linhas, não uma
+
+
+def status_http(exc: Exception) -> int | None:
+    """Extrai o status HTTP de um erro do gspread/requests, se houver."""
+    resposta = getattr(exc, "response", None)
+    return getattr(resposta, "status_code", None)
+
+
+def _cota_esgotada(exc: Exception) -> bool:
+    from bolsao_core.cota import CotaEsgotada  # cota importa status_http daqui
+
+    return isinstance(exc, CotaEsgotada)
+
+
+def envio_ambiguo(exc: Exception) -> bool:
+    """O append pode ter sido aplicado? Só um 4xx (429 inclusive) ou a cota local garantem que não."""
+    if _cota_esgotada(exc):
+        return False
+    status = status_http(exc)
+    return status is None or status >= 500
+
+
+def linha_recusada(exc: Exception) -> bool:
+    """4xx que depende do conteúdo enviado (ex.: 400) e não se resolve reenviando."""
+    status = status_http(exc)
+    return (status is not None and 400 <= status < 500
+            and status not in STATUS_TRANSITORIOS and status not in STATUS_DA_ABA)
+
+
+def erro_transitorio(exc: Exception) -> bool:
+    """429/5xx, cota local esgotada e falhas de rede valem nova tentativa; o resto é conteúdo/permissão."""
+    if _cota_esgotada(exc):
+        return True
+    status = status_http(exc)
+    if status is not None:
+        return status in STATUS_TRANSITORIOS
+    return isinstance(exc, (ConnectionError, TimeoutError, OSError))
+
+
+class FilaEscrita:
+    """Fila persistente de linhas a anexar em uma aba, descarregada em lotes."""
+
+    def __init__(self, caminho_db, obter_ws, tamanho_lote: int = 200, intervalo: float = 2.0,
+                 backoff_inicial: float = 1.0, backoff_maximo: float = 300.0, coluna_id: str | None = "REGISTRO_ID"):
+        self.caminho_db = Path(caminho_db)
+        self.caminho_db.parent.mkdir(parents=True, exist_ok=True)
+        self.obter_ws = obter_ws
+        self.tamanho_lote = tamanho_lote
+        self.intervalo = intervalo
+        self.backoff_inicial = backoff_inicial
+        self.backoff_maximo = backoff_maximo
+        self.coluna_id = coluna_id
+
+        self._lock = threading.Lock()
+        self._acorda = threading.Event()
+        self._thread = None
+        self._conn = sqlite3.connect(self.caminho_db, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pendentes ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, linha TEXT NOT NULL, criado_em REAL NOT NULL)"
+        )
+        colunas = {c[1] for c in self._conn.execute("PRAGMA table_info(pendentes)")}
+        if "enviando" not in colunas:
+            # 1 = saiu em um envio que não teve resposta; pode já estar na planilha
+            self._conn.execute("ALTER TABLE pendentes ADD COLUMN enviando INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rejeitadas ("
+            " id INTEGER PRIMARY KEY, linha TEXT NOT NULL, criado_em REAL NOT NULL,"
+            " rejeitado_em REAL NOT NULL, erro TEXT NOT NULL)"
+        )
+
+        self.tentativas = 0
+        self.ultimo_erro = None
+        self.ultima_latencia = None
+        self.ultimo_envio = None
+        self.total_enviado = 0
+        self.duplicadas_evitadas = 0
+
+    # ---------------- produção ----------------
+    def enfileira(self, linhas: list[list]):
+        """Persiste as linhas localmente e acorda o worker. Retorna imediatamente."""
+        agora = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO pendentes (linha, criado_em) VALUES (?, ?)",
+                [(json.dumps(linha, ensure_ascii=False, default=str), agora) for linha in linhas],
+            )
+        self._acorda.set()
+
+    def reenfileira_rejeitadas(self) -> int:
+        """Devolve as linhas rejeitadas à fila (ex.: depois de corrigir a aba). Retorna quantas."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            n = self._conn.execute(
+                "INSERT INTO pendentes (id, linha, criado_em) SELECT id, linha, criado_em FROM rejeitadas"
+            ).rowcount
+            self._conn.execute("DELETE FROM rejeitadas")
+            self._conn.execute("COMMIT")
+        self._acorda.set()
+        return n
+
+    # ---------------- consumo ----------------
+    def iniciar(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name="fila-escrita", daemon=True)
+            self._thread.start()
+        return self
+
+    def _loop(self):
+        while True:
+            self._acorda.wait(self.intervalo)
+            self._acorda.clear()
+            try:
+                while self.descarrega():
+                    pass
+            except Exception as e:
+                self.tentativas += 1
+                self.ultimo_erro = f"{type(e).__name__}: {e}"
+                time.sleep(self._espera(e))
+
+    def _espera(self, exc: Exception) -> float:
+        if not erro_transitorio(exc):
+            return self.backoff_maximo
+        if _cota_esgotada(exc):
+            return min(self.backoff_maximo, exc.espera)  # o balde já sabe quando haverá ficha
+        base = min(self.backoff_maximo, self.backoff_inicial * 2 ** (self.tentativas - 1))
+        return base * random.uniform(0.5, 1.0)
+
+    def descarrega(self) -> int:
+        """Envia o próximo lote em uma única requisição. Retorna quantas linhas saíram da fila."""
+        with self._lock:
+            pendentes = self._conn.execute(
+                "SELECT id, linha, enviando FROM pendentes ORDER BY id LIMIT ?", (self.tamanho_lote,)
+            ).fetchall()
+        if not pendentes:
+            return 0
+
+        ws = self.obter_ws()
+        if ws is None:
+            raise ConnectionError("Aba de destino indisponível.")
+
+        lote = [(i, json.loads(linha)) for i, linha, _ in pendentes]
+        if any(enviando for _, _, enviando in pendentes):
+            lote = self._sem_as_ja_gravadas(ws, lote, {i for i, _, enviando in pendentes if enviando})
+
+        restantes = {i for i, _ in lote}
+        self._remove([i for i, _, _ in pendentes if i not in restantes])
+        if lote:
+            t0 = time.perf_counter()
+            self._envia(ws, lote)
+            self.ultima_latencia = time.perf_counter() - t0
+        self.ultimo_envio = time.time()
+        self.tentativas = 0
+        self.ultimo_erro = None
+        return len(pendentes)
+
+    def _envia(self, ws, lote: list):
+        """Um append_rows; se a API recusar o conteúdo, divide o lote até isolar as linhas recusadas."""
+        ids = [i for i, _ in lote]
+        self._marca_enviando(ids, 1)
+        try:
+            ws.append_rows([linha for _, linha in lote], value_input_option="USER_ENTERED")
+        except Exception as e:
+            if not envio_ambiguo(e):
+                self._marca_enviando(ids, 0)
+            if not linha_recusada(e):
+                raise
+            if len(lote) == 1:
+                self._rejeita(ids[0], str(e))
+                return
+            meio = len(lote) // 2
+            self._envia(ws, lote[:meio])
+            self._envia(ws, lote[meio:])
+            return
+        self._remove(ids)
+        self.total_enviado += len(ids)
+
+    def _remove(self, ids: list[int]):
+        with self._lock:
+            self._conn.executemany("DELETE FROM pendentes WHERE id = ?", [(i,) for i in ids])
+
+    def _rejeita(self, id_: int, erro: str):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO rejeitadas (id, linha, criado_em, rejeitado_em, erro)"
+                " SELECT id, linha, criado_em, ?, ? FROM pendentes WHERE id = ?",
+                (time.time(), erro, id_),
+            )
+            self._conn.execute("DELETE FROM pendentes WHERE id = ?", (id_,))
+            self._conn.execute("COMMIT")
+
+    def _marca_enviando(self, ids: list[int], valor: int):
+        with self._lock:
+            self._conn.executemany("UPDATE pendentes SET enviando = ? WHERE id = ?", [(valor, i) for i in ids])
+
+    def _sem_as_ja_gravadas(self, ws, lote: list, incertas: set[int]) -> list:
+        """Tira do lote as linhas de um envio ambíguo cujo ID já aparece na aba (duas leituras)."""
+        if not self.coluna_id:
+            return lote
+        cabecalho = [str(h).strip() for h in ws.row_values(1)]
+        if self.coluna_id not in cabecalho:
+            return lote
+        j = cabecalho.index(self.coluna_id)
+        gravados = {str(v) for v in ws.col_values(j + 1)[1:] if v not in ("", None)}
+
+        restantes = []
+        for i, linha in lote:
+            if i in incertas and j < len(linha) and str(linha[j]) in gravados:
+                self.duplicadas_evitadas += 1
+            else:
+                restantes.append((i, linha))
+        return restantes
+
+    # ---------------- observabilidade ----------------
+    def status(self) -> dict:
+        with self._lock:
+            profundidade, mais_antigo = self._conn.execute(
+                "SELECT COUNT(*), MIN(criado_em) FROM pendentes"
+            ).fetchone()
+            rejeitadas, ultima_rejeicao = self._conn.execute(
+                "SELECT COUNT(*), (SELECT erro FROM rejeitadas ORDER BY rejeitado_em DESC LIMIT 1) FROM rejeitadas"
+            ).fetchone()
+        return {
+            "profundidade": profundidade,
+            "idade_mais_antigo": (time.time() - mais_antigo) if mais_antigo else 0.0,
+            "ultima_latencia": self.ultima_latencia,
+            "ultimo_envio": self.ultimo_envio,
+            "total_enviado": self.total_enviado,
+            "duplicadas_evitadas": self.duplicadas_evitadas,
+            "tentativas": self.tentativas,
+            "ultimo_erro": self.ultimo_erro,
+            "rejeitadas": rejeitadas,
+            "ultima_rejeicao": ultima_rejeicao,
+        }
+
+    def rejeitadas(self, limite: int = 20) -> list[dict]:
+        """Últimas linhas recusadas pela API, com o erro, para exibição."""
+        with self._lock:
+            linhas = self._conn.execute(
+                "SELECT linha, rejeitado_em, erro FROM rejeitadas ORDER BY rejeitado_em DESC LIMIT ?", (limite,)
+            ).fetchall()
+        return [{"linha": json.loads(l), "rejeitado_em": t, "erro": e} for l, t, e in linhas]
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Acesso ao Google Sheets: conexão, utilitários de leitura/escrita em lote e a
+configuração das abas replicadas. Não depende do Streamlit e só importa o gspread ao conectar.
+"""
+import json
+import os
+import tomllib
+import uuid
+
+import pandas as pd
+
+from bolsao_core import BASE_DIR
+from bolsao_core.replica import ConfigAba, _letra
+
+SPREAD_URL = "https://docs.google.com/spreadsheets/d/1qBV70qrPswnAUDxnHfBgKEU4FYAISpL7iVP0IM9zU2Q/edit#gid=0"
+ESCOPOS = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
+
+
+# --------------------------------------------------
+# CONEXÃO
+# --------------------------------------------------
+def credenciais_service_account() -> dict:
+    """
+    Credenciais fora do Streamlit: JSON apontado por BOLSAO_CREDENCIAIS ou a
+    seção [gcp_service_account] de .streamlit/secrets.toml (a mesma do app).
+    """
+    caminho_json = os.environ.get("BOLSAO_CREDENCIAIS")
+    if caminho_json:
+        with open(caminho_json, encoding="utf-8") as f:
+            return json.load(f)
+    with open(BASE_DIR / ".streamlit" / "secrets.toml", "rb") as f:
+        return tomllib.load(f)["gcp_service_account"]
+
+
+def conecta(info: dict | None = None):
+    """Cliente gspread autenticado com a service account (gspread/google-auth só são importados aqui)."""
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    creds = Credentials.from_service_account_info(info or credenciais_service_account(), scopes=ESCOPOS)
+    return gspread.authorize(creds)
+
+
+def abre_planilha(client):
+    return client.open_by_url(SPREAD_URL)
+
+
+# --------------------------------------------------
+# ABAS REPLICADAS
+# --------------------------------------------------
+# Colunas da aba 'Hubspot' usadas pelo app; só elas são baixadas (a aba é bem mais larga)
+COLUNAS_HUBSPOT = ("Unidade", "Nome do Candidato", "Contato ID", "Status do Contato",
+                   "Contato Realizado", "Observações", "Celular Tratado", "Nome",
+                   "E-mail", "Turma de Interesse - Geral", "Fonte original")
+# Colunas de baixa cardinalidade, guardadas como 'category' no DataFrame
+COLUNAS_HUBSPOT_CATEGORICAS = ("Unidade", "Status do Contato", "Contato Realizado",
+                               "Turma de Interesse - Geral", "Fonte original")
+
+# Facetas (unidade, bolsão) dos filtros do formulário em 'Resultados_Bolsao', guardadas como 'category'
+COLUNAS_RESULTADOS_CATEGORICAS = ("Unidade", "Bolsão")
+
+# Abas lidas pelo app, servidas pela réplica local (Resultados em valores crus, como no snapshot)
+ABAS_REPLICADAS = [
+    ConfigAba("Resultados_Bolsao", render="UNFORMATTED_VALUE", coluna_id="REGISTRO_ID"),
+    ConfigAba("Hubspot", colunas=COLUNAS_HUBSPOT),
+    ConfigAba("Bolsão"),
+]
+
+
+def dataframe_hubspot(colunas: dict[str, list]) -> pd.DataFrame:
+    """DataFrame tipado (categorias/strings) a partir das colunas projetadas da aba 'Hubspot'."""
+    df = pd.DataFrame({
+        c: pd.Categorical(colunas[c]) if c in COLUNAS_HUBSPOT_CATEGORICAS else pd.array(colunas[c], dtype="string")
+        for c in COLUNAS_HUBSPOT
+    })
+    df.rename(columns={"Contato Realizado": "Contato realizado"}, inplace=True)
+    return df
+
+
+# --------------------------------------------------
+# UTILITÁRIOS DE LEITURA/ESCRITA
+# --------------------------------------------------
+def get_values(ws, a1_range: str):
+    """Leitura enxuta por range; muito mais barato que get_all_records()."""
+    return ws.get(a1_range, value_render_option="UNFORMATTED_VALUE")
+
+
+class RegistroNaoEncontrado(LookupError):
+    """O ID não está (mais) na aba: a linha foi apagada ou o ID editado."""
+
+
+def find_row_by_id(ws, id_col_idx: int, target_id: str):
+    """Evita ws.find repetido. Carrega a coluna de IDs 1x e busca em memória; erros da API sobem."""
+    col_values = ws.col_values(id_col_idx, value_render_option="UNFORMATTED_VALUE")[1:]  # ignora header
+    for i, value in enumerate(col_values, start=2):
+        if str(value) == str(target_id):
+            return i
+    return None
+
+
+def batch_update_cells(ws, updates):
+    """
+    Executa múltiplas atualizações de células em uma única requisição.
+    Aceita 'range' em A1 simples (ex.: 'Q446') ou completo (ex.: 'Resultados_Bolsao!Q446').
+    Prefixa o nome da aba quando necessário para evitar cair na aba errada (ex.: 'Limites').
+    """
+    if not updates:
+        return
+
+    fixed = []
+    sheet_title_safe = ws.title.replace("'", "''")  # escapa apóstrofos
+
+    for u in updates:
+        rng = u.get("range", "")
+        if not rng:
+            continue
+        if "!" not in rng:  # range sem nome de aba
+            rng = f"'{sheet_title_safe}'!{rng}"
+        fixed.append({"range": rng, "values": u.get("values", [[]])})
+
+    body = {"valueInputOption": "USER_ENTERED", "data": fixed}
+    ws.spreadsheet.values_batch_update(body)
+
+
+def ensure_size(ws, min_rows=2000, min_cols=40):
+    """Garante tamanho mínimo para evitar 'exceeds grid limits'."""
+    try:
+        if ws and (ws.row_count < min_rows or ws.col_count < min_cols):
+            ws.resize(rows=max(ws.row_count, min_rows), cols=max(ws.col_count, min_cols))
+    except Exception:
+        pass
+
+
+def new_uuid():
+    """Gera um ID único e curto."""
+    return uuid.uuid4().hex[:12]
+
+
+def a1_col_letter(col_idx: int) -> str:
+    """Converte índice numérico de coluna (1=A, 2=B, ...) para letra A1."""
+    return _letra(col_idx)
+
+
+def batch_get_values_prefixed(ws, ranges, value_render_option="UNFORMATTED_VALUE"):
+    """Batch GET em várias faixas A1, sempre prefixando com o nome da aba."""
+    if not ranges:
+        return []
+    title_safe = ws.title.replace("'", "''")
+    prefixed = [f"'{title_safe}'!{r}" if "!" not in r else r for r in ranges]
+    params = {'valueRenderOption': value_render_option}
+    resp = ws.spreadsheet.values_batch_get(prefixed, params=params)
+    return resp.get("valueRanges", [])
+
+
+def update_row_by_id(ws, id_col_idx: int, target_id: str, rownum_cache: int | None, valores: dict[int, object]) -> int:
+    """
+    Grava `valores` (índice da coluna -> valor) na linha do registro `target_id`.
+
+    A linha vinda do snapshot pode estar velha (alguém ordenou ou inseriu
+    linhas na planilha). Antes de escrever, lê só a célula de ID dessa linha;
+    se não bater, resolve de novo pela coluna de IDs (find_row_by_id). O
+    Sheets não tem escrita condicional, então isto é ler-conferir-escrever:
+    duas chamadas no caso comum, três quando a linha mudou de lugar.
+    Retorna a linha efetivamente gravada; RegistroNaoEncontrado se o ID sumiu.
+    """
+    rownum = None
+    if rownum_cache:
+        faixa = batch_get_values_prefixed(ws, [f"{a1_col_letter(id_col_idx)}{rownum_cache}"])
+        celula = (faixa[0].get("values") or [[""]])[0] if faixa else [""]
+        if celula and str(celula[0]) == str(target_id):
+            rownum = rownum_cache
+    if rownum is None:
+        rownum = find_row_by_id(ws, id_col_idx, target_id)
+    if rownum is None:
+        raise RegistroNaoEncontrado(f"Registro {target_id} não encontrado na aba '{ws.title}'.")
+    batch_update_cells(ws, [
+        {"range": f"{a1_col_letter(col_idx)}{rownum}", "values": [[valor]]} for col_idx, valor in valores.items()
+    ])
+    return rownum
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+Preços, bolsas e descontos do Bolsão 2026.
+
+O espaço de entrada é pequeno (25 totais de acertos x séries x unidades), então a
+tabela completa é pré-calculada com NumPy na importação e todas as consultas
+viram leitura de matriz: uma única fonte de verdade para as abas e para a
+exportação em CSV.
+"""
+import numpy as np
+import pandas as pd
+
+# --------------------------------------------------
+# DADOS DE REFERÊNCIA
+# --------------------------------------------------
+BOLSA_MAP = {
+    0: .30, 1: .30, 2: .30, 3: .35, 4: .40, 5: .40, 6: .44, 7: .45, 8: .46, 9: .47,
+    10: .48, 11: .49, 12: .50, 13: .51, 14: .52, 15: .53, 16: .54, 17: .55, 18: .56, 19: .57,
+    20: .60, 21: .65, 22: .70, 23: .80, 24: 1.00,
+}
+MAX_ACERTOS = 24
+
+# Regra especial do EF1 (prova com 10 questões): faixas de acertos -> bolsa
+SERIE_EF1 = "1º ao 5º Ano"
+MAX_ACERTOS_EF1 = 10
+BOLSA_EF1 = {0: 0.0, 1: .30, 2: .30, 3: .30, 4: .50, 5: .50, 6: .60, 7: .60, 8: .60, 9: .65, 10: .65}
+
+# --- DICIONÁRIO TUITION ATUALIZADO ---
+TUITION = {
+    "1ª e 2ª Série EM Militar": {"anuidade": 36670.00, "parcela13": 2820.77},
+    "1ª e 2ª Série EM Vestibular": {"anuidade": 36670.00, "parcela13": 2820.77},
+    "1º ao 5º Ano": {"anuidade": 26654.00, "parcela13": 2050.31},
+    "3ª Série (PV/PM)": {"anuidade": 36812.00, "parcela13": 2831.69},
+    "3ª Série EM Medicina": {"anuidade": 36812.00, "parcela13": 2831.69},
+    "6º ao 8º Ano": {"anuidade": 31354.00, "parcela13": 2411.85},
+    "9º Ano EF II Militar": {"anuidade": 34146.00, "parcela13": 2626.62},
+    "9º Ano EF II Vestibular": {"anuidade": 34146.00, "parcela13": 2626.62},
+    "AFA/EN/EFOMM": {"anuidade": 14802.00, "parcela13": 1138.62},
+    "CN/EPCAr": {"anuidade": 8863.00, "parcela13": 681.77},
+    "ESA": {"anuidade": 7145.00, "parcela13": 549.62},
+    "EsPCEx": {"anuidade": 14802.00, "parcela13": 1138.62},
+    "IME/ITA": {"anuidade": 14802.00, "parcela13": 1138.62},
+    "Medicina (Pré)": {"anuidade": 14802.00, "parcela13": 1138.62},
+    "Pré-Vestibular": {"anuidade": 14802.00, "parcela13": 1138.62},
+}
+
+UNIDADES_COMPLETAS = [
+    "COLEGIO E CURSO MATRIZ EDUCACAO CAMPO GRANDE", "COLEGIO E CURSO MATRIZ EDUCAÇÃO TAQUARA",
+    "COLEGIO E CURSO MATRIZ EDUCAÇÃO BANGU", "COLEGIO E CURSO MATRIZ EDUCACAO NOVA IGUACU",
+    "COLEGIO E CURSO MATRIZ EDUCAÇÃO DUQUE DE CAXIAS", "COLEGIO E CURSO MATRIZ EDUCAÇÃO SÃO JOÃO DE MERITI",
+    "COLEGIO E CURSO MATRIZ EDUCAÇÃO ROCHA MIRANDA", "COLEGIO E CURSO MATRIZ EDUCAÇÃO MADUREIRA",
+    "COLEGIO E CURSO MATRIZ EDUCAÇÃO RETIRO DOS ARTISTAS", "COLEGIO E CURSO MATRIZ EDUCACAO TIJUCA",
+]
+UNIDADES_MAP = {name.replace("COLEGIO E CURSO MATRIZ EDUCACAO", "").replace("COLEGIO E CURSO MATRIZ EDUCAÇÃO", "").strip(): name for name in UNIDADES_COMPLETAS}
+UNIDADES_LIMPAS = sorted(list(UNIDADES_MAP.keys()))
+
+DESCONTOS_MAXIMOS_POR_UNIDADE = {
+    "RETIRO DOS ARTISTAS": 0.50, "CAMPO GRANDE": 0.6320, "ROCHA MIRANDA": 0.6606,
+    "TAQUARA": 0.6755, "NOVA IGUACU": 0.6700, "DUQUE DE CAXIAS": 0.6823,
+    "BANGU": 0.6806, "MADUREIRA": 0.7032, "TIJUCA": 0.6800, "SÃO JOÃO DE MERITI": 0.7197,
+}
+
+DESCONTO_A_VISTA = 0.05
+
+# --- MATERIAL DIDÁTICO: curso -> (valor total, valor de cada parcela) ---
+MATERIAL_PARCELAS = 11
+MATERIAL_DIDATICO_PADRAO = {
+    "1ª ao 5ª ano": (2552.80, 232.07), "6ª ao 8ª ano": (2765.77, 251.43), "9ª ano Vestibular": (2872.69, 261.15),
+    "1ª e 2ª série Vestibular": (3399.67, 309.06), "3ª série": (4009.95, 364.54),
+}
+# Unidades com tabela própria (substitui a padrão inteira): unidade -> (título, tabela)
+MATERIAL_DIDATICO_EXCLUSIVO = {
+    "SÃO JOÃO DE MERITI": ("Material Didático (exclusivo São João de Meriti)", {
+        "1ª ao 5ª ano": (1933.56, 175.78), "6ª ao 8ª ano": (2020.92, 183.72), "9ª ano Vestibular": (2019.84, 183.62),
+        "1ª e 2ª série Vestibular": (2474.20, 224.93), "3ª série": (2932.21, 266.56),
+    }),
+}
+# Unidades que só alteram alguns cursos da tabela padrão
+MATERIAL_DIDATICO_AJUSTES = {
+    "RETIRO DOS ARTISTAS": {"1ª ao 5ª ano": (2552.80, 232.07)},
+}
+MATERIAL_GERAL = {"Medicina": (4009.95, 364.54), "Pré-Vestibular": (4009.95, 364.54)}
+MATERIAL_MILITARES = {
+    "AFA/EN/EFOMM": (2333.73, 212.16), "EPCAR": (2501.36, 227.40), "ESA": (1111.98, 101.09),
+    "EsPCEx": (2668.97, 242.63), "IME/ITA": (2333.73, 212.16),
+}
+
+
+# --------------------------------------------------
+# TABELA PRÉ-CALCULADA
+# --------------------------------------------------
+class TabelaPrecos:
+    """
+    Matrizes NumPy com todo o espaço de preços:
+    bolsa[serie, acertos], anuidade/parcela[serie] e valor_minimo[unidade, serie].
+    Séries ou unidades desconhecidas caem na linha extra (índice -1) de zeros,
+    com a bolsa padrão do BOLSA_MAP, como as funções escalares sempre fizeram.
+    """
+
+    def __init__(self, tuition: dict, descontos: dict, unidades: list[str]):
+        self.series = list(tuition)
+        self.unidades = list(unidades)
+        self.idx_serie = {s: i for i, s in enumerate(self.series)}
+        self.idx_unidade = {u: i for i, u in enumerate(self.unidades)}
+
+        n_series = len(self.series) + 1  # + linha "desconhecida"
+        acertos = np.arange(MAX_ACERTOS + 1)
+
+        bolsa_padrao = np.array([BOLSA_MAP.get(a, 0.30) for a in acertos])
+        ef1 = np.minimum(acertos, MAX_ACERTOS_EF1)
+        bolsa_ef1 = np.array([BOLSA_EF1[a] for a in ef1])
+        self.bolsa = np.tile(bolsa_padrao, (n_series, 1))
+        if SERIE_EF1 in self.idx_serie:
+            self.bolsa[self.idx_serie[SERIE_EF1]] = bolsa_ef1
+
+        self.parcela = np.zeros(n_series)
+        self.anuidade = np.zeros(n_series)
+        for s, i in self.idx_serie.items():
+            self.parcela[i] = float(tuition[s].get("parcela13", 0.0))
+            self.anuidade[i] = float(tuition[s].get("anuidade", self.parcela[i] * 13))
+
+        desconto = np.zeros(len(self.unidades) + 1)
+        for u, i in self.idx_unidade.items():
+            desconto[i] = descontos.get(u, 0.0)
+        # Piso mensal = anuidade com o desconto máximo da unidade, dividida em 12
+        self.valor_minimo = np.where(
+            (desconto[:, None] > 0) & (self.anuidade[None, :] > 0),
+            self.anuidade[None, :] * (1 - desconto[:, None]) / 12,
+            0.0,
+        )
+
+    def _i_serie(self, serie) -> int:
+        return self.idx_serie.get(serie, -1)
+
+    def _i_unidade(self, unidade) -> int:
+        return self.idx_unidade.get(unidade, -1)
+
+    def calcula_bolsa(self, acertos: int, serie_modalidade: str | None = None) -> float:
+        return float(self.bolsa[self._i_serie(serie_modalidade), max(0, min(int(acertos), MAX_ACERTOS))])
+
+    def precos(self, serie_modalidade: str) -> dict:
+        i = self._i_serie(serie_modalidade)
+        return {"primeira_cota": float(self.parcela[i]), "parcela_mensal": float(self.parcela[i]),
+                "anuidade": float(self.anuidade[i])}
+
+    def valor_minimo_mensal(self, unidade: str, serie_modalidade: str) -> float:
+        return float(self.valor_minimo[self._i_unidade(unidade), self._i_serie(serie_modalidade)])
+
+    def consulta(self, unidade: str, serie_modalidade: str, acertos: int) -> dict:
+        """Todos os valores derivados de (unidade, série, total de acertos)."""
+        pct = self.calcula_bolsa(acertos, serie_modalidade)
+        precos = self.precos(serie_modalidade)
+        return {
+            "bolsa": pct,
+            "anuidade": precos["anuidade"] * (1 - pct),
+            "anuidade_vista": precos["anuidade"] * (1 - pct) * (1 - DESCONTO_A_VISTA),
+            "primeira_cota": precos["primeira_cota"] * (1 - pct),
+            "valor_parcela": precos["parcela_mensal"] * (1 - pct),
+            "valor_minimo": self.valor_minimo_mensal(unidade, serie_modalidade),
+        }
+
+    def precifica(self, unidades, series, acertos) -> dict[str, np.ndarray]:
+        """
+        Versão vetorizada de consulta(): recebe arrays/Series alinhados e devolve
+        um array por valor derivado. Índice -1 (unidade/série desconhecida) cai
+        na linha de zeros, como no caso escalar.
+        """
+        iu = pd.Index(self.unidades).get_indexer(pd.Series(unidades, dtype=object))
+        is_ = pd.Index(self.series).get_indexer(pd.Series(series, dtype=object))
+        ia = np.clip(np.nan_to_num(np.asarray(acertos, dtype=float)), 0, MAX_ACERTOS).astype(int)
+
+        bolsa = self.bolsa[is_, ia]
+        anuidade = self.anuidade[is_] * (1 - bolsa)
+        parcela = self.parcela[is_] * (1 - bolsa)
+        minimo = self.valor_minimo[iu, is_]
+        return {
+            "bolsa": bolsa,
+            "anuidade": anuidade,
+            "anuidade_vista": anuidade * (1 - DESCONTO_A_VISTA),
+            "primeira_cota": parcela,
+            "valor_parcela": parcela,
+            "valor_minimo": minimo,
+            "abaixo_do_piso": (minimo > 0) & (parcela < minimo),
+        }
+
+    def dataframe(self) -> pd.DataFrame:
+        """Tabela completa (unidade x série x acertos) em formato longo, para exportação."""
+        n_u, n_s, n_a = len(self.unidades), len(self.series), MAX_ACERTOS + 1
+        iu, is_, ia = (g.ravel() for g in np.meshgrid(np.arange(n_u), np.arange(n_s), np.arange(n_a), indexing="ij"))
+        bolsa = self.bolsa[is_, ia]
+        anuidade = self.anuidade[is_] * (1 - bolsa)
+        return pd.DataFrame({
+            "unidade": np.asarray(self.unidades, dtype=object)[iu],
+            "serie": np.asarray(self.series, dtype=object)[is_],
+            "acertos": ia,
+            "bolsa": bolsa,
+            "anuidade": anuidade.round(2),
+            "anuidade_vista": (anuidade * (1 - DESCONTO_A_VISTA)).round(2),
+            "primeira_cota": (self.parcela[is_] * (1 - bolsa)).round(2),
+            "valor_parcela": (self.parcela[is_] * (1 - bolsa)).round(2),
+            "valor_minimo": self.valor_minimo[iu, is_].round(2),
+        })
+
+    def exporta_csv(self, destino=None):
+        """CSV de referência (separador ';', vírgula decimal e centavos, para abrir direto no Excel pt-BR)."""
+        return self.dataframe().to_csv(destino, sep=";", decimal=",", float_format="%.2f", index=False)
+
+
+TABELA_PRECOS = TabelaPrecos(TUITION, DESCONTOS_MAXIMOS_POR_UNIDADE, UNIDADES_LIMPAS)
+
+
+# --------------------------------------------------
+# API ESCALAR (LEITURAS DA TABELA)
+# --------------------------------------------------
+def precos_2026(serie_modalidade: str) -> dict:
+    """
+    Busca os preços corretos no dicionário TUITION.
+    A chave 'parcela13' é o valor da mensalidade e da primeira cota.
+    """
+    return TABELA_PRECOS.precos(serie_modalidade)
+
+
+def calcula_bolsa(acertos: int, serie_modalidade: str | None = None) -> float:
+    """Inclui a regra especial para o EF1 (1º ao 5º Ano)."""
+    return TABELA_PRECOS.calcula_bolsa(acertos, serie_modalidade)
+
+
+def calcula_valor_minimo(unidade, serie_modalidade) -> float:
+    """Mensalidade mínima negociável: anuidade com o desconto máximo da unidade, em 12x."""
+    return TABELA_PRECOS.valor_minimo_mensal(unidade, serie_modalidade)
+
+
+# --------------------------------------------------
+# API VETORIZADA (DATAFRAMES)
+# --------------------------------------------------
+# Colunas em reais da saída em massa, arredondadas a centavos como nas cartas
+COLUNAS_DINHEIRO = ("anuidade", "anuidade_vista", "primeira_cota", "valor_parcela", "valor_minimo")
+
+# Nome limpo ou completo (em maiúsculas) -> nome limpo da unidade
+UNIDADE_LIMPA = {**{u: u for u in UNIDADES_LIMPAS}, **{v: k for k, v in UNIDADES_MAP.items()}}
+
+
+def precifica_dataframe(df: pd.DataFrame, col_unidade: str = "unidade", col_serie: str = "serie",
+                        col_mat: str = "acertos_mat", col_port: str = "acertos_port") -> pd.DataFrame:
+    """
+    Projeção de preços para um DataFrame de candidatos, sem laço por linha.
+
+    A unidade pode vir com o nome limpo ('BANGU') ou completo (como na aba
+    'Hubspot'); a série é a chave do TUITION. Devolve uma cópia de `df` com as
+    colunas bolsa, anuidade_vista, primeira_cota, valor_parcela, valor_minimo
+    e abaixo_do_piso (valores em reais arredondados a centavos; o piso é
+    comparado antes do arredondamento).
+    """
+    unidades = df[col_unidade].astype(str).str.strip().str.upper().map(UNIDADE_LIMPA)
+    acertos = (
+        pd.to_numeric(df[col_mat], errors="coerce").fillna(0)
+        + pd.to_numeric(df[col_port], errors="coerce").fillna(0)
+    )
+    valores = TABELA_PRECOS.precifica(unidades, df[col_serie].astype(str), acertos)
+
+    out = df.copy()
+    for coluna in ("bolsa", "anuidade_vista", "primeira_cota", "valor_parcela", "valor_minimo", "abaixo_do_piso"):
+        out[coluna] = np.round(valores[coluna], 2) if coluna in COLUNAS_DINHEIRO else valores[coluna]
+    return out
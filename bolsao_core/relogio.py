@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Relógio de Brasília que não bloqueia.
+
+A hora remota (worldtimeapi) é amostrada por uma thread de fundo no máximo uma
+vez por intervalo; o app guarda só o deslocamento em relação ao relógio local e
+responde da memória. Sem sincronização (rede fora, API lenta) vale o relógio
+local, que era o fallback de antes.
+"""
+import threading
+import time
+from datetime import date, datetime
+
+import pytz
+import requests
+
+WORLDTIME_URL = "http://worldtimeapi.org/api/timezone/America/Sao_Paulo"
+TZ_BRASILIA = pytz.timezone("America/Sao_Paulo")
+
+
+class RelogioBrasilia:
+    """Hora local + offset sincronizado em segundo plano."""
+
+    def __init__(self, url: str = WORLDTIME_URL, intervalo: float = 900.0, timeout: float = 3.0):
+        self.url = url
+        self.intervalo = intervalo
+        self.timeout = timeout
+        self.offset = 0.0          # segundos a somar ao relógio local
+        self.drift = None          # variação do offset na última sincronização
+        self.ultima_sync = None    # time.monotonic() da última sincronização bem-sucedida
+        self.ultimo_erro = None
+        self._thread = None
+
+    def sincroniza(self):
+        """Uma amostra da hora remota; o offset usa o ponto médio da requisição."""
+        t0 = time.time()
+        response = requests.get(self.url, timeout=self.timeout)
+        response.raise_for_status()
+        t1 = time.time()
+        remoto = datetime.fromisoformat(response.json()["datetime"]).timestamp()
+        novo_offset = remoto - (t0 + t1) / 2
+        if self.ultima_sync is not None:
+            self.drift = novo_offset - self.offset
+        self.offset = novo_offset
+        self.ultima_sync = time.monotonic()
+        self.ultimo_erro = None
+
+    def iniciar(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name="relogio-brasilia", daemon=True)
+            self._thread.start()
+        return self
+
+    def _loop(self):
+        while True:
+            try:
+                self.sincroniza()
+            except Exception as e:
+                self.ultimo_erro = f"{type(e).__name__}: {e}"
+            time.sleep(self.intervalo)
+
+    def agora(self) -> datetime:
+        return datetime.fromtimestamp(time.time() + self.offset, tz=TZ_BRASILIA)
+
+    def hoje(self) -> date:
+        return self.agora().date()
+
+    def metricas(self) -> dict:
+        return {
+            "idade_sync": (time.monotonic() - self.ultima_sync) if self.ultima_sync is not None else None,
+            "offset": self.offset,
+            "drift": self.drift,
+            "ultimo_erro": self.ultimo_erro,
+        }
@@ -0,0 +1,402 @@
+# -*- coding: utf-8 -*-
+"""
+Renderização das cartas em PDF com WeasyPrint, individual ou em lote.
+
+O WeasyPrint (Pango/cairo) só é importado na primeira renderização, não na
+carga do módulo: quem só importa o pacote não paga esse custo.
+"""
+import hashlib
+import io
+import mimetypes
+import multiprocessing as mp
+import os
+import re
+import threading
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+
+from bolsao_core import BASE_DIR, DADOS_DIR
+from bolsao_core.cache_pdf import CachePDF, chave_pdf
+
+# Arquivos referenciados pelo carta.html e servidos da memória
+ARQUIVOS_ESTATICOS = ("style.css", "images/logo.png", "images/qr-code.png")
+
+_RE_PLACEHOLDER = re.compile(r"\{\{(\w+)\}\}")
+_RE_LINK_CSS = re.compile(r"<link[^>]*href=[\"']style\.css[\"'][^>]*>", re.IGNORECASE)
+
+
+class TemplateCarta:
+    """
+    carta.html pré-compilado: texto já dividido nos {{placeholders}},
+    style.css interpretado (weasyprint.CSS, na primeira renderização) e
+    imagens em memória. As versões (hash do conteúdo) entram na chave do cache de PDFs.
+    """
+
+    def __init__(self, base_dir=BASE_DIR):
+        self.base_dir = Path(base_dir).resolve()
+        self.mtimes = self._mtimes()
+
+        self.estaticos = {}
+        for nome in ARQUIVOS_ESTATICOS:
+            caminho = self.base_dir / nome
+            if caminho.exists():
+                self.estaticos[caminho] = caminho.read_bytes()
+
+        html = (self.base_dir / "carta.html").read_text(encoding="utf-8")
+        # O CSS entra já interpretado em write_pdf(); o <link> faria o WeasyPrint relê-lo
+        html = _RE_LINK_CSS.sub("", html)
+        # Partes pares são texto literal, ímpares são nomes de placeholder
+        self.partes = _RE_PLACEHOLDER.split(html)
+
+        css_path = self.base_dir / "style.css"
+        self.versao_css = hashlib.sha256(self.estaticos.get(css_path, b"")).hexdigest()
+        h = hashlib.sha256(html.encode("utf-8"))
+        for caminho, conteudo in sorted(self.estaticos.items()):
+            if caminho != css_path:
+                h.update(caminho.name.encode("utf-8") + b"\0" + conteudo)
+        self.versao_template = h.hexdigest()
+        self._css = None
+
+    @property
+    def css(self):
+        """style.css interpretado só quando for renderizar (quem só calcula a chave não importa o WeasyPrint)."""
+        if self._css is None:
+            import weasyprint
+
+            self._css = weasyprint.CSS(
+                string=self.estaticos.get(self.base_dir / "style.css", b"").decode("utf-8"),
+                base_url=str(self.base_dir), url_fetcher=self.url_fetcher,
+            )
+        return self._css
+
+    def _mtimes(self) -> tuple:
+        arquivos = ("carta.html",) + ARQUIVOS_ESTATICOS
+        return tuple((self.base_dir / nome).stat().st_mtime_ns if (self.base_dir / nome).exists() else 0
+                     for nome in arquivos)
+
+    def desatualizado(self) -> bool:
+        """Indica se algum arquivo da carta mudou no disco desde o carregamento."""
+        return self._mtimes() != self.mtimes
+
+    def url_fetcher(self, url: str):
+        """Entrega style.css e as imagens da memória; o resto segue o fetcher padrão."""
+        if url.startswith("file:"):
+            caminho = Path(url2pathname(urlparse(url).path)).resolve()
+            conteudo = self.estaticos.get(caminho)
+            if conteudo is not None:
+                mime, _ = mimetypes.guess_type(caminho.name)
+                return {"string": conteudo, "mime_type": mime, "redirected_url": url}
+        import weasyprint
+
+        return weasyprint.default_url_fetcher(url)
+
+    def preenche(self, ctx: dict) -> str:
+        """Substitui todos os placeholders em uma única passada (chaves ausentes ficam como estão)."""
+        partes = self.partes[:]
+        for i in range(1, len(partes), 2):
+            chave = partes[i]
+            partes[i] = str(ctx[chave]) if chave in ctx else f"{{{{{chave}}}}}"
+        return "".join(partes)
+
+    def chave_cache(self, ctx: dict) -> str:
+        return chave_pdf(self.preenche(ctx), self.versao_template, self.versao_css)
+
+    def render(self, ctx: dict) -> bytes:
+        import weasyprint
+
+        html_obj = weasyprint.HTML(string=self.preenche(ctx), base_url=str(self.base_dir), url_fetcher=self.url_fetcher)
+        return html_obj.write_pdf(stylesheets=[self.css])
+
+
+_templates: dict[Path, TemplateCarta] = {}
+_templates_lock = threading.Lock()
+
+
+def carrega_template(base_dir=BASE_DIR) -> TemplateCarta:
+    """Devolve o template em cache, recarregando se carta.html/style.css/imagens mudarem."""
+    chave = Path(base_dir).resolve()
+    with _templates_lock:
+        template = _templates.get(chave)
+        if template is None or template.desatualizado():
+            template = _templates[chave] = TemplateCarta(chave)
+        return template
+
+
+# --------------------------------------------------
+# RENDERIZAÇÃO EM LOTE (POOL DE PROCESSOS)
+# --------------------------------------------------
+_base_dir_worker = BASE_DIR
+
+
+def _inicia_worker(base_dir: str):
+    """Carrega o template da carta uma vez por processo do pool."""
+    global _base_dir_worker
+    _base_dir_worker = base_dir
+    carrega_template(base_dir)
+
+
+def _render_worker(ctx: dict) -> bytes:
+    return carrega_template(_base_dir_worker).render(ctx)
+
+
+def _aquece_worker(base_dir: str):
+    """Inicializador do pool persistente: template carregado e uma carta em branco renderizada (fontes carregadas)."""
+    _inicia_worker(base_dir)
+    carrega_template(base_dir).render({})
+
+
+def _render_worker_medido(ctx: dict) -> tuple[bytes, float]:
+    t0 = time.perf_counter()
+    return _render_worker(ctx), time.perf_counter() - t0
+
+
+def _ping_worker() -> int:
+    return os.getpid()
+
+
+def gera_cartas_em_lote(contextos, max_workers: int | None = None, base_dir=BASE_DIR) -> list[bytes]:
+    """
+    Gera um PDF por contexto, na mesma ordem de entrada.
+    Usa um pool de processos ('spawn', seguro dentro do servidor do Streamlit)
+    e reaproveita o template pré-compilado entre os documentos de cada processo.
+    """
+    contextos = list(contextos)
+    if not contextos:
+        return []
+
+    workers = max_workers or min(len(contextos), os.cpu_count() or 1)
+    if workers <= 1:
+        template = carrega_template(base_dir)
+        return [template.render(ctx) for ctx in contextos]
+
+    chunksize = max(1, len(contextos) // (workers * 4))
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=mp.get_context("spawn"),
+        initializer=_inicia_worker,
+        initargs=(str(base_dir),),
+    ) as pool:
+        return list(pool.map(_render_worker, contextos, chunksize=chunksize))
+
+
+# --------------------------------------------------
+# POOL PERSISTENTE (CARTAS INDIVIDUAIS E LOTES DO APP)
+# --------------------------------------------------
+class FilaRenderCheia(RuntimeError):
+    """O pool de renderização já tem o máximo de cartas aguardando."""
+
+
+class PoolRenderizacao:
+    """
+    Pool persistente de processos de renderização, aquecido na criação: cada
+    processo já sobe com o style.css interpretado, as imagens em memória e as
+    fontes carregadas. Cartas individuais não bloqueiam a thread do Streamlit
+    nem disputam o GIL entre sessões.
+
+    `profundidade_maxima` limita as cartas aguardando além das que já estão
+    sendo renderizadas; acima disso `renderiza` levanta FilaRenderCheia.
+    Com `cache`, cartas idênticas voltam do disco sem passar pelo pool.
+    """
+
+    def __init__(self, base_dir=BASE_DIR, max_workers: int | None = None,
+                 profundidade_maxima: int = 32, timeout: float = 60.0, janela_latencias: int = 200,
+                 cache: CachePDF | None = None):
+        self.base_dir = str(Path(base_dir).resolve())
+        self.cache = cache
+        self.max_workers = max_workers or max(1, min(4, os.cpu_count() or 1))
+        self.profundidade_maxima = profundidade_maxima
+        self.timeout = timeout
+        self.em_andamento = 0
+        self.concluidas = 0
+        self.falhas = 0
+        self.rejeitadas = 0
+        self.expiradas = 0
+        self.reinicios = 0
+        self.ultimo_erro = None
+        self.latencias = deque(maxlen=janela_latencias)  # (total com espera, só renderização) em segundos
+        self._lock = threading.Lock()
+        self._pool = None
+
+    @classmethod
+    def do_ambiente(cls, base_dir=BASE_DIR):
+        """
+        Configuração por variáveis de ambiente: BOLSAO_PDF_WORKERS, BOLSAO_PDF_FILA,
+        BOLSAO_PDF_TIMEOUT e BOLSAO_PDF_CACHE_MB (0 desliga o cache em disco).
+        """
+        cache_mb = float(os.environ.get("BOLSAO_PDF_CACHE_MB", 200))
+        return cls(
+            base_dir,
+            max_workers=int(os.environ.get("BOLSAO_PDF_WORKERS", 0)) or None,
+            profundidade_maxima=int(os.environ.get("BOLSAO_PDF_FILA", 32)),
+            timeout=float(os.environ.get("BOLSAO_PDF_TIMEOUT", 60)),
+            cache=CachePDF(DADOS_DIR / "cache_pdf", int(cache_mb * 1024 * 1024)) if cache_mb > 0 else None,
+        )
+
+    def iniciar(self):
+        """Cria o pool e sobe todos os processos já aquecidos (o executor só cria processo sob demanda)."""
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=mp.get_context("spawn"),
+                    initializer=_aquece_worker,
+                    initargs=(self.base_dir,),
+                )
+                for _ in range(self.max_workers):
+                    self._pool.submit(_ping_worker)
+        return self
+
+    def _reinicia(self, pool):
+        """Descarta um pool quebrado (processo morto) para que a próxima chamada crie outro."""
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+                self.reinicios += 1
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _chave(self, ctx: dict) -> str | None:
+        return carrega_template(self.base_dir).chave_cache(ctx) if self.cache else None
+
+    def _submete(self, ctx: dict):
+        """
+        Admissão e contabilidade comuns a cartas individuais e lotes: None se a
+        fila está cheia; senão o Future do job, que libera a vaga e registra
+        latência ou falha quando o processo termina (não quando alguém desiste de esperar).
+        """
+        with self._lock:
+            if self.em_andamento >= self.max_workers + self.profundidade_maxima:
+                return None
+            self.em_andamento += 1
+        pool = None
+        try:
+            pool = self.iniciar()._pool
+            t0 = time.perf_counter()
+            futuro = pool.submit(_render_worker_medido, ctx)
+        except Exception as e:
+            with self._lock:
+                self.em_andamento -= 1
+            if isinstance(e, BrokenProcessPool) and pool is not None:
+                self._reinicia(pool)
+            raise
+        futuro.add_done_callback(lambda f: self._concluido(f, pool, t0))
+        return futuro
+
+    def _concluido(self, futuro, pool, t0: float):
+        erro = None if futuro.cancelled() else futuro.exception()
+        with self._lock:
+            self.em_andamento -= 1
+            if futuro.cancelled():
+                pass
+            elif erro is None:
+                self.latencias.append((time.perf_counter() - t0, futuro.result()[1]))
+                self.concluidas += 1
+            else:
+                self.falhas += 1
+                self.ultimo_erro = f"{type(erro).__name__}: {erro}"
+        if isinstance(erro, BrokenProcessPool):
+            self._reinicia(pool)
+
+    def _rejeita(self):
+        with self._lock:
+            self.rejeitadas += 1
+            em_andamento = self.em_andamento
+        raise FilaRenderCheia(f"{em_andamento} cartas já estão na fila de renderização.")
+
+    def _espera(self, futuro) -> bytes:
+        try:
+            return futuro.result(timeout=self.timeout)[0]
+        except FuturesTimeout:
+            # O job segue ocupando o processo; a vaga só volta quando ele terminar
+            with self._lock:
+                self.expiradas += 1
+                self.ultimo_erro = f"Renderização passou de {self.timeout:.0f} s."
+            raise
+
+    def renderiza(self, ctx: dict) -> bytes:
+        """Renderiza uma carta em um processo do pool (ou devolve a do cache) e devolve o PDF."""
+        chave = self._chave(ctx)
+        if chave:
+            pdf = self.cache.obtem(chave)
+            if pdf is not None:
+                return pdf
+        futuro = self._submete(ctx)
+        if futuro is None:
+            self._rejeita()
+        pdf = self._espera(futuro)
+        if chave:
+            self.cache.guarda(chave, pdf)
+        return pdf
+
+    def renderiza_lote(self, contextos) -> list[bytes]:
+        """
+        Lote no mesmo pool, na ordem de entrada, pela mesma admissão das cartas
+        individuais: o lote ocupa as vagas livres e espera as próprias cartas
+        terminarem para enviar as seguintes. Só é recusado (FilaRenderCheia) se
+        não conseguir nenhuma vaga.
+        """
+        contextos = list(contextos)
+        chaves = [self._chave(ctx) for ctx in contextos]
+        pdfs = [self.cache.obtem(c) if c else None for c in chaves]
+        faltando = deque(i for i, pdf in enumerate(pdfs) if pdf is None)
+        enviados = {}  # índice -> Future, na ordem de envio
+        try:
+            while faltando or enviados:
+                while faltando:
+                    futuro = self._submete(contextos[faltando[0]])
+                    if futuro is None:
+                        break
+                    enviados[faltando.popleft()] = futuro
+                if not enviados:
+                    self._rejeita()
+                # Recolhe a mais antiga; libera vaga para o resto do lote
+                i = next(iter(enviados))
+                pdfs[i] = self._espera(enviados.pop(i))
+                if chaves[i]:
+                    self.cache.guarda(chaves[i], pdfs[i])
+        except BaseException:
+            for futuro in enviados.values():
+                futuro.cancel()
+            raise
+        return pdfs
+
+    def status(self) -> dict:
+        with self._lock:
+            latencias = list(self.latencias)
+            status = {
+                "workers": self.max_workers,
+                "ativo": self._pool is not None,
+                "em_andamento": self.em_andamento,
+                "na_fila": max(0, self.em_andamento - self.max_workers),
+                "profundidade_maxima": self.profundidade_maxima,
+                "concluidas": self.concluidas,
+                "falhas": self.falhas,
+                "rejeitadas": self.rejeitadas,
+                "expiradas": self.expiradas,
+                "reinicios": self.reinicios,
+                "ultimo_erro": self.ultimo_erro,
+            }
+        totais = sorted(t for t, _ in latencias)
+        renders = sorted(r for _, r in latencias)
+
+        def pct(valores, p):
+            return valores[min(len(valores) - 1, int(p * len(valores)))] if valores else None
+
+        status.update(p50=pct(totais, 0.50), p95=pct(totais, 0.95), p50_render=pct(renders, 0.50))
+        status["cache"] = self.cache.status() if self.cache else None
+        return status
+
+
+def empacota_zip(arquivos: dict[str, bytes]) -> bytes:
+    """Empacota {nome_do_arquivo: bytes} em um único ZIP (sem recompressão: PDF já é comprimido)."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as zf:
+        for nome, conteudo in arquivos.items():
+            zf.writestr(nome, conteudo)
+    return buffer.getvalue()
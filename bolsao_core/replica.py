@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+"""
+Réplica local de leitura das abas da planilha.
+
+Cada aba fica em memória (leituras sem chamada de API) e é persistida em SQLite
+para que um processo novo já suba com dados. Uma thread de fundo sincroniza de
+forma incremental: um único batch get traz o cabeçalho e as linhas a partir de
+(total conhecido - janela_recente), o que cobre linhas novas e as editadas
+recentemente. Uma releitura completa periódica (no máximo a cada 5 minutos,
+o TTL do cache antigo) pega edições feitas direto na planilha em linhas
+antigas. Uma leitura que começou antes de uma escrita local (aplica_celulas/
+aplica_linhas) é descartada, para não trazer de volta o valor anterior.
+
+Abas configuradas com `colunas` são lidas com projeção: só as colunas pedidas
+trafegam (majorDimension=COLUMNS), independente da largura da aba.
+
+Toda mudança (sincronização ou escrita local) incrementa a versão da aba e
+anota quais linhas mudaram; `mudancas_desde` deixa quem mantém estruturas
+derivadas aplicar só o delta em vez de reconstruir tudo.
+"""
+import json
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+
+# Versões guardadas no histórico de mudanças de cada aba
+HISTORICO_MUDANCAS = 256
+
+
+@dataclass
+class ConfigAba:
+    titulo: str
+    render: str = "FORMATTED_VALUE"
+    colunas: tuple[str, ...] | None = None  # None = aba inteira
+    coluna_id: str | None = None  # identifica linhas pendentes (aplica_linhas) já gravadas
+
+
+@dataclass
+class EstadoAba:
+    cabecalho: list = field(default_factory=list)
+    linhas: list = field(default_factory=list)  # linhas[i] é a linha i + 2 da planilha
+    versao: int = 0
+    ultima_sync: float = 0.0
+    ultima_sync_total: float = 0.0
+    posicoes: dict = field(default_factory=dict)  # coluna projetada -> índice na aba (1-based)
+    escritas_locais: int = 0  # aplica_celulas/aplica_linhas feitas; sync iniciada antes delas é descartada
+    largura: int = 0  # colunas vistas no cabeçalho; ws.col_count fica congelado desde a abertura da aba
+    pendentes: list = field(default_factory=list)  # enviadas pelo app, ainda não vistas na planilha
+    historico: deque = field(default_factory=lambda: deque(maxlen=HISTORICO_MUDANCAS))  # (versao, índices)
+
+    def todas(self) -> list:
+        return self.linhas + self.pendentes if self.pendentes else self.linhas
+
+    def marca(self, indices):
+        """Nova versão; `indices` são as posições alteradas (None = tudo, ex.: cabeçalho mudou)."""
+        self.versao += 1
+        self.historico.append((self.versao, None if indices is None else frozenset(indices)))
+
+
+@dataclass(frozen=True)
+class Mudancas:
+    """Retrato consistente de uma aba e do que mudou desde uma versão (ver mudancas_desde)."""
+    versao: int
+    indices: frozenset | None  # posições em `linhas` alteradas; None = reconstruir tudo
+    cabecalho: list
+    linhas: list
+    n_confirmadas: int  # linhas[n_confirmadas:] são pendentes
+
+
+def _letra(col_idx: int) -> str:
+    """Letra A1 da coluna (1=A, 27=AA), sem importar o gspread."""
+    letras = ""
+    while col_idx > 0:
+        col_idx, resto = divmod(col_idx - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def _posicoes(cabecalho_completo: list, nomes) -> dict:
+    indices = {str(h).strip(): i + 1 for i, h in enumerate(cabecalho_completo) if str(h).strip()}
+    return {n: indices[n] for n in nomes if n in indices}
+
+
+def _normaliza(linha: list, largura: int) -> list:
+    """A API corta células vazias no fim da linha; ajusta a linha à largura do cabeçalho."""
+    if len(linha) < largura:
+        return list(linha) + [""] * (largura - len(linha))
+    return list(linha[:largura])
+
+
+class ReplicaPlanilha:
+    """Réplica em memória + SQLite de um conjunto de abas, com sincronização incremental."""
+
+    def __init__(self, caminho_db, obter_ws, abas, janela_recente: int = 200,
+                 intervalo_sync: float = 30.0, intervalo_total: float = 300.0):
+        self.obter_ws = obter_ws
+        self.abas = {cfg.titulo: cfg for cfg in abas}
+        self.janela_recente = janela_recente
+        self.intervalo_sync = intervalo_sync
+        self.intervalo_total = intervalo_total
+        self.ultimo_erro = None
+        self.leituras_descartadas = 0
+
+        self._estado = {titulo: EstadoAba() for titulo in self.abas}
+        self._lock = threading.RLock()
+        self._thread = None
+
+        Path(caminho_db).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(caminho_db, check_same_thread=False)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS abas (aba TEXT PRIMARY KEY, cabecalho TEXT NOT NULL,"
+            " ultima_sync_total REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS linhas (aba TEXT NOT NULL, rownum INTEGER NOT NULL,"
+            " valores TEXT NOT NULL, PRIMARY KEY (aba, rownum));"
+        )
+        self._carrega_do_disco()
+
+    # ---------------- persistência ----------------
+    def _carrega_do_disco(self):
+        for titulo, estado in self._estado.items():
+            meta = self._conn.execute(
+                "SELECT cabecalho, ultima_sync_total FROM abas WHERE aba = ?", (titulo,)
+            ).fetchone()
+            if not meta:
+                continue
+            estado.cabecalho = json.loads(meta[0])
+            estado.ultima_sync_total = meta[1]
+            estado.linhas = [
+                json.loads(v) for (v,) in self._conn.execute(
+                    "SELECT valores FROM linhas WHERE aba = ? ORDER BY rownum", (titulo,)
+                )
+            ]
+            estado.versao = 1
+
+    def _persiste(self, titulo: str, estado: EstadoAba, alteradas: list[int]):
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO abas (aba, cabecalho, ultima_sync_total) VALUES (?, ?, ?)",
+                (titulo, json.dumps(estado.cabecalho, ensure_ascii=False), estado.ultima_sync_total),
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO linhas (aba, rownum, valores) VALUES (?, ?, ?)",
+                [(titulo, i + 2, json.dumps(estado.linhas[i], ensure_ascii=False, default=str)) for i in alteradas],
+            )
+            self._conn.execute(
+                "DELETE FROM linhas WHERE aba = ? AND rownum > ?", (titulo, len(estado.linhas) + 1)
+            )
+
+    # ---------------- sincronização ----------------
+    def sincroniza(self, titulo: str, total: bool = False) -> bool:
+        """Sincroniza uma aba com uma única requisição. Retorna True se algo mudou."""
+        cfg = self.abas[titulo]
+        ws = self.obter_ws(titulo)
+        if ws is None:
+            raise ConnectionError(f"Aba '{titulo}' indisponível.")
+
+        with self._lock:
+            estado = self._estado[titulo]
+            agora = time.time()
+            total = total or not estado.cabecalho or (agora - estado.ultima_sync_total) > self.intervalo_total
+            inicio = 2 if total else max(2, len(estado.linhas) + 2 - self.janela_recente)
+            posicoes = dict(estado.posicoes)
+            largura = max(ws.col_count, estado.largura, 1)
+            escritas = estado.escritas_locais
+
+        titulo_safe = ws.title.replace("'", "''")
+        ultima_col = _letra(largura)
+        # Cabeçalho pela linha inteira: mostra colunas acrescentadas depois que a aba foi aberta
+        faixas = [f"'{titulo_safe}'!1:1"]
+        if cfg.colunas is None:
+            faixas.append(f"'{titulo_safe}'!A{inicio}:{ultima_col}")
+            params = {"valueRenderOption": cfg.render}
+        else:
+            # Sem posições conhecidas (primeira sync) a requisição traz só o cabeçalho
+            faixas += [f"'{titulo_safe}'!{_letra(i)}{inicio}:{_letra(i)}" for i in posicoes.values()]
+            params = {"valueRenderOption": cfg.render, "majorDimension": "COLUMNS"}
+        resp = ws.spreadsheet.values_batch_get(faixas, params=params).get("valueRanges", [])
+
+        if cfg.colunas is None:
+            cab_vals = resp[0].get("values", []) if resp else []
+            cabecalho = [str(h) for h in cab_vals[0]] if cab_vals else []
+            if len(cabecalho) > largura:
+                # A faixa de dados parou antes das colunas novas: relê tudo com a largura certa
+                with self._lock:
+                    self._estado[titulo].largura = len(cabecalho)
+                return self.sincroniza(titulo, total=True)
+            cauda = [_normaliza(l, len(cabecalho)) for l in (resp[1].get("values", []) if len(resp) > 1 else [])]
+        else:
+            cab_cols = resp[0].get("values", []) if resp else []
+            novas_posicoes = _posicoes([c[0] if c else "" for c in cab_cols], cfg.colunas)
+            if novas_posicoes != posicoes:
+                with self._lock:
+                    self._estado[titulo].posicoes = novas_posicoes
+                return self.sincroniza(titulo, total=True)
+            cabecalho = list(posicoes)
+            colunas = [(fx.get("values") or [[]])[0] for fx in resp[1:]]
+            n = max((len(c) for c in colunas), default=0)
+            cauda = [[c[i] if i < len(c) else "" for c in colunas] for i in range(n)]
+
+        with self._lock:
+            estado = self._estado[titulo]
+            # Coluna inserida/renomeada: as linhas antigas não valem mais (relê fora do lock)
+            refazer = not total and cabecalho != estado.cabecalho
+        if refazer:
+            return self.sincroniza(titulo, total=True)
+
+        with self._lock:
+            estado = self._estado[titulo]
+            if estado.escritas_locais != escritas:
+                # A resposta pode ser anterior à escrita local; a próxima sincronização relê
+                self.leituras_descartadas += 1
+                return False
+            novas = estado.linhas[: inicio - 2] + cauda
+            alteradas = [
+                i for i in range(inicio - 2, len(novas))
+                if i >= len(estado.linhas) or estado.linhas[i] != novas[i]
+            ]
+            pendentes = self._ainda_pendentes(cfg, cabecalho, estado.pendentes, cauda)
+            mudou = (bool(alteradas) or len(novas) != len(estado.linhas) or cabecalho != estado.cabecalho
+                     or len(pendentes) != len(estado.pendentes))
+            if mudou:
+                indices = set(alteradas)
+                if estado.pendentes or pendentes:
+                    # As pendentes ficam depois das confirmadas: se o total mudou, todas mudam de posição
+                    indices.update(range(min(len(estado.linhas), len(novas)), len(novas) + len(pendentes)))
+                cabecalho_mudou = cabecalho != estado.cabecalho
+                estado.cabecalho = cabecalho
+                estado.linhas = novas
+                estado.pendentes = pendentes
+                estado.marca(None if cabecalho_mudou else indices)
+            estado.ultima_sync = agora
+            if total:
+                estado.ultima_sync_total = agora
+            if mudou or total:  # sem mudança, só a sync total tem o que guardar (ultima_sync_total)
+                self._persiste(titulo, estado, alteradas)
+        return mudou
+
+    @staticmethod
+    def _ainda_pendentes(cfg: ConfigAba, cabecalho: list, pendentes: list, cauda: list) -> list:
+        """Pendentes cujo ID ainda não apareceu nas linhas lidas (sem coluna_id, a leitura confirma todas)."""
+        if not pendentes:
+            return []
+        if not cfg.coluna_id or cfg.coluna_id not in cabecalho:
+            return []
+        j = cabecalho.index(cfg.coluna_id)
+        gravados = {str(l[j]) for l in cauda if j < len(l)}
+        return [p for p in pendentes if j >= len(p) or str(p[j]) not in gravados]
+
+    def iniciar(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._loop, name="replica-planilha", daemon=True)
+            self._thread.start()
+        return self
+
+    def _loop(self):
+        while True:
+            for titulo in self.abas:
+                try:
+                    self.sincroniza(titulo)
+                    self.ultimo_erro = None
+                except Exception as e:
+                    self.ultimo_erro = f"{titulo}: {type(e).__name__}: {e}"
+            time.sleep(self.intervalo_sync)
+
+    def _garante(self, titulo: str) -> EstadoAba:
+        """Na primeira leitura de um processo sem cache em disco, sincroniza na hora."""
+        estado = self._estado[titulo]
+        if not estado.cabecalho:
+            self.sincroniza(titulo, total=True)
+        return estado
+
+    # ---------------- leitura ----------------
+    def versao(self, titulo: str) -> int:
+        return self._garante(titulo).versao
+
+    def cabecalho(self, titulo: str) -> list:
+        return self._garante(titulo).cabecalho
+
+    def header_map(self, titulo: str) -> dict:
+        """Mapa 'nome_da_coluna': índice (1-based), igual ao header_map do app."""
+        return {h.strip(): i + 1 for i, h in enumerate(self.cabecalho(titulo)) if h and h.strip()}
+
+    def linhas(self, titulo: str) -> list:
+        """Linhas da planilha seguidas das pendentes (aplica_linhas) que a sincronização ainda não viu."""
+        return self._garante(titulo).todas()
+
+    def n_pendentes(self, titulo: str) -> int:
+        return len(self._garante(titulo).pendentes)
+
+    def mudancas_desde(self, titulo: str, versao: int) -> Mudancas:
+        """
+        Linhas atuais e posições alteradas desde `versao`, lidas de uma vez.
+        `indices` None = reconstruir tudo (histórico não alcança a versão ou o
+        cabeçalho mudou); posições além do total atual são linhas removidas.
+        """
+        with self._lock:
+            estado = self._garante(titulo)
+            indices = frozenset()
+            historico = estado.historico
+            if versao != estado.versao:
+                if versao > estado.versao or not historico or historico[0][0] > versao + 1:
+                    indices = None
+                else:
+                    alteradas = [a for v, a in historico if v > versao]
+                    indices = None if None in alteradas else frozenset().union(*alteradas)
+            return Mudancas(estado.versao, indices, estado.cabecalho, estado.todas(), len(estado.linhas))
+
+    def colunas(self, titulo: str, nomes) -> dict[str, list]:
+        """Valores de cada coluna pedida (a partir da linha 2), por nome de cabeçalho."""
+        hmap = self.header_map(titulo)
+        linhas = self.linhas(titulo)
+        return {n: [l[hmap[n] - 1] if hmap[n] - 1 < len(l) else "" for l in linhas] for n in nomes if n in hmap}
+
+    # ---------------- escrita local (write-through) ----------------
+    def aplica_celulas(self, titulo: str, rownum: int, valores: dict):
+        """Reflete na réplica uma atualização que o app acabou de enviar à planilha."""
+        with self._lock:
+            estado = self._estado[titulo]
+            hmap = self.header_map(titulo)
+            i = rownum - 2
+            if not (0 <= i < len(estado.linhas)):
+                return
+            linha = _normaliza(estado.linhas[i], len(estado.cabecalho))
+            for col, valor in valores.items():
+                if col in hmap:
+                    linha[hmap[col] - 1] = valor
+            estado.linhas[i] = linha
+            estado.escritas_locais += 1
+            estado.marca([i])
+            self._persiste(titulo, estado, [i])
+
+    def aplica_linhas(self, titulo: str, linhas: list[list]):
+        """
+        Acrescenta como pendentes linhas que o app acabou de enfileirar (na ordem
+        do cabeçalho). Aparecem em linhas() na hora e saem da lista de pendentes
+        quando a sincronização encontra o seu `coluna_id` na planilha.
+        """
+        if not linhas:
+            return
+        with self._lock:
+            estado = self._garante(titulo)
+            inicio = len(estado.linhas) + len(estado.pendentes)
+            estado.pendentes = estado.pendentes + [_normaliza(l, len(estado.cabecalho)) for l in linhas]
+            estado.escritas_locais += 1
+            estado.marca(range(inicio, inicio + len(linhas)))
+
+    # ---------------- observabilidade ----------------
+    def status(self) -> dict:
+        agora = time.time()
+        return {
+            titulo: {
+                "linhas": len(e.linhas),
+                "pendentes": len(e.pendentes),
+                "versao": e.versao,
+                "idade_sync": (agora - e.ultima_sync) if e.ultima_sync else None,
+            }
+            for titulo, e in self._estado.items()
+        }
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Gravação das cartas geradas em 'Resultados_Bolsao' em um único caminho.
+
+Tudo o que a linha precisa sai da memória: o cabeçalho vem da réplica (que
+já tem os metadados da aba), o nome do bolsão do calendário e a hora do
+relógio sincronizado. A única chamada à API por carta é a escrita, e a fila
+ainda junta as cartas pendentes no mesmo append_rows. As linhas entram na
+réplica como pendentes no mesmo instante, então todas as sessões já as veem
+antes do envio.
+"""
+from datetime import datetime
+
+from bolsao_core.calendario import BOLSAO_AVULSO
+from bolsao_core.carta import monta_registro_resultado, registro_para_linha
+
+ABA_RESULTADOS = "Resultados_Bolsao"
+
+
+class RegistroResultados:
+    """Monta as linhas de 'Resultados_Bolsao' e as entrega à fila de escrita."""
+
+    def __init__(self, replica, fila, calendario, titulo: str = ABA_RESULTADOS):
+        self.replica = replica
+        self.fila = fila
+        self.calendario = calendario
+        self.titulo = titulo
+
+    def cabecalho(self) -> dict:
+        """Mapa coluna -> índice da aba; ValueError se a aba não servir para registro."""
+        hmap = self.replica.header_map(self.titulo)
+        if not hmap:
+            raise ValueError(f"Não foi possível ler o cabeçalho da aba '{self.titulo}'.")
+        if "REGISTRO_ID" not in hmap:
+            raise ValueError(f"A aba '{self.titulo}' precisa de uma coluna chamada 'REGISTRO_ID'.")
+        return hmap
+
+    def linhas(self, itens, usuario: str, agora: datetime) -> list[list]:
+        """Linhas na ordem do cabeçalho; `itens` são (contexto_da_carta, unidade_limpa, serie_modalidade)."""
+        hmap = self.cabecalho()
+        try:
+            nome_bolsao = self.calendario.nome_para(agora.date())
+        except Exception:
+            # Aba 'Bolsão' ilegível (rede, réplica vazia): a carta já saiu, o registro não pode se perder
+            nome_bolsao = BOLSAO_AVULSO
+        return [
+            registro_para_linha(monta_registro_resultado(ctx, unidade, serie, nome_bolsao,
+                                                         usuario=usuario, agora=agora), hmap)
+            for ctx, unidade, serie in itens
+        ]
+
+    def registra(self, itens, usuario: str, agora: datetime) -> int:
+        """Enfileira as linhas (persistidas na hora); o envio é um append_rows da fila. Retorna quantas."""
+        linhas = self.linhas(itens, usuario, agora)
+        self.fila.enfileira(linhas)
+        self.replica.aplica_linhas(self.titulo, linhas)
+        return len(linhas)
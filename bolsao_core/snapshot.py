@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+Snapshot de colunas de uma aba da réplica, compartilhado por todas as sessões.
+
+Um único objeto por processo (st.cache_resource) acompanha a versão da
+réplica: quando ela muda, só as linhas indicadas em `mudancas_desde` são
+refeitas; sincronizações, o formulário salvo (aplica_celulas) e as cartas
+recém-enfileiradas (aplica_linhas) chegam a todas as sessões como delta.
+
+Os dados ficam em colunas (DataFrame, com as colunas de baixa cardinalidade
+como 'category'), servidos por referência: filtros viram máscaras vetoriais
+e nenhum rerun copia o snapshot. Os snapshots publicados não são alterados
+depois; cada atualização monta colunas novas e troca a referência.
+
+Para os filtros do formulário, `indice()` monta uma vez por versão o índice
+de facetas (unidade, bolsão) -> posições, unidade -> bolsões e ID -> posição;
+trocar um filtro vira consulta a dicionário. `filtra_ordena` aplica a busca e
+a ordem sobre essas posições, e o app manda ao navegador só uma página delas.
+"""
+import threading
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from bolsao_core.busca import normaliza_texto
+
+# Dia 0 das datas seriais do Google Sheets (valores crus de células de data)
+_EPOCA_SHEETS = pd.Timestamp("1899-12-30")
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    versao: int = 0
+    df: pd.DataFrame = field(default_factory=pd.DataFrame)  # uma linha por linha da aba, na ordem da aba
+    id_to_rownum: dict = field(default_factory=dict)  # ID -> linha na planilha (só gravadas)
+    pendentes: frozenset = frozenset()  # IDs enfileirados que a planilha ainda não confirmou
+    colunas: dict = field(default_factory=dict, repr=False)  # arrays por coluna, base do próximo delta
+    ordem: np.ndarray = field(default_factory=lambda: np.empty(0), repr=False)  # chave de ordenação por posição
+
+    def linha(self, posicao: int) -> dict:
+        """Valores da linha na posição `posicao` do DataFrame, por coluna."""
+        return {c: self.df[c].iat[posicao] for c in self.df.columns}
+
+
+def memoria_snapshot(snapshot: Snapshot) -> int:
+    """
+    Bytes do snapshot, com os textos contados (memory_usage deep=True); os arrays
+    por coluna e a ordem entram só pelos próprios buffers, já que apontam para os
+    mesmos textos. Custa ~100 ms em 30 mil linhas: só nas reconstruções completas.
+    """
+    total = int(snapshot.df.memory_usage(deep=True).sum()) + snapshot.ordem.nbytes
+    return total + sum(np.asarray(a).nbytes for a in snapshot.colunas.values())
+
+
+@dataclass(frozen=True)
+class IndiceFacetas:
+    versao: int
+    por_faceta: dict  # (valor1, valor2) -> posições (np.ndarray, em ordem da aba)
+    por_valor: dict  # valor1 -> posições
+    valores2: dict  # valor1 -> valores2 não vazios, ordenados
+    posicao_por_id: dict  # ID -> posição
+
+    def posicoes(self, valor1, valor2=None) -> np.ndarray:
+        """Posições com a faceta `valor1` (e `valor2`, se dado); array vazio se não houver."""
+        if valor2 is None:
+            return self.por_valor.get(valor1, _VAZIO)
+        return self.por_faceta.get((valor1, valor2), _VAZIO)
+
+
+_VAZIO = np.empty(0, dtype=np.int64)
+
+
+def _grupos(codigos: np.ndarray) -> dict:
+    """Código -> posições com esse código, na ordem original."""
+    ordem = np.argsort(codigos, kind="stable")
+    ordenados = codigos[ordem]
+    cortes = np.flatnonzero(np.diff(ordenados)) + 1
+    return {int(ordenados[a]): ordem[a:b] for a, b in zip([0, *cortes], [*cortes, len(ordem)])}
+
+
+def datas_seriais(valores) -> np.ndarray:
+    """
+    Data/hora como número de dias do Sheets (float), aceitando o valor cru
+    (serial) ou o texto 'dd/mm/aaaa hh:mm:ss'; NaN quando não dá para ler.
+    """
+    serie = pd.Series(valores, dtype=object)
+    numeros = pd.to_numeric(serie, errors="coerce")
+    textos = serie[numeros.isna()].astype(str)
+    datas = pd.to_datetime(textos, format="%d/%m/%Y %H:%M:%S", errors="coerce")
+    numeros[datas.index] = (datas - _EPOCA_SHEETS) / pd.Timedelta(days=1)
+    return numeros.to_numpy(dtype=float)
+
+
+def texto_data_hora(valor) -> str:
+    """Data/hora para exibição: o serial do Sheets vira 'dd/mm/aaaa hh:mm'; texto passa direto."""
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return (_EPOCA_SHEETS + pd.Timedelta(days=valor)).strftime("%d/%m/%Y %H:%M")
+    return str(valor or "")
+
+
+def monta_indice(snapshot: Snapshot, faceta1: str, faceta2: str, coluna_id: str) -> IndiceFacetas:
+    """Índice de facetas sobre duas colunas categóricas do snapshot."""
+    if snapshot.df.empty:
+        return IndiceFacetas(snapshot.versao, {}, {}, {}, {})
+    cat1, cat2 = snapshot.df[faceta1].array, snapshot.df[faceta2].array
+    nomes1, nomes2 = list(cat1.categories), list(cat2.categories)
+    codigos1 = cat1.codes.astype(np.int64)
+    codigos2 = cat2.codes.astype(np.int64)
+
+    por_valor = {nomes1[c]: pos for c, pos in _grupos(codigos1).items() if c >= 0}
+    por_faceta, valores2 = {}, {}
+    # Código -1 (sem valor) vira 0 no par combinado
+    for chave, pos in _grupos((codigos1 + 1) * (len(nomes2) + 1) + codigos2 + 1).items():
+        c1, c2 = (c - 1 for c in divmod(chave, len(nomes2) + 1))
+        if c1 < 0 or c2 < 0:
+            continue
+        por_faceta[(nomes1[c1], nomes2[c2])] = pos
+        if nomes2[c2]:
+            valores2.setdefault(nomes1[c1], []).append(nomes2[c2])
+
+    ids = snapshot.colunas[coluna_id]
+    posicao_por_id = {str(rid): i for i, rid in enumerate(ids) if rid}
+    return IndiceFacetas(snapshot.versao, por_faceta, por_valor,
+                         {v: sorted(b) for v, b in valores2.items()}, posicao_por_id)
+
+
+def filtra_ordena(snapshot: Snapshot, posicoes: np.ndarray, busca: str = "",
+                  colunas_busca=(), decrescente: bool = True) -> np.ndarray:
+    """
+    As `posicoes` que contêm todos os termos de `busca` (sem acentos) nas
+    `colunas_busca`, ordenadas pela coluna de ordem do snapshot (sem ela, pela
+    ordem da aba); sem data vão por último.
+    """
+    termos = normaliza_texto(busca).split()
+    if termos:
+        textos = [" ".join(normaliza_texto(v) for v in linha)
+                  for linha in zip(*(snapshot.colunas[c][posicoes] for c in colunas_busca))]
+        posicoes = posicoes[[all(t in texto for t in termos) for texto in textos]] if textos else posicoes
+    chave = snapshot.ordem[posicoes] if len(snapshot.ordem) else posicoes.astype(float)
+    chave = np.where(np.isnan(chave), -np.inf if decrescente else np.inf, chave)
+    return posicoes[np.argsort(-chave if decrescente else chave, kind="stable")]
+
+
+class SnapshotAba:
+    """Colunas `colunas` da aba `titulo`, atualizadas por delta a cada versão da réplica."""
+
+    def __init__(self, replica, titulo: str, colunas, coluna_id: str = "REGISTRO_ID", categoricas=(),
+                 facetas: tuple[str, str] | None = None, coluna_ordem: str | None = None):
+        self.replica = replica
+        self.titulo = titulo
+        self.colunas = tuple(colunas) + (() if coluna_id in colunas else (coluna_id,))
+        self.coluna_id = coluna_id
+        self.facetas = facetas
+        self.coluna_ordem = coluna_ordem
+        self.categoricas = frozenset(categoricas) | frozenset(facetas or ())
+        self.reconstrucoes = 0
+        self.deltas = 0
+        self.linhas_refeitas = 0
+        self.ultima_montagem = 0.0
+        self.memoria = 0
+        self._atual = Snapshot()
+        self._indice = None
+        self._lock = threading.Lock()
+
+    def atual(self) -> Snapshot:
+        """Snapshot da versão corrente da réplica; RuntimeError se faltar coluna na aba."""
+        if self._atual.versao == self.replica.versao(self.titulo):
+            return self._atual
+        with self._lock:
+            m = self.replica.mudancas_desde(self.titulo, self._atual.versao)
+            if m.versao != self._atual.versao:
+                linhas_antes, reconstrucoes = len(self._atual.df), self.reconstrucoes
+                t0 = time.perf_counter()
+                self._atual = self._monta(m)
+                self.ultima_montagem = time.perf_counter() - t0
+                if self.reconstrucoes != reconstrucoes or not linhas_antes:
+                    self.memoria = memoria_snapshot(self._atual)
+                else:
+                    # Contar os textos custa mais que o delta: entre reconstruções, proporcional às linhas
+                    self.memoria = self.memoria * len(self._atual.df) // linhas_antes
+            return self._atual
+
+    def indice(self, snapshot: Snapshot) -> IndiceFacetas:
+        """Índice de facetas de `snapshot`, montado uma vez por versão e compartilhado."""
+        indice = self._indice
+        if indice is not None and indice.versao == snapshot.versao:
+            return indice
+        indice = monta_indice(snapshot, *self.facetas, self.coluna_id)
+        with self._lock:
+            if self._indice is None or self._indice.versao < indice.versao:
+                self._indice = indice
+        return indice
+
+    def _monta(self, m) -> Snapshot:
+        hmap = {str(h).strip(): i for i, h in enumerate(m.cabecalho) if str(h).strip()}
+        faltam = [c for c in self.colunas if c not in hmap]
+        if faltam:
+            raise RuntimeError(f"Faltam colunas em '{self.titulo}': {', '.join(faltam)}")
+
+        anterior = self._atual
+        total = len(m.linhas)
+        antigas = len(anterior.df)
+        completo = m.indices is None or not anterior.versao
+        if completo:
+            refeitas = range(total)
+        else:
+            # Posições novas entram sempre, mesmo que o histórico não as cite
+            refeitas = sorted({i for i in m.indices if i < min(total, antigas)} | set(range(antigas, total)))
+
+        dados = {}
+        for c in self.colunas:
+            j = hmap[c]
+            novos = [(i, m.linhas[i][j] if j < len(m.linhas[i]) else "") for i in refeitas]
+            if c in self.categoricas and not completo:
+                dados[c] = _atualiza_categorica(anterior.colunas[c], total, novos)
+                continue
+            valores = np.empty(total, dtype=object)
+            if not completo:
+                valores[: min(total, antigas)] = anterior.colunas[c][: min(total, antigas)]
+            for i, valor in novos:
+                valores[i] = valor
+            dados[c] = pd.Categorical(valores.astype(str)) if c in self.categoricas else valores
+        df = pd.DataFrame(dados, columns=list(self.colunas), copy=False)
+
+        ids = dados[self.coluna_id]
+        if completo:
+            id_to_rownum = {str(rid): i + 2 for i, rid in enumerate(ids[: m.n_confirmadas]) if rid}
+            self.reconstrucoes += 1
+        else:
+            id_to_rownum = dict(anterior.id_to_rownum)
+            ids_antigos = anterior.colunas[self.coluna_id]
+            for i in [*refeitas, *range(total, antigas)]:
+                if i < antigas and id_to_rownum.get(str(ids_antigos[i])) == i + 2:
+                    del id_to_rownum[str(ids_antigos[i])]
+                if i < min(total, m.n_confirmadas) and ids[i]:
+                    id_to_rownum[str(ids[i])] = i + 2
+            self.deltas += 1
+        self.linhas_refeitas += len(refeitas)
+
+        ordem = np.empty(0)
+        if self.coluna_ordem:
+            # Data/hora convertida só nas posições refeitas
+            ordem = np.empty(total)
+            if not completo:
+                ordem[: min(total, antigas)] = anterior.ordem[: min(total, antigas)]
+            if len(refeitas):
+                posicoes = np.fromiter(refeitas, dtype=np.int64, count=len(refeitas))
+                ordem[posicoes] = datas_seriais(dados[self.coluna_ordem][posicoes])
+
+        pendentes = frozenset(str(rid) for rid in ids[m.n_confirmadas:] if rid)
+        return Snapshot(m.versao, df, id_to_rownum, pendentes, dados, ordem)
+
+    def status(self) -> dict:
+        return {
+            "versao": self._atual.versao,
+            "linhas": len(self._atual.df),
+            "pendentes": len(self._atual.pendentes),
+            "memoria": self.memoria,
+            "ultima_montagem": self.ultima_montagem,
+            "reconstrucoes": self.reconstrucoes,
+            "deltas": self.deltas,
+            "linhas_refeitas": self.linhas_refeitas,
+        }
+
+
+def _atualiza_categorica(anterior: pd.Categorical, total: int, novos: list) -> pd.Categorical:
+    """Copia os códigos da versão anterior e troca só as posições `novos` (categorias novas vão para o fim)."""
+    categorias = anterior.categories
+    textos = [(i, str(v)) for i, v in novos]
+    faltam = sorted({t for _, t in textos} - set(categorias))
+    if faltam:
+        categorias = categorias.append(pd.Index(faltam))
+    codigo = {c: k for k, c in enumerate(categorias)}
+    codigos = np.empty(total, dtype=np.int32)
+    k = min(total, len(anterior))
+    codigos[:k] = anterior.codes[:k]
+    for i, t in textos:
+        codigos[i] = codigo[t]
+    return pd.Categorical.from_codes(codigos, categories=categorias)
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""Réplica, fila e registro de 'Resultados_Bolsao' sobre a planilha falsa (benchmarks.planilha_falsa)."""
+from datetime import date
+
+import pytest
+
+from bolsao_core.calendario import CalendarioBolsao
+from bolsao_core.fila_escrita import FilaEscrita
+from bolsao_core.replica import ConfigAba, ReplicaPlanilha
+from bolsao_core.resultados import ABA_RESULTADOS, RegistroResultados
+
+from benchmarks.dados_falsos import CABECALHO_RESULTADOS
+from benchmarks.planilha_falsa import ClienteFalso
+
+
+class Ambiente:
+    def __init__(self, tmp_path, linhas_bolsao):
+        self.planilha = ClienteFalso({
+            ABA_RESULTADOS: [CABECALHO_RESULTADOS],
+            "Bolsão": [["Data", "Hora", "Bolsão"], *linhas_bolsao],
+        }).planilha
+        # Como o lru_cache do app: cada aba é aberta uma vez
+        self.abas = {titulo: self.planilha.worksheet(titulo) for titulo in (ABA_RESULTADOS, "Bolsão")}
+        self.replica = ReplicaPlanilha(tmp_path / "replica.sqlite3", self.abas.get,
+                                       [ConfigAba(ABA_RESULTADOS, coluna_id="REGISTRO_ID"), ConfigAba("Bolsão")])
+        self.fila = FilaEscrita(tmp_path / "fila.sqlite3", lambda: self.abas[ABA_RESULTADOS])
+        self.calendario = CalendarioBolsao(lambda: self.replica.linhas("Bolsão"),
+                                           lambda: self.replica.versao("Bolsão"))
+        self.registro = RegistroResultados(self.replica, self.fila, self.calendario)
+
+    @property
+    def resultados(self):
+        return self.abas[ABA_RESULTADOS]
+
+
+@pytest.fixture
+def ambiente(tmp_path):
+    return Ambiente(tmp_path, [[date.today().strftime("%d/%m/%Y"), "09:00", "Bolsão Teste"]])
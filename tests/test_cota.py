@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+import pytest
+
+from bolsao_core.cota import CotaEsgotada, LimitadorCota, PlanilhaLimitada
+
+from benchmarks.planilha_falsa import ClienteFalso, ConfigFalhas, erro_api
+
+
+def _limitador(**kwargs):
+    return LimitadorCota(**{"leituras_por_minuto": 6000, "escritas_por_minuto": 6000,
+                            "backoff_inicial": 0.001, "backoff_maximo": 0.01, **kwargs})
+
+
+def test_leituras_iguais_simultaneas_viram_uma():
+    limitador = _limitador()
+    chamadas = []
+
+    def le():
+        chamadas.append(1)
+        time.sleep(0.2)
+        return {"valores": [1, 2, 3]}
+
+    resultados = [None] * 5
+
+    def sessao(k):
+        resultados[k] = limitador.executa("leitura", le, ("Resultados_Bolsao", "get_all_values"))
+
+    threads = [threading.Thread(target=sessao, args=(k,)) for k in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(chamadas) == 1
+    assert limitador.status()["coalescidas"] == 4
+    assert all(r == {"valores": [1, 2, 3]} for r in resultados)
+    resultados[0]["valores"].append(4)  # cada sessão tem a sua cópia
+    assert resultados[1] == {"valores": [1, 2, 3]}
+
+    limitador.executa("leitura", le, ("Resultados_Bolsao", "get_all_values"))
+    assert len(chamadas) == 2  # terminada a leitura, a próxima vai à API
+
+
+def test_429_e_retentado_com_backoff():
+    limitador = _limitador()
+    falhas = [erro_api(429, "Quota exceeded"), erro_api(429, "Quota exceeded")]
+
+    def escreve():
+        if falhas:
+            raise falhas.pop(0)
+        return "ok"
+
+    assert limitador.executa("escrita", escreve) == "ok"
+    assert limitador.status()["retentativas_429"] == 2
+
+
+def test_429_persistente_desiste_e_outros_erros_nao_repetem():
+    limitador = _limitador(max_tentativas=3)
+    chamadas = []
+
+    def sempre(erro):
+        def fn():
+            chamadas.append(1)
+            raise erro
+        return fn
+
+    with pytest.raises(Exception, match="Quota"):
+        limitador.executa("leitura", sempre(erro_api(429, "Quota exceeded")))
+    assert len(chamadas) == 3
+
+    chamadas.clear()
+    with pytest.raises(Exception):
+        limitador.executa("escrita", sempre(erro_api(400, "Invalid values")))
+    assert len(chamadas) == 1
+
+
+def test_cota_esgotada_nao_espera_alem_do_limite():
+    limitador = LimitadorCota(leituras_por_minuto=1, espera_maxima=0.01)
+    assert limitador.executa("leitura", lambda: 1) == 1
+    with pytest.raises(CotaEsgotada) as erro:
+        limitador.executa("leitura", lambda: 2)
+    assert erro.value.espera > 30
+    assert limitador.status()["esgotadas"] == 1
+    assert limitador.status()["leituras_min"] == 1
+
+
+def test_proxy_separa_leituras_e_escritas():
+    cliente = ClienteFalso({"Resultados_Bolsao": [["Nome"]]}, ConfigFalhas(prob_429=0.3, semente=1))
+    limitador = _limitador(max_tentativas=20)
+    aba = PlanilhaLimitada(cliente.planilha, limitador).worksheet("Resultados_Bolsao")
+    for i in range(10):
+        aba.append_rows([[f"Aluno {i}"]])
+    assert aba.col_values(1) == ["Nome"] + [f"Aluno {i}" for i in range(10)]
+
+    status = limitador.status()
+    assert status["retentativas_429"] == cliente.planilha.erros_429
+    assert status["leituras_min"] + status["escritas_min"] == sum(cliente.chamadas.values())
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from bolsao_core.cota import CotaEsgotada
+from bolsao_core.fila_escrita import FilaEscrita, envio_ambiguo, erro_transitorio, linha_recusada
+
+from benchmarks.planilha_falsa import ClienteFalso, erro_api
+
+CABECALHO = ["Nome", "REGISTRO_ID"]
+
+
+class AbaInstavel:
+    """Repassa à aba falsa; as listas de erros decidem como os próximos appends falham."""
+
+    def __init__(self, ws):
+        self._ws = ws
+        self.antes_de_gravar = []  # erros sem gravar nada (ex.: timeout na ida)
+        self.apos_gravar = []  # erros depois de gravar (resposta perdida)
+        self.recusa = lambda linha: False  # linhas que a API recusa com 400
+
+    def append_rows(self, linhas, **kwargs):
+        if self.antes_de_gravar:
+            raise self.antes_de_gravar.pop(0)
+        if any(self.recusa(l) for l in linhas):
+            raise erro_api(400, "Invalid values")
+        resposta = self._ws.append_rows(linhas, **kwargs)
+        if self.apos_gravar:
+            raise self.apos_gravar.pop(0)
+        return resposta
+
+    def __getattr__(self, nome):
+        return getattr(self._ws, nome)
+
+
+@pytest.fixture
+def aba():
+    cliente = ClienteFalso({"Resultados_Bolsao": [CABECALHO]})
+    return AbaInstavel(cliente.planilha.worksheet("Resultados_Bolsao"))
+
+
+@pytest.fixture
+def fila(tmp_path, aba):
+    return FilaEscrita(tmp_path / "fila.sqlite3", lambda: aba)
+
+
+def _linhas(n, prefixo="id"):
+    return [[f"Aluno {i}", f"{prefixo}{i}"] for i in range(n)]
+
+
+def test_reenvio_apos_5xx_nao_duplica(fila, aba):
+    fila.enfileira(_linhas(4))
+    aba.apos_gravar.append(erro_api(500, "Internal error"))
+    with pytest.raises(Exception):
+        fila.descarrega()
+    assert len(aba._ws.linhas) == 1 + 4  # a planilha gravou, o app não soube
+    assert fila.status()["profundidade"] == 4
+
+    fila.enfileira(_linhas(2, prefixo="novo"))
+    assert fila.descarrega() == 6
+    assert [l[1] for l in aba._ws.linhas[1:]] == [f"id{i}" for i in range(4)] + ["novo0", "novo1"]
+    status = fila.status()
+    assert status["profundidade"] == 0
+    assert status["duplicadas_evitadas"] == 4
+
+
+def test_reenvio_apos_timeout_sem_gravar_reenvia(fila, aba):
+    fila.enfileira(_linhas(3))
+    aba.antes_de_gravar.append(TimeoutError("sem resposta"))
+    with pytest.raises(TimeoutError):
+        fila.descarrega()
+    assert len(aba._ws.linhas) == 1
+
+    assert fila.descarrega() == 3
+    assert len(aba._ws.linhas) == 1 + 3
+    assert fila.status()["duplicadas_evitadas"] == 0
+
+
+def test_4xx_isola_a_linha_recusada(fila, aba):
+    aba.recusa = lambda linha: linha[1] == "id5"
+    fila.enfileira(_linhas(8))
+    assert fila.descarrega() == 8
+    assert [l[1] for l in aba._ws.linhas[1:]] == [f"id{i}" for i in range(8) if i != 5]
+
+    status = fila.status()
+    assert status["profundidade"] == 0
+    assert status["rejeitadas"] == 1
+    assert "400" in status["ultima_rejeicao"]
+    assert fila.rejeitadas()[0]["linha"] == ["Aluno 5", "id5"]
+
+    aba.recusa = lambda linha: False
+    assert fila.reenfileira_rejeitadas() == 1
+    assert fila.descarrega() == 1
+    assert aba._ws.linhas[-1] == ["Aluno 5", "id5"]
+    assert fila.status()["rejeitadas"] == 0
+
+
+def test_erro_da_aba_nao_vira_rejeicao(fila, aba):
+    aba.antes_de_gravar.append(erro_api(403, "Forbidden"))
+    fila.enfileira(_linhas(2))
+    with pytest.raises(Exception):
+        fila.descarrega()
+    status = fila.status()
+    assert status["profundidade"] == 2
+    assert status["rejeitadas"] == 0
+
+
+def test_classificacao_dos_erros(fila):
+    cota = CotaEsgotada("cota", espera=7.5)
+    assert erro_transitorio(cota) and not envio_ambiguo(cota) and not linha_recusada(cota)
+    assert fila._espera(cota) == 7.5
+
+    for status in (429, 500, 503):
+        assert erro_transitorio(erro_api(status, "x"))
+    assert not envio_ambiguo(erro_api(429, "x"))
+    assert envio_ambiguo(erro_api(502, "x"))
+    assert envio_ambiguo(TimeoutError())
+    assert linha_recusada(erro_api(400, "x"))
+    assert not linha_recusada(erro_api(404, "x"))
+    assert fila._espera(erro_api(400, "x")) == fila.backoff_maximo
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from bolsao_core.replica import ConfigAba, ReplicaPlanilha
+
+from benchmarks.planilha_falsa import ClienteFalso
+
+CABECALHO = ["Nome", "Unidade", "REGISTRO_ID"]
+
+
+class PlanilhaComGancho:
+    """Repassa à planilha falsa e roda `antes_da_resposta` uma vez, entre a leitura e a resposta."""
+
+    def __init__(self, planilha):
+        self._planilha = planilha
+        self.antes_da_resposta = None
+
+    def values_batch_get(self, faixas, params=None):
+        resposta = self._planilha.values_batch_get(faixas, params=params)
+        gancho, self.antes_da_resposta = self.antes_da_resposta, None
+        if gancho:
+            gancho()
+        return resposta
+
+    def __getattr__(self, nome):
+        return getattr(self._planilha, nome)
+
+
+class AbaAberta:
+    """Aba como o gspread a devolve: col_count fica congelado no valor da abertura."""
+
+    def __init__(self, ws, planilha, col_count=None):
+        self._ws = ws
+        self.spreadsheet = planilha
+        self.col_count = ws.col_count if col_count is None else col_count
+
+    def __getattr__(self, nome):
+        return getattr(self._ws, nome)
+
+
+@pytest.fixture
+def cliente():
+    linhas = [CABECALHO] + [[f"Aluno {i}", "BANGU", f"id{i}"] for i in range(10)]
+    return ClienteFalso({"Resultados_Bolsao": linhas})
+
+
+def _replica(tmp_path, cliente, col_count=None, **kwargs):
+    planilha = PlanilhaComGancho(cliente.planilha)
+    ws = AbaAberta(cliente.planilha.worksheet("Resultados_Bolsao"), planilha, col_count)
+    replica = ReplicaPlanilha(tmp_path / "replica.sqlite3", lambda titulo: ws,
+                              [ConfigAba("Resultados_Bolsao", coluna_id="REGISTRO_ID")], **kwargs)
+    replica.sincroniza("Resultados_Bolsao")
+    return replica, ws
+
+
+def test_sincronizacao_anota_so_as_linhas_alteradas(tmp_path, cliente):
+    replica, ws = _replica(tmp_path, cliente)
+    versao = replica.versao("Resultados_Bolsao")
+
+    aba = cliente.planilha._abas["Resultados_Bolsao"]
+    aba.escreve("B5", [["CAMPO GRANDE"]])
+    aba.append_rows([["Aluno novo", "BANGU", "id10"]])
+    cliente.planilha.chamadas.clear()
+    assert replica.sincroniza("Resultados_Bolsao")
+    assert dict(cliente.planilha.chamadas) == {"values_batch_get": 1}
+
+    m = replica.mudancas_desde("Resultados_Bolsao", versao)
+    assert m.versao == versao + 1
+    assert m.indices == {3, 10}
+    assert m.linhas[3][1] == "CAMPO GRANDE"
+    assert replica.mudancas_desde("Resultados_Bolsao", m.versao).indices == frozenset()
+    assert replica.mudancas_desde("Resultados_Bolsao", 0).indices is None
+
+    assert not replica.sincroniza("Resultados_Bolsao")
+    assert replica.versao("Resultados_Bolsao") == m.versao
+
+
+def test_pendentes_saem_quando_a_planilha_confirma(tmp_path, cliente):
+    replica, ws = _replica(tmp_path, cliente)
+    replica.aplica_linhas("Resultados_Bolsao", [["Aluno A", "BANGU", "idA"], ["Aluno B", "BANGU", "idB"]])
+    assert replica.n_pendentes("Resultados_Bolsao") == 2
+    assert [l[0] for l in replica.linhas("Resultados_Bolsao")[-2:]] == ["Aluno A", "Aluno B"]
+    assert replica.mudancas_desde("Resultados_Bolsao", replica.versao("Resultados_Bolsao") - 1).indices == {10, 11}
+
+    cliente.planilha._abas["Resultados_Bolsao"].append_rows([["Aluno A", "BANGU", "idA"]])
+    replica.sincroniza("Resultados_Bolsao")
+    assert replica.n_pendentes("Resultados_Bolsao") == 1
+    assert [l[2] for l in replica.linhas("Resultados_Bolsao")[-2:]] == ["idA", "idB"]
+
+
+def test_coluna_nova_alem_do_col_count_congelado(tmp_path, cliente):
+    replica, ws = _replica(tmp_path, cliente, col_count=len(CABECALHO))
+    cliente.planilha._abas["Resultados_Bolsao"].escreve("D1", [["Observações"], ["nota 0"]])
+
+    assert replica.sincroniza("Resultados_Bolsao")
+    assert replica.cabecalho("Resultados_Bolsao") == CABECALHO + ["Observações"]
+    assert replica.linhas("Resultados_Bolsao")[0] == ["Aluno 0", "BANGU", "id0", "nota 0"]
+    assert replica.colunas("Resultados_Bolsao", ["Observações"])["Observações"][:2] == ["nota 0", ""]
+
+
+def test_leitura_anterior_a_escrita_local_e_descartada(tmp_path, cliente):
+    replica, ws = _replica(tmp_path, cliente)
+    aba = cliente.planilha._abas["Resultados_Bolsao"]
+
+    def app_grava():
+        # A leitura já saiu com o valor antigo; o app grava e reflete na réplica
+        aba.escreve("B2", [["MADUREIRA"]])
+        replica.aplica_celulas("Resultados_Bolsao", 2, {"Unidade": "MADUREIRA"})
+
+    ws.spreadsheet.antes_da_resposta = app_grava
+    assert not replica.sincroniza("Resultados_Bolsao", total=True)
+    assert replica.leituras_descartadas == 1
+    assert replica.linhas("Resultados_Bolsao")[0][1] == "MADUREIRA"
+
+    assert not replica.sincroniza("Resultados_Bolsao", total=True)
+    assert replica.linhas("Resultados_Bolsao")[0][1] == "MADUREIRA"
+
+
+def test_processo_novo_sobe_com_os_dados_do_disco(tmp_path, cliente):
+    replica, ws = _replica(tmp_path, cliente)
+    replica.aplica_celulas("Resultados_Bolsao", 3, {"Unidade": "MADUREIRA"})
+
+    cliente.planilha.chamadas.clear()
+    nova = ReplicaPlanilha(tmp_path / "replica.sqlite3", lambda titulo: ws,
+                           [ConfigAba("Resultados_Bolsao", coluna_id="REGISTRO_ID")])
+    assert nova.linhas("Resultados_Bolsao") == replica.linhas("Resultados_Bolsao")
+    assert cliente.planilha.chamadas == {}
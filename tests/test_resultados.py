@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+
+from bolsao_core.calendario import BOLSAO_AVULSO
+from bolsao_core.carta import monta_contexto_carta
+from bolsao_core.relogio import TZ_BRASILIA
+from bolsao_core.resultados import ABA_RESULTADOS
+
+from benchmarks.dados_falsos import CABECALHO_RESULTADOS
+
+COL_BOLSAO = CABECALHO_RESULTADOS.index("Bolsão")
+COL_ID = CABECALHO_RESULTADOS.index("REGISTRO_ID")
+
+
+def _item(aluno, agora):
+    ctx = monta_contexto_carta(aluno, "BANGU", "6º ano do EF2", "6º ao 8º Ano", 8, 7, agora.date())
+    return ctx, "BANGU", "6º ao 8º Ano"
+
+
+def _aquece(ambiente):
+    """A primeira leitura das abas acontece uma vez por processo; depois só contam as escritas."""
+    ambiente.registro.cabecalho()
+    ambiente.calendario.nome_para(datetime.now(TZ_BRASILIA).date())
+    ambiente.planilha.chamadas.clear()
+
+
+def test_um_append_por_carta_sem_leituras(ambiente):
+    _aquece(ambiente)
+    agora = datetime.now(TZ_BRASILIA)
+    for i in range(5):
+        ambiente.registro.registra([_item(f"Aluno {i}", agora)], usuario="teste", agora=agora)
+        assert ambiente.fila.descarrega() == 1
+    assert dict(ambiente.planilha.chamadas) == {"append_rows": 5}
+    assert len(ambiente.resultados.linhas) == 1 + 5
+
+
+def test_cartas_pendentes_saem_em_um_append(ambiente):
+    _aquece(ambiente)
+    agora = datetime.now(TZ_BRASILIA)
+    for i in range(7):
+        ambiente.registro.registra([_item(f"Lote {i}", agora)], usuario="teste", agora=agora)
+    assert ambiente.fila.descarrega() == 7
+    assert ambiente.fila.descarrega() == 0
+    assert dict(ambiente.planilha.chamadas) == {"append_rows": 1}
+
+    gravadas = ambiente.resultados.linhas[1:]
+    assert [l[CABECALHO_RESULTADOS.index("Nome do Aluno")] for l in gravadas] == [f"Lote {i}" for i in range(7)]
+    assert {l[COL_BOLSAO] for l in gravadas} == {"Bolsão Teste"}
+    assert len({l[COL_ID] for l in gravadas}) == 7
+
+
+def test_linhas_aparecem_na_replica_antes_do_envio(ambiente):
+    _aquece(ambiente)
+    agora = datetime.now(TZ_BRASILIA)
+    ambiente.registro.registra([_item("Aluno", agora)], usuario="teste", agora=agora)
+    assert ambiente.replica.n_pendentes(ABA_RESULTADOS) == 1
+    assert ambiente.planilha.chamadas == {}
+
+    ambiente.fila.descarrega()
+    ambiente.replica.sincroniza(ABA_RESULTADOS)
+    assert ambiente.replica.n_pendentes(ABA_RESULTADOS) == 0
+    assert len(ambiente.replica.linhas(ABA_RESULTADOS)) == 1
+
+
+def test_calendario_ilegivel_registra_como_avulso(ambiente):
+    _aquece(ambiente)
+
+    def falha(_data):
+        raise ConnectionError("aba 'Bolsão' indisponível")
+
+    ambiente.calendario.nome_para = falha
+    agora = datetime.now(TZ_BRASILIA)
+    linhas = ambiente.registro.linhas([_item("Aluno", agora)], usuario="teste", agora=agora)
+    assert linhas[0][COL_BOLSAO] == BOLSAO_AVULSO
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from bolsao_core.planilha import COLUNAS_RESULTADOS_CATEGORICAS
+from bolsao_core.replica import ConfigAba, ReplicaPlanilha
+from bolsao_core.snapshot import SnapshotAba
+
+from benchmarks.dados_falsos import CABECALHO_RESULTADOS, abas_exemplo
+from benchmarks.planilha_falsa import ClienteFalso
+
+ABA = "Resultados_Bolsao"
+COLUNAS = tuple(c for c in CABECALHO_RESULTADOS if c not in ("Turma de Interesse", "Usuário"))
+COL_ID = CABECALHO_RESULTADOS.index("REGISTRO_ID")
+COL_UNIDADE = CABECALHO_RESULTADOS.index("Unidade")
+
+
+@pytest.fixture
+def cliente():
+    return ClienteFalso({ABA: abas_exemplo(200, 0)[ABA]})
+
+
+@pytest.fixture
+def replica(tmp_path, cliente):
+    ws = cliente.planilha.worksheet(ABA)
+    return ReplicaPlanilha(tmp_path / "replica.sqlite3", lambda titulo: ws,
+                           [ConfigAba(ABA, render="UNFORMATTED_VALUE", coluna_id="REGISTRO_ID")])
+
+
+def _snapshot(replica):
+    return SnapshotAba(replica, ABA, COLUNAS, facetas=COLUNAS_RESULTADOS_CATEGORICAS, coluna_ordem="Data/Hora")
+
+
+def _igual_a_reconstruir(snapshot_aba, replica):
+    """O snapshot mantido por delta tem de ser o mesmo que uma reconstrução do zero."""
+    delta, novo = snapshot_aba.atual(), _snapshot(replica).atual()
+    assert delta.versao == novo.versao
+    # Categorias novas entram no fim no delta; os valores é que precisam bater
+    assert delta.df.astype(str).equals(novo.df.astype(str))
+    assert delta.id_to_rownum == novo.id_to_rownum
+    assert delta.pendentes == novo.pendentes
+    assert np.array_equal(delta.ordem, novo.ordem, equal_nan=True)
+    return delta
+
+
+def _linha(i, unidade="UNIDADE NOVA"):
+    linha = [""] * len(CABECALHO_RESULTADOS)
+    linha[0] = "01/02/2025 10:00:00"
+    linha[COL_UNIDADE] = unidade
+    linha[COL_ID] = f"novo{i}"
+    return linha
+
+
+def test_carta_nova_entra_por_delta(replica):
+    snapshots = _snapshot(replica)
+    assert len(snapshots.atual().df) == 200
+    assert snapshots.reconstrucoes == 1
+
+    replica.aplica_linhas(ABA, [_linha(0), _linha(1)])
+    atual = _igual_a_reconstruir(snapshots, replica)
+    assert (snapshots.reconstrucoes, snapshots.deltas) == (1, 1)
+    assert len(atual.df) == 202
+    assert atual.pendentes == {"novo0", "novo1"}
+    assert "novo0" not in atual.id_to_rownum
+    assert snapshots.atual() is atual  # mesma versão: mesmo objeto, sem cópia
+
+
+def test_confirmacao_e_edicao_na_planilha_por_delta(replica, cliente):
+    snapshots = _snapshot(replica)
+    snapshots.atual()
+    replica.aplica_linhas(ABA, [_linha(0)])
+    snapshots.atual()
+
+    aba = cliente.planilha._abas[ABA]
+    aba.append_rows([_linha(0)])
+    aba.escreve(f"C{2 + 150}", [["EDITADA"]])
+    replica.sincroniza(ABA)
+    atual = _igual_a_reconstruir(snapshots, replica)
+    assert (snapshots.reconstrucoes, snapshots.deltas) == (1, 2)
+    assert atual.pendentes == frozenset()
+    assert atual.id_to_rownum["novo0"] == 202
+    assert atual.df["Unidade"].iloc[150] == "EDITADA"
+
+
+def test_edicao_local_atualiza_id_e_indice(replica):
+    snapshots = _snapshot(replica)
+    antes = snapshots.atual()
+    rid = next(r for r, n in antes.id_to_rownum.items() if n == 10)
+
+    replica.aplica_celulas(ABA, 10, {"Unidade": "MADUREIRA"})
+    atual = _igual_a_reconstruir(snapshots, replica)
+    assert snapshots.deltas == 1
+    assert atual.linha(8)["Unidade"] == "MADUREIRA"
+    assert atual.id_to_rownum[rid] == 10
+    assert 8 in snapshots.indice(atual).posicoes("MADUREIRA")
+
+
+def test_sem_historico_reconstroi(replica):
+    snapshots = _snapshot(replica)
+    snapshots.atual()
+    replica.aplica_celulas(ABA, 5, {"Unidade": "MADUREIRA"})
+    replica._estado[ABA].historico.clear()
+    replica.aplica_celulas(ABA, 6, {"Unidade": "MADUREIRA"})
+    _igual_a_reconstruir(snapshots, replica)
+    assert snapshots.reconstrucoes == 2